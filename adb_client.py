@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+ADB Client
+Keeps one long-lived ADB connection per LDPlayer instance port and shares it
+between the monitor and the reroll automation, so taps, screencaps and probes
+don't pay for spawning adb.exe every time.
+
+Connections go straight to each emulator's adbd through adb-shell. If
+adb-shell isn't installed, commands fall back to the adb binary, which
+runs `adb connect` for a port before its first command (and again when
+the adb server has lost the instance).
+"""
+
+import os
+import subprocess
+import threading
+
+try:
+    from adb_shell.adb_device import AdbDeviceTcp
+    from adb_shell.auth.keygen import keygen
+    from adb_shell.auth.sign_pythonrsa import PythonRSASigner
+    ADB_SHELL_AVAILABLE = True
+except ImportError:
+    ADB_SHELL_AVAILABLE = False
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_KEY_PATH = os.path.join(os.path.expanduser('~'), '.android', 'adbkey')
+
+# adb binary errors meaning the server isn't connected to the instance (any more)
+DISCONNECTED_ERRORS = ('not found', 'offline', 'no devices')
+
+
+class AdbError(Exception):
+    """Raised when a command can't be delivered to an instance"""
+
+
+def instance_serial(port, host=DEFAULT_HOST):
+    """ADB serial for an LDPlayer instance listening on the given port"""
+    return f'{host}:{port}'
+
+
+class AdbClient:
+    """Pooled ADB client with one persistent, auto-reconnecting connection per port"""
+
+    def __init__(self, adb_path, host=DEFAULT_HOST, key_path=DEFAULT_KEY_PATH, timeout=10):
+        self.adb_path = adb_path
+        self.host = host
+        self.key_path = key_path
+        self.timeout = timeout
+        self.use_adb_shell = ADB_SHELL_AVAILABLE
+
+        self._connections = {}  # {port: AdbDeviceTcp}
+        self._port_locks = {}  # {port: Lock} - one command at a time per connection
+        self._binary_connected = set()  # Ports the adb server was connected to by the binary transport
+        self._pool_lock = threading.Lock()
+        self._signer = None
+
+    @property
+    def transport(self):
+        """Name of the transport in use, for logging"""
+        return 'adb-shell' if self.use_adb_shell else 'adb binary'
+
+    def shell(self, port, command, timeout=None):
+        """Run a shell command and return its output as text"""
+        if not self.use_adb_shell:
+            return self._run_binary(port, ['shell'] + command.split(), timeout).decode('utf-8', errors='replace')
+        return self._run(port, lambda device: device.shell(command, read_timeout_s=timeout or self.timeout))
+
+    def exec_out(self, port, command, timeout=None):
+        """Run a command and return its raw stdout bytes (e.g. screencap)"""
+        if not self.use_adb_shell:
+            return self._run_binary(port, ['exec-out'] + command.split(), timeout)
+        return self._run(port, lambda device: device.exec_out(command, read_timeout_s=timeout or self.timeout, decode=False))
+
+    def tap(self, port, x, y):
+        """Tap at screen coordinates"""
+        self.shell(port, f'input tap {int(x)} {int(y)}')
+
+    def swipe(self, port, x1, y1, x2, y2, duration=500):
+        """Swipe between two points over duration milliseconds"""
+        self.shell(port, f'input swipe {int(x1)} {int(y1)} {int(x2)} {int(y2)} {int(duration)}')
+
+    def keyevent(self, port, keycode):
+        """Send a key event"""
+        self.shell(port, f'input keyevent {keycode}')
+
+    def getprop(self, port, name):
+        """Read a system property"""
+        return self.shell(port, f'getprop {name}').strip()
+
+    def is_alive(self, port, timeout=5):
+        """Check that the instance answers an echo probe"""
+        try:
+            return self.shell(port, 'echo test', timeout=timeout).strip() == 'test'
+        except AdbError:
+            return False
+
+    def close(self, port=None):
+        """Close the connection for one port, or all connections"""
+        with self._pool_lock:
+            ports = [port] if port is not None else list(self._connections.keys() | self._binary_connected)
+            for p in ports:
+                self._binary_connected.discard(p)
+                device = self._connections.pop(p, None)
+                if device is not None:
+                    try:
+                        device.close()
+                    except Exception:
+                        pass
+
+    def _port_lock(self, port):
+        with self._pool_lock:
+            if port not in self._port_locks:
+                self._port_locks[port] = threading.Lock()
+            return self._port_locks[port]
+
+    def _run(self, port, action):
+        """Run an action on the port's connection, reconnecting once if it dropped"""
+        with self._port_lock(port):
+            last_error = None
+            for attempt in range(2):
+                try:
+                    return action(self._connect(port))
+                except Exception as e:
+                    last_error = e
+                    self.close(port)
+            raise AdbError(f"{instance_serial(port, self.host)}: {str(last_error)}")
+
+    def _connect(self, port):
+        """Return a live connection for the port, opening it if needed"""
+        device = self._connections.get(port)
+        if device is not None and device.available:
+            return device
+
+        device = AdbDeviceTcp(self.host, port, default_transport_timeout_s=self.timeout)
+        device.connect(rsa_keys=[self._get_signer()], auth_timeout_s=self.timeout)
+        with self._pool_lock:
+            self._connections[port] = device
+        return device
+
+    def _get_signer(self):
+        """Load (or create) the ADB RSA key used to authenticate with adbd"""
+        if self._signer is None:
+            if not os.path.exists(self.key_path):
+                os.makedirs(os.path.dirname(self.key_path), exist_ok=True)
+                keygen(self.key_path)
+            self._signer = PythonRSASigner.FromRSAKeyPath(self.key_path)
+        return self._signer
+
+    def _run_binary(self, port, args, timeout=None):
+        """Fallback transport: spawn the adb binary for a single command
+        
+        The adb server only knows instances it was told to connect to, so the
+        port is connected first, and reconnected once if the server lost it.
+        """
+        if port not in self._binary_connected:
+            self._connect_binary(port, timeout)
+        try:
+            return self._spawn([self.adb_path, '-s', instance_serial(port, self.host)] + args, port, timeout)
+        except AdbError as e:
+            if not any(error in str(e) for error in DISCONNECTED_ERRORS):
+                raise
+            self._binary_connected.discard(port)
+            self._connect_binary(port, timeout)
+            return self._spawn([self.adb_path, '-s', instance_serial(port, self.host)] + args, port, timeout)
+
+    def _connect_binary(self, port, timeout=None):
+        """Run `adb connect` for the port (adb exits 0 even when it couldn't connect, so check its output)"""
+        with self._port_lock(port):
+            if port in self._binary_connected:
+                return
+            output = self._spawn([self.adb_path, 'connect', instance_serial(port, self.host)], port, timeout)
+            output = output.decode('utf-8', errors='replace').strip()
+            if 'connected to' not in output:
+                raise AdbError(f"{instance_serial(port, self.host)}: {output or 'adb connect failed'}")
+            self._binary_connected.add(port)
+
+    def _spawn(self, command, port, timeout=None):
+        """Run the adb binary and return its stdout, raising AdbError if it fails"""
+        try:
+            result = subprocess.run(command, capture_output=True, timeout=timeout or self.timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise AdbError(f"{instance_serial(port, self.host)}: {str(e)}")
+
+        if result.returncode != 0:
+            raise AdbError(f"{instance_serial(port, self.host)}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+        return result.stdout
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_adb_client(adb_path):
+    """Return the process-wide AdbClient shared by both GUIs"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = AdbClient(adb_path)
+        else:
+            _shared_client.adb_path = adb_path
+        return _shared_client
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Async Monitoring Engine
+Runs monitoring cycles as one asyncio coroutine per instance
+
+Each instance coroutine sleeps until each timing mark, captures its frame
+and hands it to the detection executor, so a slow capture or detection on
+one emulator never holds up the others, and 20+ instances don't need a
+thread each:
+- capture: the adb binary runs through asyncio.create_subprocess_exec;
+  with the adb-shell transport (a blocking connection per port) the
+  capture runs in a small capture thread pool instead
+- detection: CPU-heavy work runs in a bounded detection thread pool
+- stop: stop() cancels the running cycle; every instance coroutine is
+  cancelled and adb processes still running are killed
+
+The event loop lives in one background thread, so the Tk GUI (or its
+monitoring thread) drives the engine with plain blocking calls:
+run_cycle() and stop().
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from adb_client import AdbError, instance_serial
+from screen_capture import capture_screenshot, decode_png, parse_raw_screencap, CAPTURE_MODES
+
+MONITOR_ENGINES = ('threads', 'asyncio')
+
+
+async def async_capture_screenshot(adb_client, port, mode='png', timeout=None, executor=None):
+    """Capture a screenshot without blocking the event loop"""
+    if mode not in CAPTURE_MODES:
+        raise ValueError(f"Unknown capture mode '{mode}' (expected one of {CAPTURE_MODES})")
+
+    loop = asyncio.get_running_loop()
+    if adb_client.use_adb_shell:
+        return await loop.run_in_executor(executor, capture_screenshot, adb_client, port, mode, timeout)
+
+    command = ['screencap'] if mode == 'raw' else ['screencap', '-p']
+    process = await asyncio.create_subprocess_exec(
+        adb_client.adb_path, '-s', instance_serial(port, adb_client.host), 'exec-out', *command,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout or adb_client.timeout)
+    except asyncio.TimeoutError:
+        raise AdbError(f"{instance_serial(port, adb_client.host)}: screencap timed out")
+    finally:
+        # Timed out or cancelled by Stop: don't leave adb running
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    if process.returncode != 0:
+        raise AdbError(f"{instance_serial(port, adb_client.host)}: {stderr.decode('utf-8', errors='replace').strip()}")
+    return parse_raw_screencap(stdout) if mode == 'raw' else decode_png(stdout)
+
+
+class AsyncMonitorEngine:
+    """Background asyncio loop running one coroutine per instance for each monitoring cycle"""
+
+    def __init__(self, capture_workers=4, detection_workers=2, log=print):
+        self.capture_pool = ThreadPoolExecutor(max_workers=max(1, capture_workers), thread_name_prefix='async-capture')
+        self.detection_pool = ThreadPoolExecutor(max_workers=max(1, detection_workers), thread_name_prefix='async-detect')
+        self.log = log
+        self.loop = None
+        self._thread = None
+        self._cycle = None  # concurrent Future of the running cycle
+        self._cycle_task = None  # Its asyncio task, cancelled by stop()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the event loop thread"""
+        if self._thread is not None:
+            return
+        ready = threading.Event()
+
+        def run_loop():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            ready.set()
+            self.loop.run_forever()
+            self.loop.close()
+
+        self._thread = threading.Thread(target=run_loop, name='async-monitor', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def close(self):
+        """Cancel any running cycle, stop the loop and the worker pools"""
+        self.stop()
+        if self._thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self._thread = None
+        self.capture_pool.shutdown(wait=False)
+        self.detection_pool.shutdown(wait=False)
+
+    def run_cycle(self, instances, timings, duration, capture, on_frame, is_active=None):
+        """Run one cycle and block until it ends; returns False if it was stopped
+
+        instances is a list of (instance id, port). At every timing mark
+        (seconds from now) each instance still active (is_active(id)) is
+        captured with the coroutine capture(port) and the frame passed to
+        on_frame(instance_id, port, timing, frame, captured_at, lateness)
+        in the detection pool. The cycle lasts at least duration seconds.
+        """
+        with self._lock:
+            self._cycle = asyncio.run_coroutine_threadsafe(
+                self._run_cycle(instances, timings, duration, capture, on_frame, is_active), self.loop
+            )
+            cycle = self._cycle
+        try:
+            cycle.result()
+            return True
+        except CancelledError:
+            return False
+        finally:
+            with self._lock:
+                self._cycle = None
+
+    def stop(self):
+        """Cancel the running cycle (safe to call from any thread)
+
+        The cycle's task is cancelled inside the loop, so run_cycle() only
+        returns once every instance coroutine has been cleaned up.
+        """
+        with self._lock:
+            if self._cycle is not None:
+                self.loop.call_soon_threadsafe(self._cancel_cycle)
+
+    def _cancel_cycle(self):
+        if self._cycle_task is not None:
+            self._cycle_task.cancel()
+        elif self._cycle is not None and not self._cycle.done():
+            # Stopped before the cycle's first step: try again once it has started
+            self.loop.call_soon(self._cancel_cycle)
+
+    async def _run_cycle(self, instances, timings, duration, capture, on_frame, is_active):
+        self._cycle_task = asyncio.current_task()
+        start = self.loop.time()
+        tasks = [
+            asyncio.ensure_future(self._run_instance(instance_id, port, timings, start, capture, on_frame, is_active))
+            for instance_id, port in instances
+        ]
+        try:
+            await asyncio.gather(*tasks)
+            remaining = start + duration - self.loop.time()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._cycle_task = None
+
+    async def _run_instance(self, instance_id, port, timings, start, capture, on_frame, is_active):
+        for timing in sorted(timings):
+            deadline = start + timing
+            delay = deadline - self.loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if is_active is not None and not is_active(instance_id):
+                return
+
+            lateness = self.loop.time() - deadline
+            captured_at = time.time()
+            try:
+                frame = await capture(port)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.log(f"Error taking screenshot from instance {instance_id}: {str(e)}")
+                continue
+
+            try:
+                await self.loop.run_in_executor(
+                    self.detection_pool, on_frame, instance_id, port, timing, frame, captured_at, lateness
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.log(f"Error scanning instance {instance_id}: {str(e)}")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark Feature Backends
+Runs smart detection over every screenshot in saved_images with each
+feature backend and reports per-frame latency and how often each binary
+backend agrees with SIFT on hits and misses
+"""
+
+import os
+import sys
+import io
+import time
+import contextlib
+import cv2
+import numpy as np
+from smart_character_detection import SmartCharacterDetector, FEATURE_BACKENDS
+from detection_roi import card_slot_roi
+
+
+def run_backend(backend, frames, confidence_threshold):
+    """Detect in every frame with one backend, returning {file: (hit count, seconds)}"""
+    try:
+        detector = SmartCharacterDetector(confidence_threshold, roi_rects=card_slot_roi(), backend=backend)
+    except Exception as e:
+        print(f"⚠️  Skipping {backend}: {str(e)}")
+        return None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not detector.learn_character():
+            print(f"ERROR: Could not learn the character with {backend}")
+            return None
+    print(f"{backend}: learned {len(detector.character_points)} features in {time.perf_counter() - start:.1f}s")
+
+    results = {}
+    for file, frame in frames:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            detections = detector.detect_character(frame)
+        elapsed = time.perf_counter() - start
+        results[file] = (sum(1 for d in detections if d['confidence'] >= confidence_threshold), elapsed)
+    return results
+
+
+def show_latency(all_results):
+    print("\n--- Latency per frame ---")
+    for backend, results in all_results.items():
+        times = np.array([elapsed for _, elapsed in results.values()]) * 1000
+        print(f"  {backend:6s} mean {times.mean():6.0f}ms  p50 {np.percentile(times, 50):6.0f}ms  "
+              f"p95 {np.percentile(times, 95):6.0f}ms")
+
+
+def show_agreement(all_results):
+    """Compare hit/miss per frame and hit counts against SIFT"""
+    reference = all_results['sift']
+    print("\n--- Agreement with sift ---")
+    for backend, results in all_results.items():
+        if backend == 'sift':
+            continue
+        same = missed = extra = same_count = 0
+        for file, (count, _) in reference.items():
+            other = results[file][0]
+            if (count > 0) == (other > 0):
+                same += 1
+            elif count > 0:
+                missed += 1
+            else:
+                extra += 1
+            same_count += count == other
+        print(f"  {backend:6s} hit/miss agrees on {same}/{len(reference)} frames "
+              f"(missed {missed}, extra {extra}), same hit count on {same_count}")
+
+
+def main():
+    saved_images_dir = sys.argv[1] if len(sys.argv) > 1 else "saved_images"
+    confidence_threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.85
+
+    print("=== BENCHMARKING FEATURE BACKENDS ===")
+    print(f"Hits are detections at confidence >= {confidence_threshold}, card-slot ROI")
+
+    frames = []
+    for file in sorted(f for f in os.listdir(saved_images_dir) if f.lower().endswith('.png')):
+        frame = cv2.imread(os.path.join(saved_images_dir, file))
+        if frame is not None:
+            frames.append((file, frame))
+    print(f"Loaded {len(frames)} screenshots from '{saved_images_dir}'")
+
+    all_results = {}
+    for backend in FEATURE_BACKENDS:
+        results = run_backend(backend, frames, confidence_threshold)
+        if results is not None:
+            all_results[backend] = results
+
+    if 'sift' not in all_results:
+        return
+    show_latency(all_results)
+    show_agreement(all_results)
+
+    print("\n--- Hits per backend ---")
+    for backend, results in all_results.items():
+        hits = sum(count for count, _ in results.values())
+        frames_hit = sum(count > 0 for count, _ in results.values())
+        print(f"  {backend:6s} {hits} hits on {frames_hit} frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Capture Scheduler
+Fires screenshot captures on monotonic deadlines instead of polling
+
+Every capture is an event (deadline, instance, timing mark) in one heap.
+next_due() sleeps on an Event until the earliest deadline, or until stop()
+is called, and returns every event due by then as one batch, so all
+instances of a mark are captured together. Deadlines are absolute from
+the cycle start: a slow mark makes the next one late but never shifts
+the marks after it.
+
+Marks that are already missed when they come out are handled by the
+late policy:
+- 'capture': capture them anyway
+- 'compress': of several missed marks for the same instance, only the
+  latest is captured
+- 'skip': events more than max_lateness late are dropped
+
+The lateness of every event fired and the compressed/skipped counts are
+kept for report().
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+LATE_POLICIES = ('capture', 'compress', 'skip')
+MAX_LATENESS = 2.0  # Seconds late before the 'skip' policy drops a capture
+
+# Event.wait can oversleep by a timer tick (~15ms on Windows), so the last stretch before a deadline is spun
+SPIN_MARGIN = 0.015
+
+
+class CaptureScheduler:
+    """Heap of upcoming capture events, fired on time with Event waits"""
+
+    def __init__(self, late_policy='compress', max_lateness=MAX_LATENESS, stop_event=None, clock=time.monotonic):
+        if late_policy not in LATE_POLICIES:
+            raise ValueError(f"Unknown late policy '{late_policy}' (expected one of {', '.join(LATE_POLICIES)})")
+        self.late_policy = late_policy
+        self.max_lateness = max_lateness
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.clock = clock
+
+        self._heap = []  # (deadline, sequence, instance id, timing mark)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()  # Set when the earliest deadline may have changed or on stop
+        self.reset_stats()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+    def schedule(self, deadline, instance_id, timing):
+        """Add one capture at a clock() deadline"""
+        with self._lock:
+            heapq.heappush(self._heap, (deadline, next(self._sequence), instance_id, timing))
+        self._wakeup.set()
+
+    def schedule_marks(self, start, timings, instance_ids):
+        """Add a capture of every instance at start + each timing mark (seconds)"""
+        for timing in timings:
+            for instance_id in instance_ids:
+                self.schedule(start + timing, instance_id, timing)
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+        self._wakeup.set()
+
+    def stop(self):
+        """Wake any waiting next_due()/wait_until() and make them return at once"""
+        self.stop_event.set()
+        self._wakeup.set()
+
+    def stopped(self):
+        return self.stop_event.is_set()
+
+    def wait_until(self, deadline):
+        """Sleep until a clock() deadline; returns False if stopped first"""
+        while not self.stopped():
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return True
+            if remaining > SPIN_MARGIN:
+                self.stop_event.wait(remaining - SPIN_MARGIN)
+            else:
+                time.sleep(0)
+        return False
+
+    def next_due(self):
+        """Wait for the next deadline and return the events due, oldest mark first
+
+        Each event is a dict with 'deadline', 'instance_id', 'timing' and
+        'lateness' (seconds after its deadline). Returns [] once stopped or
+        when nothing is scheduled.
+        """
+        while not self.stopped():
+            with self._lock:
+                if not self._heap:
+                    return []
+                deadline = self._heap[0][0]
+                self._wakeup.clear()
+
+            # Coarse wait, cut short if an earlier event is scheduled or we are stopped
+            remaining = deadline - self.clock()
+            if remaining > SPIN_MARGIN:
+                self._wakeup.wait(remaining - SPIN_MARGIN)
+                continue
+            if not self.wait_until(deadline):
+                return []
+
+            now = self.clock()
+            with self._lock:
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    event_deadline, _, instance_id, timing = heapq.heappop(self._heap)
+                    due.append({'deadline': event_deadline, 'instance_id': instance_id,
+                                'timing': timing, 'lateness': now - event_deadline})
+            events = self._apply_late_policy(due)
+            if events:
+                return events
+        return []
+
+    def _apply_late_policy(self, due):
+        kept = due
+        compressed = skipped = 0
+        if self.late_policy == 'compress':
+            latest = {}
+            for event in due:
+                current = latest.get(event['instance_id'])
+                if current is None or event['deadline'] > current['deadline']:
+                    latest[event['instance_id']] = event
+            kept = [event for event in due if latest[event['instance_id']] is event]
+            compressed = len(due) - len(kept)
+        elif self.late_policy == 'skip':
+            kept = [event for event in due if event['lateness'] <= self.max_lateness]
+            skipped = len(due) - len(kept)
+
+        kept.sort(key=lambda event: (event['timing'], event['instance_id']))
+        with self._lock:
+            self.stats['lateness'].extend(event['lateness'] for event in kept)
+            self.stats['compressed'] += compressed
+            self.stats['skipped'] += skipped
+        return kept
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {'lateness': [], 'compressed': 0, 'skipped': 0}
+
+    def report(self):
+        """Capture lateness and dropped marks, as printable lines"""
+        with self._lock:
+            lateness = sorted(self.stats['lateness'])
+            compressed = self.stats['compressed']
+            skipped = self.stats['skipped']
+        if not lateness:
+            return ["Capture schedule: no captures fired"]
+
+        p95 = lateness[min(len(lateness) - 1, int(len(lateness) * 0.95))]
+        line = (f"Capture schedule: {len(lateness)} captures, lateness mean {sum(lateness) / len(lateness) * 1000:.1f}ms, "
+                f"p95 {p95 * 1000:.1f}ms, max {lateness[-1] * 1000:.1f}ms")
+        if compressed or skipped:
+            line += f" ({compressed} missed marks compressed, {skipped} skipped)"
+        return [line]
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Card Slot Classifier
+Identifies the card in every slot of the scout result screen by looking up
+a perceptual hash of the slot's portrait in an index of known cards
+
+The index is a folder of labelled slot crops (card_index/<Name>/*.png),
+whose hashes are kept in a persistent CardHashIndex (card_index/.hash_index)
+so only new or changed images are hashed on start-up.
+harvest() fills it from saved_images: every distinct card is written to
+card_index/_unsorted/ to be moved into a named folder. While monitoring,
+cards the smart detector is sure about in a slot the index doesn't know
+yet are saved to card_index/_unsorted/<Name>/ (learn_from_detections);
+they are only used for lookups once moved into card_index/<Name>/, so a
+false detection can't label a card wrongly.
+
+Run this file to harvest the index (python card_classifier.py harvest
+[saved_images]) or to classify a screenshot (python card_classifier.py
+<screenshot>).
+"""
+
+import os
+import sys
+import csv
+import threading
+from datetime import datetime
+import cv2
+import numpy as np
+from screen_capture import to_bgr
+from detection_roi import CARD_SLOTS, REFERENCE_SIZE
+from card_hash_index import CardHashIndex, HASH_INDEX_DIRNAME
+
+CARD_INDEX_DIR = "card_index"
+UNSORTED_DIRNAME = "_unsorted"  # Harvested cards waiting for a name (not loaded into the index)
+DEFAULT_PULL_LOG = "pull_log.csv"
+
+# Part of a slot hashed, as (left, top, right, bottom) fractions; skips the rarity frame and NEW badge
+PORTRAIT_BOX = (0.12, 0.12, 0.88, 0.94)
+
+# pHash: 8x8 low-frequency DCT coefficients of a 32x32 grayscale portrait, 64 bits
+HASH_INPUT_SIZE = 32
+HASH_SIZE = 8
+
+# Largest Hamming distance (out of 64 bits) still counted as the same card.
+# The same card on different saved_images frames is 0-8 bits apart, different cards ~28.
+CARD_MATCH_DISTANCE = 10
+
+# Smart detection confidence needed to suggest a card for the index (0.95 is the cap, 9+ clustered matches)
+AUTO_LEARN_CONFIDENCE = 0.95
+AUTO_LEARN_METHOD = 'smart_detection'
+
+
+def slot_crops(frame, slots=CARD_SLOTS):
+    """Cut the portrait of every card slot out of a BGR/RGBA frame"""
+    frame = to_bgr(frame) if frame.ndim == 3 and frame.shape[2] == 4 else frame
+    height, width = frame.shape[:2]
+    scale_x = width / REFERENCE_SIZE[0]
+    scale_y = height / REFERENCE_SIZE[1]
+    left, top, right, bottom = PORTRAIT_BOX
+
+    crops = []
+    for x, y, w, h in slots:
+        x1, y1 = int((x + w * left) * scale_x), int((y + h * top) * scale_y)
+        x2, y2 = int((x + w * right) * scale_x), int((y + h * bottom) * scale_y)
+        crops.append(frame[max(0, y1):min(height, y2), max(0, x1):min(width, x2)])
+    return crops
+
+
+def card_hash(crop):
+    """64-bit perceptual hash of a card portrait, as 8 packed bytes"""
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    small = cv2.resize(gray, (HASH_INPUT_SIZE, HASH_INPUT_SIZE), interpolation=cv2.INTER_AREA)
+    coefficients = cv2.dct(small.astype(np.float32))[:HASH_SIZE, :HASH_SIZE].flatten()
+    return np.packbits(coefficients > np.median(coefficients))
+
+
+def hash_image_file(path):
+    """Hash of a saved card portrait, or None if it can't be read"""
+    image = cv2.imread(path)
+    return card_hash(image) if image is not None else None
+
+
+class CardSlotClassifier:
+    """Looks up each result-screen slot in an index of known card portraits"""
+
+    def __init__(self, max_distance=CARD_MATCH_DISTANCE, slots=CARD_SLOTS):
+        self.max_distance = max_distance
+        self.slots = slots
+        self.index = CardHashIndex()  # In memory until learn() opens the one on disk
+        self.index_dir = None
+        self.suggested = None  # Cards waiting in _unsorted/, loaded by the first learn_from_detections()
+
+    @property
+    def names(self):
+        """Character name of every known card"""
+        return self.index.names()
+
+    def learn(self, index_dir=CARD_INDEX_DIR):
+        """Load the labelled cards in index_dir/<Name>/, hashing only new or changed images"""
+        self.index_dir = index_dir
+        self.index = CardHashIndex(os.path.join(index_dir, HASH_INDEX_DIRNAME))
+        if not os.path.isdir(index_dir):
+            return False
+        self.index.sync(index_dir, hash_image_file)
+        return len(self.index) > 0
+
+    def add(self, name, crop, source=None):
+        """Add one labelled card portrait; source is its saved file, which makes the addition persistent"""
+        self.index.add(card_hash(crop), name, *self._file_info(source))
+        if source is not None:
+            self.index.save()
+
+    def lookup(self, card):
+        """(name, distance) of the closest known card within max_distance of a hash, or (None, None)"""
+        entry, distance = self.index.nearest(card, self.max_distance)
+        return (entry['name'] if entry else None), distance
+
+    def _file_info(self, path):
+        """(source relative to the index folder, mtime, size) as stored by CardHashIndex.sync"""
+        if path is None or self.index_dir is None:
+            return None, None, None
+        stat = os.stat(path)
+        return os.path.relpath(path, self.index_dir), stat.st_mtime, stat.st_size
+
+    def classify(self, frame):
+        """Identify the card in every slot
+
+        Returns one dict per slot with its 1-based 'slot' number, the
+        'character' name (None if unknown), the Hamming 'distance' to the
+        closest known card (None if none is within max_distance), the
+        'hash' as hex, and the slot center 'location' and 'rect'.
+        """
+        height, width = frame.shape[:2]
+        scale_x = width / REFERENCE_SIZE[0]
+        scale_y = height / REFERENCE_SIZE[1]
+
+        results = []
+        for i, (crop, (x, y, w, h)) in enumerate(zip(slot_crops(frame, self.slots), self.slots)):
+            card = card_hash(crop)
+            name, distance = self.lookup(card)
+            results.append({
+                'slot': i + 1,
+                'character': name,
+                'distance': distance,
+                'hash': card.tobytes().hex(),
+                'location': (int((x + w / 2) * scale_x), int((y + h / 2) * scale_y)),
+                'rect': (int(x * scale_x), int(y * scale_y), int(w * scale_x), int(h * scale_y)),
+            })
+        return results
+
+    def learn_from_detections(self, frame, slots, detections, index_dir=CARD_INDEX_DIR,
+                              min_confidence=AUTO_LEARN_CONFIDENCE):
+        """Save unknown slots that hold a confident smart detection for review
+
+        slots is classify()'s result for the same frame. Each new card is
+        saved to index_dir/_unsorted/<character>/ unless it is already
+        waiting there; the index itself is left alone until the card is
+        moved into index_dir/<character>/. Returns the names of the
+        characters suggested.
+        """
+        unsorted_dir = os.path.join(index_dir, UNSORTED_DIRNAME)
+        if self.suggested is None:
+            self.suggested = CardHashIndex()
+            for name, image in unsorted_cards(unsorted_dir):
+                self.suggested.add(card_hash(image), name)
+
+        confident = [d for d in detections
+                     if d.get('method') == AUTO_LEARN_METHOD and d['confidence'] >= min_confidence]
+        suggested = []
+        crops = None
+        for s in slots:
+            if s['character'] is not None:
+                continue
+            x, y, w, h = s['rect']
+            for d in confident:
+                dx, dy = d['location']
+                if x <= dx < x + w and y <= dy < y + h:
+                    card = np.frombuffer(bytes.fromhex(s['hash']), dtype=np.uint8)
+                    if self.suggested.nearest(card, self.max_distance)[0] is not None:
+                        break
+                    if crops is None:
+                        crops = slot_crops(frame, self.slots)
+                    folder = os.path.join(unsorted_dir, d['template'])
+                    os.makedirs(folder, exist_ok=True)
+                    cv2.imwrite(os.path.join(folder, f"{s['hash']}.png"), crops[s['slot'] - 1])
+                    self.suggested.add(card, d['template'])
+                    suggested.append(d['template'])
+                    break
+        return suggested
+
+
+def unsorted_cards(unsorted_dir):
+    """(suggested name or None, image) of every card waiting in unsorted_dir or its <Name>/ subfolders"""
+    if not os.path.isdir(unsorted_dir):
+        return
+    for entry in sorted(os.listdir(unsorted_dir)):
+        path = os.path.join(unsorted_dir, entry)
+        if os.path.isdir(path):
+            files = [(entry, os.path.join(path, file)) for file in sorted(os.listdir(path))]
+        else:
+            files = [(None, path)]
+        for name, file in files:
+            image = cv2.imread(file)
+            if image is not None:
+                yield name, image
+
+
+class PullLog:
+    """CSV log of every card pulled, one row per slot, written once per distinct result screen per instance"""
+
+    FIELDS = ['time', 'instance', 'cycle', 'timing', 'slot', 'character', 'distance', 'hash']
+
+    def __init__(self, path=DEFAULT_PULL_LOG, max_distance=CARD_MATCH_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self._last = {}  # instance -> hashes of the last screen logged
+        self._lock = threading.Lock()
+
+    def record(self, instance_id, cycle, timing, slots):
+        """Append the classified slots of one frame, unless it shows the screen already logged for the instance
+
+        Returns True if rows were written.
+        """
+        hashes = np.array([np.frombuffer(bytes.fromhex(s['hash']), dtype=np.uint8) for s in slots])
+        with self._lock:
+            last = self._last.get(instance_id)
+            if last is not None and len(last) == len(hashes):
+                if np.all(np.unpackbits(np.bitwise_xor(last, hashes), axis=1).sum(axis=1) <= self.max_distance):
+                    return False
+            self._last[instance_id] = hashes
+
+            new_file = not os.path.exists(self.path)
+            with open(self.path, 'a', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+                if new_file:
+                    writer.writeheader()
+                now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                for s in slots:
+                    writer.writerow({
+                        'time': now,
+                        'instance': instance_id,
+                        'cycle': cycle,
+                        'timing': timing,
+                        'slot': s['slot'],
+                        'character': s['character'] or '',
+                        'distance': '' if s['distance'] is None else s['distance'],
+                        'hash': s['hash'],
+                    })
+        return True
+
+    def reset(self):
+        """Forget the last screen of every instance (e.g. at the start of a cycle)"""
+        with self._lock:
+            self._last = {}
+
+
+def summarize_slots(slots):
+    """Short text like 'Kita x2, unknown x8' for a classified frame"""
+    counts = {}
+    for s in slots:
+        name = s['character'] or 'unknown'
+        counts[name] = counts.get(name, 0) + 1
+    return ', '.join(f"{name} x{count}" for name, count in sorted(counts.items(), key=lambda c: c[0] == 'unknown'))
+
+
+def harvest(saved_images_dir="saved_images", index_dir=CARD_INDEX_DIR):
+    """Write every distinct card seen in saved_images to index_dir/_unsorted/
+
+    Annotated screenshots are skipped (the markers cover the cards), as are
+    cards already in the index or already waiting in _unsorted/ (or one of
+    its suggestion folders). Returns
+    the number of cards written.
+    """
+    known = CardSlotClassifier()
+    known.learn(index_dir)
+    unsorted_dir = os.path.join(index_dir, UNSORTED_DIRNAME)
+    for _, image in unsorted_cards(unsorted_dir):
+        known.add(UNSORTED_DIRNAME, image)
+
+    added = 0
+    for file in sorted(os.listdir(saved_images_dir)):
+        if '_ANNOTATED_' in file or not file.lower().endswith('.png'):
+            continue
+        frame = cv2.imread(os.path.join(saved_images_dir, file))
+        if frame is None:
+            continue
+
+        for crop in slot_crops(frame):
+            card = card_hash(crop)
+            if known.lookup(card)[0] is not None:
+                continue
+            os.makedirs(unsorted_dir, exist_ok=True)
+            cv2.imwrite(os.path.join(unsorted_dir, f"{card.tobytes().hex()}.png"), crop)
+            known.add(UNSORTED_DIRNAME, crop)
+            added += 1
+
+    return added
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'harvest':
+        saved_images_dir = sys.argv[2] if len(sys.argv) > 2 else "saved_images"
+        print("=== HARVESTING CARD INDEX ===")
+        added = harvest(saved_images_dir)
+        unsorted_dir = os.path.join(CARD_INDEX_DIR, UNSORTED_DIRNAME)
+        if added:
+            print(f"✅ {added} new cards in {unsorted_dir}")
+            print(f"Move them into {CARD_INDEX_DIR}/<Name>/ folders to label them")
+        else:
+            print("No new cards found")
+        return
+
+    if len(sys.argv) < 2:
+        print("Usage: python card_classifier.py harvest [saved_images] | <screenshot>")
+        return
+
+    classifier = CardSlotClassifier()
+    if not classifier.learn():
+        print(f"ERROR: No labelled cards in '{CARD_INDEX_DIR}' (run 'python card_classifier.py harvest' first)")
+        return
+
+    frame = cv2.imread(sys.argv[1])
+    if frame is None:
+        print(f"ERROR: Could not load screenshot: {sys.argv[1]}")
+        return
+
+    print(f"=== CLASSIFYING {os.path.basename(sys.argv[1])} ===")
+    slots = classifier.classify(frame)
+    for s in slots:
+        print(f"  Slot {s['slot']:2d}: {s['character'] or 'unknown'} (distance {s['distance']})")
+    print(f"🎯 {summarize_slots(slots)}")
+
+
+if __name__ == "__main__":
+    main()
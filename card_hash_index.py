@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Card Hash Index
+Persistent store of 64-bit card-art hashes with Hamming-distance lookup
+
+The index lives in a folder next to the card images (card_index/.hash_index):
+- hashes.npy: (N, 8) uint8 packed hashes, opened memory-mapped
+- metadata.json: one entry per hash with the character name and the
+  source image's path, modification time and size
+
+sync() brings the index in line with a folder of labelled images, hashing
+only images that are new or changed and dropping ones that are gone, so
+tools no longer rehash every card on start-up. Lookups go through a
+multi-index hash (see MultiIndexHash), so a lookup stays well under a
+millisecond even for thousands of cards.
+
+Run this file to sync card_index/ and show what it holds.
+"""
+
+import os
+import sys
+import json
+import threading
+from functools import lru_cache
+from itertools import combinations
+import numpy as np
+
+HASH_INDEX_DIRNAME = ".hash_index"
+HASH_BYTES = 8
+MIH_CHUNKS = 4  # 16-bit chunks; a radius of 10 then looks up 137 values per chunk
+INDEX_VERSION = 1
+
+
+def hash_to_int(card):
+    """Packed hash bytes as a Python int"""
+    return int.from_bytes(bytes(np.asarray(card, dtype=np.uint8)), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(bits, radius):
+    """Every mask of up to radius set bits within a bits-wide chunk"""
+    masks = []
+    for count in range(radius + 1):
+        for positions in combinations(range(bits), count):
+            mask = 0
+            for position in positions:
+                mask |= 1 << position
+            masks.append(mask)
+    return masks
+
+
+class MultiIndexHash:
+    """Multi-index hashing over 64-bit integer hashes under Hamming distance
+    
+    Each hash is split into MIH_CHUNKS chunks with one lookup table per
+    chunk. Two hashes within distance r must agree on some chunk to within
+    r // MIH_CHUNKS bits (pigeonhole), so a search only looks up the
+    chunk values that close to the query's and checks those candidates.
+    """
+
+    def __init__(self, chunks=MIH_CHUNKS, bits=HASH_BYTES * 8):
+        self.chunks = chunks
+        self.chunk_bits = bits // chunks
+        self.chunk_mask = (1 << self.chunk_bits) - 1
+        self.tables = [{} for _ in range(chunks)]  # chunk value -> [entry ids]
+        self.values = {}  # entry id -> hash
+
+    def _chunks(self, value):
+        return [(value >> (i * self.chunk_bits)) & self.chunk_mask for i in range(self.chunks)]
+
+    def add(self, value, entry_id):
+        self.values[entry_id] = value
+        for table, chunk in zip(self.tables, self._chunks(value)):
+            table.setdefault(chunk, []).append(entry_id)
+
+    def search(self, value, max_distance):
+        """[(distance, entry id)] for every stored hash within max_distance, closest first"""
+        masks = _flip_masks(self.chunk_bits, max_distance // self.chunks)
+        candidates = set()
+        for table, chunk in zip(self.tables, self._chunks(value)):
+            for mask in masks:
+                ids = table.get(chunk ^ mask)
+                if ids:
+                    candidates.update(ids)
+
+        found = []
+        for entry_id in candidates:
+            distance = hamming(value, self.values[entry_id])
+            if distance <= max_distance:
+                found.append((distance, entry_id))
+        found.sort()
+        return found
+
+
+class CardHashIndex:
+    """Directory-backed hash index with incremental add/remove and multi-index Hamming search"""
+
+    def __init__(self, directory=None):
+        self.directory = directory  # None keeps the index in memory only
+        self.hashes_file = os.path.join(directory, "hashes.npy") if directory else None
+        self.metadata_file = os.path.join(directory, "metadata.json") if directory else None
+        self.hashes = np.empty((0, HASH_BYTES), dtype=np.uint8)
+        self.entries = []  # {'name', 'source', 'mtime', 'size'} per hash row
+        self.lookup_table = MultiIndexHash()
+        self._lock = threading.Lock()  # Detection threads add cards while others search
+        self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        """Open the index from disk (an empty index if there is none or it is unreadable)"""
+        hashes = np.empty((0, HASH_BYTES), dtype=np.uint8)
+        entries = []
+        try:
+            if self.directory and os.path.exists(self.metadata_file) and os.path.exists(self.hashes_file):
+                with open(self.metadata_file, 'r') as f:
+                    metadata = json.load(f)
+                if metadata.get('version') == INDEX_VERSION:
+                    mapped = np.load(self.hashes_file, mmap_mode='r')
+                    if mapped.shape == (len(metadata['entries']), HASH_BYTES):
+                        hashes, entries = mapped, metadata['entries']
+        except Exception as e:
+            print(f"Warning: Could not read card hash index in {self.directory}: {str(e)}")
+
+        with self._lock:
+            self.hashes = hashes
+            self.entries = entries
+            self.lookup_table = self._build_lookup(hashes)
+
+    def save(self):
+        """Write the index atomically"""
+        if not self.directory:
+            return
+        with self._lock:
+            hashes = np.array(self.hashes, dtype=np.uint8)  # Copy out of the memory map before replacing its file
+            entries = list(self.entries)
+            self.hashes = hashes
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_hashes = self.hashes_file + ".tmp.npy"
+            np.save(temp_hashes, hashes)
+            os.replace(temp_hashes, self.hashes_file)
+            temp_metadata = self.metadata_file + ".tmp"
+            with open(temp_metadata, 'w') as f:
+                json.dump({'version': INDEX_VERSION, 'entries': entries}, f, indent=1)
+            os.replace(temp_metadata, self.metadata_file)
+        except Exception as e:
+            print(f"Warning: Could not save card hash index to {self.directory}: {str(e)}")
+
+    def add(self, card, name, source=None, mtime=None, size=None):
+        """Add one hash (8 packed bytes) with its character name; call save() to persist"""
+        card = np.asarray(card, dtype=np.uint8).reshape(1, HASH_BYTES)
+        with self._lock:
+            entry_id = len(self.entries)
+            self.hashes = np.vstack([self.hashes, card])
+            self.entries = self.entries + [{'name': name, 'source': source, 'mtime': mtime, 'size': size}]
+            self.lookup_table.add(hash_to_int(card[0]), entry_id)
+        return entry_id
+
+    def remove(self, sources):
+        """Drop every entry whose source is in sources; call save() to persist"""
+        sources = set(sources)
+        with self._lock:
+            keep = [i for i, entry in enumerate(self.entries) if entry['source'] not in sources]
+            removed = len(self.entries) - len(keep)
+            if removed:
+                self.hashes = np.array(self.hashes[keep], dtype=np.uint8).reshape(-1, HASH_BYTES)
+                self.entries = [self.entries[i] for i in keep]
+                self.lookup_table = self._build_lookup(self.hashes)
+        return removed
+
+    def search(self, card, max_distance):
+        """[(distance, entry)] within max_distance of a hash, closest first"""
+        value = hash_to_int(card)
+        with self._lock:
+            return [(distance, self.entries[i]) for distance, i in self.lookup_table.search(value, max_distance)]
+
+    def nearest(self, card, max_distance):
+        """(entry, distance) of the closest hash within max_distance, or (None, None)"""
+        found = self.search(card, max_distance)
+        return (found[0][1], found[0][0]) if found else (None, None)
+
+    def names(self):
+        return [entry['name'] for entry in self.entries]
+
+    def sync(self, image_dir, hash_image, skip=('_', '.')):
+        """Match the index to the labelled images in image_dir/<Name>/
+
+        hash_image(path) returns the 8-byte hash of an image file, or None
+        if it can't be read. Only images that are new or changed since the
+        last sync are hashed. Folders starting with a skip prefix are
+        ignored. Returns (added, removed) and saves when anything changed.
+        """
+        current = {}
+        if os.path.isdir(image_dir):
+            for name in sorted(os.listdir(image_dir)):
+                folder = os.path.join(image_dir, name)
+                if not os.path.isdir(folder) or name.startswith(skip):
+                    continue
+                for file in sorted(os.listdir(folder)):
+                    if file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+                        path = os.path.join(folder, file)
+                        stat = os.stat(path)
+                        current[os.path.relpath(path, image_dir)] = (name, stat.st_mtime, stat.st_size)
+
+        indexed = {entry['source']: entry for entry in self.entries}
+        stale = [
+            source for source, entry in indexed.items()
+            if current.get(source) != (entry['name'], entry['mtime'], entry['size'])
+        ]
+        removed = self.remove(stale)
+
+        added = 0
+        for source, (name, mtime, size) in current.items():
+            if source in indexed and source not in stale:
+                continue
+            card = hash_image(os.path.join(image_dir, source))
+            if card is not None:
+                self.add(card, name, source, mtime, size)
+                added += 1
+
+        if added or removed:
+            self.save()
+        return added, removed
+
+    def _build_lookup(self, hashes):
+        lookup = MultiIndexHash()
+        for i, card in enumerate(np.asarray(hashes)):
+            lookup.add(hash_to_int(card), i)
+        return lookup
+
+
+def main():
+    from card_classifier import CARD_INDEX_DIR, hash_image_file
+
+    index_dir = sys.argv[1] if len(sys.argv) > 1 else CARD_INDEX_DIR
+    print("=== SYNCING CARD HASH INDEX ===")
+    index = CardHashIndex(os.path.join(index_dir, HASH_INDEX_DIRNAME))
+    added, removed = index.sync(index_dir, hash_image_file)
+    print(f"Added {added}, removed {removed}, {len(index)} cards indexed")
+
+    counts = {}
+    for name in index.names():
+        counts[name] = counts.get(name, 0) + 1
+    for name, count in sorted(counts.items()):
+        print(f"  {name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
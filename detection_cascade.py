@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Detection Cascade
+One detector interface over every detection method, run cheapest first
+
+Each method is a stage plugin with an estimated cost in milliseconds:
+- 'prefilter': histogram/NCC checks on the card slots (PrefilterCascade)
+- 'template': coarse-to-fine template matching (ImageRecognition)
+- 'smart': clustered SIFT matching (SmartCharacterDetector)
+- 'feature': per-template SIFT matching (ImageRecognition)
+- 'ocr': OCR of the text regions (ImageRecognition); it reads rarity
+  badges, not character names, so it can only reject
+
+Stages run in order of cost: the estimate until a stage has run
+COST_SAMPLES times, its measured average after that. Every stage returns
+a score (its best confidence) and its detections, and the cascade stops at
+the first stage whose score reaches its accept threshold (returning that
+stage's detections) or falls below its reject threshold (returning none).
+A frame no stage decides returns no detections either. Template and
+feature detections are labelled with the character name of their image,
+like smart detections.
+
+The smart stage only decides clear cases: no cluster rejects and a
+cluster of 7+ matches accepts. The smallest clusters (SMART_UNSURE_BAND)
+are left undecided, so they only count if feature matching confirms them.
+
+Per-stage timings and accept/reject counts are kept so report() shows
+which stages pay for themselves. The monitor uses the cascade when its
+Detection Method is 'cascade'; run this file to run it over saved_images
+and print them.
+"""
+
+import os
+import sys
+import time
+import threading
+import cv2
+import pytesseract
+from screen_capture import to_bgr
+from smart_character_detection import SmartCharacterDetector, list_character_images
+from prefilter import PrefilterCascade
+from detection_roi import card_slot_roi
+from image_recognition import get_recognizer
+
+CASCADE_STAGES = ('prefilter', 'template', 'smart', 'feature', 'ocr')
+
+# How the monitor detects characters: the smart detector alone, or the cascade around it
+DETECTION_METHODS = ('smart', 'cascade')
+
+# Smart scores in [low, high) are inconclusive: the smallest clusters group_points_by_location
+# accepts (5-6 matches, confidence 0.75-0.80). Lower means no cluster at all.
+SMART_UNSURE_BAND = (0.75, 0.85)
+
+# Runs before a stage's measured average replaces its estimated cost
+COST_SAMPLES = 5
+
+
+class DetectionStage:
+    """Base class for cascade plugins
+
+    Subclasses set name and cost (estimated milliseconds per frame) and
+    implement run(). accept/reject are score thresholds; None disables that
+    decision for the stage.
+    """
+
+    name = 'stage'
+    cost = 1.0
+
+    def __init__(self, accept=None, reject=None):
+        self.accept = accept
+        self.reject = reject
+
+    def prepare(self, character_images_dir="characters"):
+        """Learn whatever the stage needs from the character images; False disables the stage"""
+        return True
+
+    def run(self, frame):
+        """Return (score, detections) for a BGR frame"""
+        raise NotImplementedError
+
+    def decide(self, score):
+        """'accept', 'reject' or None (undecided) for a score"""
+        if self.accept is not None and score >= self.accept:
+            return 'accept'
+        if self.reject is not None and score < self.reject:
+            return 'reject'
+        return None
+
+
+def _best_confidence(detections):
+    return max((d['confidence'] for d in detections), default=0.0)
+
+
+class PrefilterStage(DetectionStage):
+    """Rejects frames whose card slots look nothing like the characters (score 1 if the frame passes, 0 if not)"""
+
+    name = 'prefilter'
+    cost = 5.0
+
+    def __init__(self, accept=None, reject=0.5, stages=None):
+        super().__init__(accept, reject)
+        self.prefilter = PrefilterCascade(stages)
+
+    def prepare(self, character_images_dir="characters"):
+        return self.prefilter.learn(character_images_dir)
+
+    def run(self, frame):
+        passed, _ = self.prefilter.check(frame)
+        return (1.0 if passed else 0.0), []
+
+
+class _RecognitionStage(DetectionStage):
+    """Shared set-up for stages backed by a warm ImageRecognition"""
+
+    template_mode = 'exhaustive'
+
+    def __init__(self, confidence_threshold=0.7, accept=None, reject=None):
+        super().__init__(confidence_threshold if accept is None else accept, reject)
+        self.confidence_threshold = confidence_threshold
+        self.recognizer = None
+        self.templates = {}
+        self.characters = {}  # Template file name -> character name
+
+    def prepare(self, character_images_dir="characters"):
+        images = list_character_images(character_images_dir)
+        if not images:
+            return False
+        self.characters = {os.path.basename(path): name for name, path in images}
+        self.recognizer, self.templates = get_recognizer([path for _, path in images], self.confidence_threshold,
+                                                         self.template_mode)
+        return bool(self.templates)
+
+    def _label(self, detections):
+        """Name each detection after the character its template image belongs to"""
+        for detection in detections:
+            detection['template'] = self.characters.get(detection['template'], detection['template'])
+        return detections
+
+
+class TemplateStage(_RecognitionStage):
+    name = 'template'
+    cost = 10.0
+    template_mode = 'coarse_to_fine'
+
+    def run(self, frame):
+        detections = self._label(self.recognizer.match_templates(frame, self.templates))
+        return _best_confidence(detections), detections
+
+
+class FeatureStage(_RecognitionStage):
+    name = 'feature'
+    cost = 1000.0
+
+    def run(self, frame):
+        detections = self._label(self.recognizer.match_features(frame, self.templates))
+        return _best_confidence(detections), detections
+
+
+class OcrStage(_RecognitionStage):
+    """OCR of the rarity badges; every result screen has them, so it never accepts (reject only)"""
+
+    name = 'ocr'
+    cost = 400.0
+
+    def __init__(self, confidence_threshold=0.7, reject=None):
+        super().__init__(confidence_threshold, reject=reject)
+        self.accept = None
+
+    def prepare(self, character_images_dir="characters"):
+        pytesseract.get_tesseract_version()  # Raises if the tesseract binary is missing
+        return super().prepare(character_images_dir)
+
+    def run(self, frame):
+        detections = self.recognizer.read_text(frame)
+        return _best_confidence(detections), detections
+
+
+class SmartStage(DetectionStage):
+    """Clustered SIFT over the card slots; no cluster rejects, a large one accepts, the smallest are undecided
+
+    detect is the detection function to use, e.g. the monitor's warm
+    detector's detect_character or DetectionService.detect. Without one the
+    stage learns its own quiet SmartCharacterDetector.
+    """
+
+    name = 'smart'
+    cost = 300.0
+
+    def __init__(self, confidence_threshold=0.7, accept=None, reject=None, backend='sift', detect=None,
+                 unsure_band=SMART_UNSURE_BAND):
+        super().__init__(max(confidence_threshold, unsure_band[1]) if accept is None else accept,
+                         unsure_band[0] if reject is None else reject)
+        self.detector = None
+        self.detect = detect
+        if detect is None:
+            self.detector = SmartCharacterDetector(confidence_threshold, roi_rects=card_slot_roi(), backend=backend,
+                                                   verbose=False)
+            self.detect = self.detector.detect_character
+
+    def prepare(self, character_images_dir="characters"):
+        if self.detector is None:
+            return True  # The caller's detector is already learned
+        return self.detector.learn_character(character_images_dir)
+
+    def run(self, frame):
+        detections = self.detect(frame)
+        return _best_confidence(detections), detections
+
+
+STAGE_TYPES = {
+    'prefilter': PrefilterStage,
+    'template': TemplateStage,
+    'smart': SmartStage,
+    'feature': FeatureStage,
+    'ocr': OcrStage,
+}
+
+
+class DetectionCascade:
+    """Cost-ordered chain of detection stages with early accept/reject"""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def prepare(self, character_images_dir="characters"):
+        """Prepare every stage, dropping those that can't run; returns False if none are left"""
+        ready = []
+        for stage in self.stages:
+            try:
+                if stage.prepare(character_images_dir):
+                    ready.append(stage)
+                else:
+                    print(f"⚠️  Detection stage '{stage.name}' has nothing to learn from, disabling it")
+            except Exception as e:
+                print(f"⚠️  Detection stage '{stage.name}' failed to start, disabling it: {str(e)}")
+        self.stages = ready
+        return len(ready) > 0
+
+    def ordered_stages(self):
+        """Stages cheapest first, by measured average time once a stage has enough runs"""
+        with self._stats_lock:
+            costs = {}
+            for stage in self.stages:
+                stats = self.stats['stages'].get(stage.name)
+                if stats and stats['runs'] >= COST_SAMPLES:
+                    costs[stage.name] = stats['time'] / stats['runs'] * 1000
+                else:
+                    costs[stage.name] = stage.cost
+        return sorted(self.stages, key=lambda stage: costs[stage.name])
+
+    def detect(self, frame):
+        """Run stages until one accepts or rejects the frame
+
+        Returns the accepting stage's detections, with a 'stage' key naming
+        the stage; [] on a reject or if no stage decided.
+        """
+        if isinstance(frame, str):
+            frame_path = frame
+            frame = cv2.imread(frame_path)
+            if frame is None:
+                print(f"ERROR: Could not load screenshot: {frame_path}")
+                return []
+        elif frame.ndim == 3 and frame.shape[2] == 4:
+            frame = to_bgr(frame)
+
+        collected = []
+        decided_by = None
+        decision = None
+        for stage in self.ordered_stages():
+            start = time.perf_counter()
+            try:
+                score, detections = stage.run(frame)
+                decision = stage.decide(score)
+            except Exception as e:
+                print(f"Detection stage '{stage.name}' error: {str(e)}")
+                self._record(stage.name, time.perf_counter() - start, 'error')
+                continue
+            self._record(stage.name, time.perf_counter() - start, decision)
+
+            for detection in detections:
+                detection['stage'] = stage.name
+            if decision is not None:
+                decided_by = stage.name
+                if decision == 'accept':
+                    collected = detections
+                break
+
+        with self._stats_lock:
+            self.stats['frames'] += 1
+            if decided_by is None:
+                self.stats['undecided'] += 1
+
+        collected.sort(key=lambda d: d['confidence'], reverse=True)
+        return collected
+
+    def _record(self, name, seconds, decision):
+        with self._stats_lock:
+            stage = self.stats['stages'].setdefault(name, self._empty_stage())
+            stage['runs'] += 1
+            stage['time'] += seconds
+            if decision == 'accept':
+                stage['accepted'] += 1
+            elif decision == 'reject':
+                stage['rejected'] += 1
+            elif decision == 'error':
+                stage['errors'] += 1
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = {
+                'frames': 0,
+                'undecided': 0,
+                'stages': {stage.name: self._empty_stage() for stage in self.stages},
+            }
+
+    def _empty_stage(self):
+        return {'runs': 0, 'time': 0.0, 'accepted': 0, 'rejected': 0, 'errors': 0}
+
+    def report(self):
+        """Per-stage timing, decisions and estimated time saved, as printable lines
+
+        A stage's saving is the average time of the stages after it for
+        every frame it decided, minus its own total time. Stages that never
+        ran count at their estimated cost.
+        """
+        with self._stats_lock:
+            frames = self.stats['frames']
+            undecided = self.stats['undecided']
+            stages = {name: dict(stats) for name, stats in self.stats['stages'].items()}
+        if frames == 0:
+            return ["Cascade: no frames checked"]
+
+        ordered = self.ordered_stages()
+        order = [stage.name for stage in ordered]
+        average = {
+            stage.name: stages[stage.name]['time'] / stages[stage.name]['runs'] if stages[stage.name]['runs'] else stage.cost / 1000
+            for stage in ordered
+        }
+
+        lines = []
+        for i, name in enumerate(order):
+            stats = stages[name]
+            if not stats['runs']:
+                lines.append(f"Cascade {name}: never reached")
+                continue
+            decided = stats['accepted'] + stats['rejected']
+            saved = decided * sum(average[later] for later in order[i + 1:]) - stats['time']
+            line = (f"Cascade {name}: ran {stats['runs']}/{frames}, {average[name] * 1000:.1f}ms avg, "
+                    f"accepted {stats['accepted']}, rejected {stats['rejected']}, saved ~{saved:.1f}s")
+            if stats['errors']:
+                line += f", {stats['errors']} errors"
+            lines.append(line)
+        lines.append(f"Cascade total: {frames} frames, {frames - undecided} decided early")
+        return lines
+
+
+def build_cascade(stages=('prefilter', 'template', 'smart'), confidence_threshold=0.7):
+    """Cascade of the named stages with their default thresholds"""
+    for name in stages:
+        if name not in STAGE_TYPES:
+            raise ValueError(f"Unknown detection stage '{name}' (expected one of {', '.join(CASCADE_STAGES)})")
+    built = []
+    for name in stages:
+        if name == 'prefilter':
+            built.append(PrefilterStage())
+        else:
+            built.append(STAGE_TYPES[name](confidence_threshold))
+    return DetectionCascade(built)
+
+
+def main():
+    saved_images_dir = sys.argv[1] if len(sys.argv) > 1 else "saved_images"
+    stages = sys.argv[2].split(',') if len(sys.argv) > 2 else list(CASCADE_STAGES)
+    confidence_threshold = float(sys.argv[3]) if len(sys.argv) > 3 else 0.7
+
+    print("=== RUNNING DETECTION CASCADE ===")
+    cascade = build_cascade(stages, confidence_threshold)
+    if not cascade.prepare():
+        print("ERROR: No detection stage could start")
+        return
+    print(f"Stages: {', '.join(stage.name for stage in cascade.ordered_stages())}")
+
+    files = sorted(f for f in os.listdir(saved_images_dir) if f.lower().endswith('.png'))
+    hits = 0
+    for file in files:
+        frame = cv2.imread(os.path.join(saved_images_dir, file))
+        if frame is None:
+            continue
+        detections = cascade.detect(frame)
+        found = [d for d in detections if d['confidence'] >= confidence_threshold]
+        hits += bool(found)
+        if found:
+            print(f"  {file}: {len(found)} hits ({found[0]['stage']})")
+
+    print(f"\n{hits}/{len(files)} frames with hits")
+    for line in cascade.report():
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
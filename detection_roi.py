@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Detection ROI
+Limits SIFT to the parts of the result screen where pulled cards can appear
+
+The ROI is a list of (x, y, w, h) rectangles at the 720x1280 reference
+resolution. It is either the configured card slots, or learned from the
+annotated hits saved in saved_images/ (the slots that ever held a hit).
+build_roi_mask() turns it into the mask passed to detectAndCompute.
+
+Run this file to learn the ROI and write it to detection_roi.json.
+"""
+
+import os
+import sys
+import json
+import cv2
+import numpy as np
+
+ROI_MODES = ('card slots', 'learned', 'off')
+
+# Resolution the rectangles below are measured at (width, height)
+REFERENCE_SIZE = (720, 1280)
+
+# Card slots on the scout result screen (3-2-3-2 layout), as (x, y, w, h)
+CARD_SLOT_SIZE = (150, 197)
+CARD_SLOTS = [
+    (x, y) + CARD_SLOT_SIZE for x, y in [
+        (70, 135), (285, 135), (500, 135),
+        (178, 375), (393, 375),
+        (70, 615), (285, 615), (500, 615),
+        (178, 858), (393, 858),
+    ]
+]
+
+# Extra pixels kept around each slot so features on the card border and "NEW" badge still match
+SLOT_MARGIN = 30
+
+DEFAULT_ROI_FILE = "detection_roi.json"
+
+# Annotated screenshots mark each hit with a pure green ring (radius 40) around a numbered disk
+ANNOTATION_COLOR = (0, 255, 0)
+ANNOTATION_MIN_RADIUS = 30
+
+
+def pad_rect(rect, margin=SLOT_MARGIN):
+    """Grow a rectangle by margin pixels on every side"""
+    x, y, w, h = rect
+    return (x - margin, y - margin, w + 2 * margin, h + 2 * margin)
+
+
+def card_slot_roi(margin=SLOT_MARGIN):
+    """ROI covering every card slot"""
+    return [pad_rect(slot, margin) for slot in CARD_SLOTS]
+
+
+def find_annotated_hits(image):
+    """Return the (x, y) centers of the hit markers drawn on an annotated screenshot
+
+    The rings are filled in and only blobs thick enough to be a filled ring
+    are kept, so the green label text next to each marker is ignored.
+    """
+    green = np.all(image == ANNOTATION_COLOR, axis=2).astype(np.uint8) * 255
+
+    # Fill the inside of each ring by flooding the background from a corner
+    background = green.copy()
+    flood_mask = np.zeros((green.shape[0] + 2, green.shape[1] + 2), dtype=np.uint8)
+    cv2.floodFill(background, flood_mask, (0, green.shape[0] - 1), 255)
+    filled = green | cv2.bitwise_not(background)
+
+    distance = cv2.distanceTransform(filled, cv2.DIST_L2, 5)
+    count, _, _, centroids = cv2.connectedComponentsWithStats((distance >= ANNOTATION_MIN_RADIUS).astype(np.uint8))
+    return [(float(x), float(y)) for x, y in centroids[1:count]]
+
+
+def learn_roi(saved_images_dir="saved_images", margin=SLOT_MARGIN):
+    """Learn the ROI from the _ANNOTATED_ screenshots of previous hits
+
+    Returns the padded card slots that held at least one hit, the number of
+    hits found and the hits that fell outside every slot (usually false
+    detections, so they are reported rather than added to the ROI).
+    """
+    slot_rects = card_slot_roi(margin)
+    slot_hits = [0] * len(slot_rects)
+    total_hits = 0
+    outliers = []
+
+    for file in sorted(os.listdir(saved_images_dir)):
+        if '_ANNOTATED_' not in file:
+            continue
+
+        image = cv2.imread(os.path.join(saved_images_dir, file))
+        if image is None:
+            continue
+
+        # Annotations are drawn at capture resolution; bring hits back to the reference size
+        scale_x = REFERENCE_SIZE[0] / image.shape[1]
+        scale_y = REFERENCE_SIZE[1] / image.shape[0]
+
+        for x, y in find_annotated_hits(image):
+            x, y = x * scale_x, y * scale_y
+            total_hits += 1
+            for i, (sx, sy, sw, sh) in enumerate(slot_rects):
+                if sx <= x < sx + sw and sy <= y < sy + sh:
+                    slot_hits[i] += 1
+                    break
+            else:
+                outliers.append((round(x), round(y)))
+
+    rects = [rect for rect, hits in zip(slot_rects, slot_hits) if hits > 0]
+    return {'rects': rects, 'slot_hits': slot_hits, 'hits': total_hits, 'outliers': outliers}
+
+
+def save_roi(rects, path=DEFAULT_ROI_FILE):
+    """Save ROI rectangles as JSON"""
+    with open(path, 'w') as f:
+        json.dump({'reference_size': list(REFERENCE_SIZE), 'rects': [list(r) for r in rects]}, f, indent=2)
+
+
+def load_roi(path=DEFAULT_ROI_FILE):
+    """Load ROI rectangles saved by save_roi(), or None if there is no file"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return [tuple(r) for r in data['rects']]
+
+
+def build_roi_mask(shape, rects):
+    """Build a uint8 detectAndCompute mask for a frame of the given shape"""
+    height, width = shape[:2]
+    scale_x = width / REFERENCE_SIZE[0]
+    scale_y = height / REFERENCE_SIZE[1]
+
+    mask = np.zeros((height, width), dtype=np.uint8)
+    for x, y, w, h in rects:
+        x1, y1 = max(0, int(x * scale_x)), max(0, int(y * scale_y))
+        x2, y2 = min(width, int((x + w) * scale_x)), min(height, int((y + h) * scale_y))
+        mask[y1:y2, x1:x2] = 255
+    return mask
+
+
+def main():
+    saved_images_dir = sys.argv[1] if len(sys.argv) > 1 else "saved_images"
+
+    print("=== LEARNING DETECTION ROI ===")
+    result = learn_roi(saved_images_dir)
+
+    print(f"Found {result['hits']} annotated hits")
+    for i, hits in enumerate(result['slot_hits']):
+        print(f"  Slot {i + 1}: {hits} hits")
+    if result['outliers']:
+        print(f"⚠️  {len(result['outliers'])} hits outside every card slot (not added): {result['outliers']}")
+
+    if not result['rects']:
+        print("ERROR: No hits found inside card slots, ROI not saved")
+        return
+
+    save_roi(result['rects'])
+    mask = build_roi_mask((REFERENCE_SIZE[1], REFERENCE_SIZE[0]), result['rects'])
+    print(f"✅ Saved {len(result['rects'])} ROI rectangles to {DEFAULT_ROI_FILE} "
+          f"({np.count_nonzero(mask) / mask.size:.0%} of the frame)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Detection Service
+Runs SmartCharacterDetector in a pool of worker processes so SIFT and descriptor
+matching use every core instead of one.
+
+Each worker learns the character model once when it starts, from the
+on-disk model cache the parent fills first, and then takes frames as
+arrays and returns the same detection dicts as detect_character().
+"""
+
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+from smart_character_detection import SmartCharacterDetector
+from prefilter import PrefilterCascade
+
+DETECTION_ENGINES = ('threads', 'processes')
+
+WORKER_STARTUP_TIMEOUT = 120  # Seconds to wait for every worker to load its model
+
+# Per-process detector, created by _init_worker
+_worker_detector = None
+
+
+def _init_worker(confidence_threshold, characters_dir, roi_rects, use_prefilter, backend, ready):
+    """Load the character model once per worker process"""
+    global _worker_detector
+
+    # Workers already run in parallel; keep OpenCV from starting its own threads in each of them
+    cv2.setNumThreads(1)
+
+    detector = SmartCharacterDetector(
+        confidence_threshold=confidence_threshold,
+        roi_rects=roi_rects,
+        prefilter=PrefilterCascade() if use_prefilter else None,
+        backend=backend,
+        verbose=False
+    )
+    if not detector.learn_character(characters_dir):
+        raise RuntimeError(f"Detection worker could not learn the character from '{characters_dir}'")
+    _worker_detector = detector
+
+    # Tell the service this worker is warm
+    try:
+        ready.wait(WORKER_STARTUP_TIMEOUT)
+    except threading.BrokenBarrierError:
+        pass  # The service stopped waiting
+
+
+def _worker_ready():
+    return _worker_detector is not None
+
+
+def _worker_detect(frame):
+    """Detect in one frame, returning (detections, prefilter stats gathered for it)"""
+    detections = _worker_detector.detect_character(frame)
+    stats = _worker_detector.prefilter.pop_stats() if _worker_detector.prefilter else None
+    return detections, stats
+
+
+class DetectionService:
+    """Process pool of warm SmartCharacterDetector workers"""
+
+    def __init__(self, workers, confidence_threshold=0.7, characters_dir="characters",
+                 roi_rects=None, use_prefilter=False, backend='sift'):
+        self.workers = max(1, workers)
+        self.confidence_threshold = confidence_threshold
+        self.characters_dir = characters_dir
+        self.roi_rects = roi_rects
+        self.use_prefilter = use_prefilter
+        self.backend = backend
+
+        # Collects the workers' prefilter stats so report() covers every process
+        self.prefilter = PrefilterCascade() if use_prefilter else None
+        self._pool = None
+        self._pending = set()  # Frames submitted and not yet returned, cancelled by close()
+        self._pending_lock = threading.Lock()
+
+    def start(self, timeout=WORKER_STARTUP_TIMEOUT):
+        """Start the workers and wait until every one has its model loaded"""
+        # Make sure the model cache is filled so workers only read it
+        detector = SmartCharacterDetector(self.confidence_threshold, backend=self.backend, verbose=False)
+        if not detector.learn_character(self.characters_dir):
+            raise RuntimeError(f"Could not learn the character from '{self.characters_dir}'")
+
+        # Spawn rather than fork: the monitor process has Tk and worker threads running
+        context = multiprocessing.get_context('spawn')
+        ready = context.Barrier(self.workers + 1)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.confidence_threshold, self.characters_dir, self.roi_rects, self.use_prefilter,
+                      self.backend, ready)
+        )
+
+        # Workers are launched as tasks arrive, so send one per worker, then wait for all of them to load the model
+        warmups = [self._pool.submit(_worker_ready) for _ in range(self.workers)]
+        try:
+            ready.wait(timeout)
+        except threading.BrokenBarrierError:
+            for future in warmups:
+                if future.done():
+                    future.result()  # Re-raises worker start-up errors if that is what went wrong
+            self.close()
+            raise RuntimeError(f"Detection workers did not start within {timeout}s")
+        for future in warmups:
+            future.result()
+
+    def detect(self, frame):
+        """Detect the character in a frame (BGR or RGBA array), blocking until a worker is done"""
+        future = self._pool.submit(_worker_detect, frame)
+        with self._pending_lock:
+            self._pending.add(future)
+        try:
+            detections, stats = future.result()
+        finally:
+            with self._pending_lock:
+                self._pending.discard(future)
+        if stats and self.prefilter:
+            self.prefilter.merge_stats(stats)
+        return detections
+
+    def close(self):
+        """Stop the worker processes, cancelling frames that haven't started"""
+        if self._pool is not None:
+            with self._pending_lock:
+                pending = list(self._pending)
+            for future in pending:
+                future.cancel()
+            self._pool.shutdown(wait=False)
+            self._pool = None
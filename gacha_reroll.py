@@ -2,7 +2,6 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import cv2
 import numpy as np
-import subprocess
 import time
 import json
 import os
@@ -12,7 +11,9 @@ import configparser
 import re
 from datetime import datetime
 from macro_parser import parse_macro_file
-from image_recognition import ImageRecognition, detect_characters_in_screenshot
+from image_recognition import ImageRecognition, detect_characters_in_screenshot, clear_recognizer_cache
+from screen_capture import capture_screenshot
+from adb_client import get_adb_client
 
 class GachaRerollAutomation:
     def __init__(self, root):
@@ -198,6 +199,7 @@ class GachaRerollAutomation:
     
     def clear_character_images(self):
         """Clear all character images"""
+        clear_recognizer_cache(self.character_images)
         self.character_images.clear()
         self.log("Cleared all character images")
     
@@ -232,16 +234,14 @@ class GachaRerollAutomation:
                 messagebox.showerror("Error", f"ADB not found at: {adb_path}")
                 return
             
-            result = subprocess.run(
-                [adb_path, 'connect', f'127.0.0.1:{self.adb_port.get()}'],
-                capture_output=True, text=True, timeout=10
-            )
-            if result.returncode == 0:
-                self.log("ADB connection successful")
+            adb_client = get_adb_client(adb_path)
+            port = int(self.adb_port.get())
+            if adb_client.is_alive(port):
+                self.log(f"ADB connection successful ({adb_client.transport})")
                 messagebox.showinfo("Success", "ADB connection established!")
             else:
-                self.log(f"ADB connection failed: {result.stderr}")
-                messagebox.showerror("Error", f"ADB connection failed: {result.stderr}")
+                self.log(f"ADB connection failed on port {port}")
+                messagebox.showerror("Error", f"ADB connection failed on port {port}")
         except Exception as e:
             self.log(f"ADB test error: {str(e)}")
             messagebox.showerror("Error", f"ADB test error: {str(e)}")
@@ -255,19 +255,14 @@ class GachaRerollAutomation:
                 messagebox.showerror("Error", f"ADB not found at: {adb_path}")
                 return
             
-            # Use ADB to take screenshot
-            subprocess.run([adb_path, 'shell', 'screencap', '/sdcard/screenshot.png'], check=True)
-            subprocess.run([adb_path, 'pull', '/sdcard/screenshot.png', '.'], check=True)
+            # Stream screenshot straight into memory
+            img = capture_screenshot(get_adb_client(adb_path), int(self.adb_port.get()))
             
             # Display screenshot
-            img = cv2.imread('screenshot.png')
-            if img is not None:
-                cv2.imshow('Screenshot', img)
-                cv2.waitKey(0)
-                cv2.destroyAllWindows()
-                self.log("Screenshot taken and displayed")
-            else:
-                self.log("Failed to load screenshot")
+            cv2.imshow('Screenshot', img)
+            cv2.waitKey(0)
+            cv2.destroyAllWindows()
+            self.log("Screenshot taken and displayed")
         except Exception as e:
             self.log(f"Screenshot error: {str(e)}")
             messagebox.showerror("Error", f"Screenshot error: {str(e)}")
@@ -311,6 +306,7 @@ class GachaRerollAutomation:
             
             # Execute macro on master instance only
             master_port = self.instance_ports[0]
+            adb_client = get_adb_client(self.adb_path.get())
             
             for i, action in enumerate(actions):
                 action_type = action.get('type', '').upper()
@@ -320,7 +316,7 @@ class GachaRerollAutomation:
                     y = action['y']
                     self.log(f"Action {i+1}: CLICK at ({x}, {y})")
                     
-                    subprocess.run([self.adb_path.get(), '-s', f'127.0.0.1:{master_port}', 'shell', 'input', 'tap', str(x), str(y)])
+                    adb_client.tap(master_port, x, y)
                     
                     # Apply delay
                     delay = action.get('delay', 100) / 1000.0
@@ -354,6 +350,9 @@ class GachaRerollAutomation:
                 self.log(f"ADB not found at: {adb_path}")
                 return
             
+            adb_client = get_adb_client(adb_path)
+            port = int(self.adb_port.get())
+            
             for action in actions:
                 if not self.is_running:
                     break
@@ -361,19 +360,18 @@ class GachaRerollAutomation:
                 action_type = action.get('type', '').upper()
                 
                 if action_type == 'CLICK':
-                    subprocess.run([adb_path, 'shell', 'input', 'tap', str(action['x']), str(action['y'])])
+                    adb_client.tap(port, action['x'], action['y'])
                 elif action_type == 'SWIPE':
-                    subprocess.run([adb_path, 'shell', 'input', 'swipe', 
-                                  str(action['x1']), str(action['y1']), 
-                                  str(action['x2']), str(action['y2']), 
-                                  str(action.get('duration', 500))])
+                    adb_client.swipe(port, action['x1'], action['y1'], 
+                                     action['x2'], action['y2'], 
+                                     action.get('duration', 500))
                 elif action_type == 'KEY':
-                    subprocess.run([adb_path, 'shell', 'input', 'keyevent', str(action['keycode'])])
+                    adb_client.keyevent(port, action['keycode'])
                 elif action_type == 'WAIT':
                     time.sleep(action['delay'] / 1000.0)
                 elif action_type == 'SCREENSHOT':
                     # Take screenshot during macro execution
-                    subprocess.run([adb_path, 'shell', 'screencap', '/sdcard/screenshot.png'])
+                    adb_client.shell(port, 'screencap /sdcard/screenshot.png')
                 
                 # Apply delay if specified
                 if 'delay' in action and action_type != 'WAIT':
@@ -382,15 +380,15 @@ class GachaRerollAutomation:
         except Exception as e:
             self.log(f"Macro execution error: {str(e)}")
     
-    def detect_character(self, screenshot_path):
-        """Detect target character in screenshot using enhanced image recognition"""
+    def detect_character(self, screenshot):
+        """Detect target character in a screenshot path or frame using enhanced image recognition"""
         try:
             if not self.character_images:
                 return False
             
             # Use enhanced image recognition
             detections = detect_characters_in_screenshot(
-                screenshot_path, 
+                screenshot, 
                 self.character_images, 
                 confidence_threshold=0.7
             )
@@ -462,11 +460,9 @@ class GachaRerollAutomation:
                 
                 # Take screenshot and detect character
                 try:
-                    adb_path = self.adb_path.get()
-                    subprocess.run([adb_path, 'shell', 'screencap', '/sdcard/screenshot.png'], check=True)
-                    subprocess.run([adb_path, 'pull', '/sdcard/screenshot.png', '.'], check=True)
+                    screenshot = capture_screenshot(get_adb_client(self.adb_path.get()), int(self.adb_port.get()))
                     
-                    if self.detect_character('screenshot.png'):
+                    if self.detect_character(screenshot):
                         self.successful_pulls += 1
                         self.log(f"SUCCESS! Found {self.target_character.get()}! ({self.successful_pulls}/{self.target_count.get()})")
                         
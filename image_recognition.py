@@ -1,31 +1,101 @@
 import cv2
 import numpy as np
 import os
-from typing import List, Tuple, Dict, Any
+import hashlib
+import bisect
+import threading
+from collections import OrderedDict
+from typing import List, Tuple, Dict, Any, Union
 from PIL import Image
 import pytesseract
+from smart_character_detection import DescriptorIndex, two_nearest, ratio_test
+from detection_roi import CARD_SLOTS, REFERENCE_SIZE
+
+TEMPLATE_CACHE_DIRNAME = ".template_cache"
+
+# Bump when _preprocess_image or the SIFT settings change so old cache files are ignored
+TEMPLATE_CACHE_VERSION = 1
+
+# Coarse-to-fine template matching: one method, matched on a downscaled pyramid
+# level first and refined at full resolution only around the best candidates
+TEMPLATE_MODES = ('exhaustive', 'coarse_to_fine')
+COARSE_METHOD = cv2.TM_CCOEFF_NORMED
+PYRAMID_LEVELS = 2  # Each level halves the size, so 2 levels match at 1/4 scale
+MIN_COARSE_TEMPLATE_SIZE = 12  # Pixels; smaller templates use fewer levels
+COARSE_CANDIDATES = 3  # Coarse peaks refined at full resolution
+COARSE_SCORE_GAP = 0.1  # Only peaks this close to the best coarse score are refined
+COARSE_REJECT_SLACK = 0.1  # Templates whose coarse score is this far below the threshold are rejected unrefined
+REFINE_MARGIN = 2  # Pixels searched around a candidate at each finer level
+DEFAULT_TEMPLATE_SCALES = (1.0,)  # e.g. (0.8, 0.9, 1.0, 1.1, 1.25) for templates captured at another zoom
+
+# OCR only reads these text regions, as name -> [(x, y, w, h)] at the REFERENCE_SIZE resolution
+RARITY_BADGE = (4, 6, 48, 38)  # Rarity badge in the top-left corner of a card slot
+DEFAULT_OCR_REGIONS = {
+    'title_banner': [(200, 50, 320, 40)],
+    'rarity_badge': [(x + RARITY_BADGE[0], y + RARITY_BADGE[1]) + RARITY_BADGE[2:] for x, y, _, _ in CARD_SLOTS],
+}
+OCR_KEYWORDS = [
+    'SSR', 'SR', 'R', 'UR',  # Rarity indicators
+    '5★', '4★', '3★',  # Star ratings
+    # Add specific character names here
+]
+OCR_UPSCALE = 2  # Small badge text reads better enlarged
+OCR_PADDING = 20  # White pixels between crops stacked into one OCR image
+
+# Warm recognizers kept by detect_characters_in_screenshot (least recently used are evicted)
+RECOGNIZER_CACHE_SIZE = 4
+
+
+def _template_cache_key():
+    settings = f"{TEMPLATE_CACHE_VERSION}-{cv2.__version__}"
+    return hashlib.sha1(settings.encode('utf-8')).hexdigest()[:12]
+
 
 class ImageRecognition:
     """Enhanced image recognition for gacha character detection"""
     
-    def __init__(self, confidence_threshold: float = 0.8):
+    def __init__(self, confidence_threshold: float = 0.8, use_template_cache: bool = True,
+                 template_mode: str = 'exhaustive', template_scales: Tuple[float, ...] = DEFAULT_TEMPLATE_SCALES,
+                 ocr_regions: Dict[str, List[Tuple[int, int, int, int]]] = None):
+        if template_mode not in TEMPLATE_MODES:
+            raise ValueError(f"Unknown template mode '{template_mode}' (expected one of {', '.join(TEMPLATE_MODES)})")
         self.confidence_threshold = confidence_threshold
         self.character_templates = {}
         self.ocr_config = '--oem 3 --psm 6'  # OCR configuration
+        self.use_template_cache = use_template_cache  # Also keep templates on disk, keyed by file content
+        self.sift = cv2.SIFT_create()
+        self.template_mode = template_mode  # 'exhaustive': three methods at full resolution
+        self.template_scales = tuple(template_scales)  # Template sizes tried in coarse_to_fine mode
+        self.ocr_regions = DEFAULT_OCR_REGIONS if ocr_regions is None else ocr_regions  # {} turns OCR off
+        
+        # Templates already processed by this recognizer
+        self._loaded_templates = {}  # path -> (mtime, size, processed template)
+        self._template_features = {}  # template digest -> (keypoint count, descriptors)
+        self._template_indexes = {}  # template digest -> (keypoint count, DescriptorIndex or None)
+        self._template_pyramids = {}  # (template digest, scale) -> [full size, 1/2, 1/4, ...]
         
     def load_character_images(self, image_paths: List[str]) -> Dict[str, np.ndarray]:
-        """Load and preprocess character images"""
+        """Load and preprocess character images
+        
+        Each template is preprocessed and run through SIFT once: results are
+        kept on this recognizer (until the file changes) and cached on disk
+        under <image folder>/.template_cache, keyed by the file content.
+        """
         templates = {}
         
         for path in image_paths:
             if os.path.exists(path):
                 try:
-                    # Load image
-                    img = cv2.imread(path)
-                    if img is not None:
-                        # Preprocess image
-                        processed = self._preprocess_image(img)
-                        filename = os.path.basename(path)
+                    filename = os.path.basename(path)
+                    stat = os.stat(path)
+                    loaded = self._loaded_templates.get(path)
+                    if loaded is not None and loaded[:2] == (stat.st_mtime, stat.st_size):
+                        templates[filename] = loaded[2]
+                        continue
+                    
+                    processed = self._load_template(path)
+                    if processed is not None:
+                        self._loaded_templates[path] = (stat.st_mtime, stat.st_size, processed)
                         templates[filename] = processed
                         print(f"Loaded template: {filename}")
                     else:
@@ -35,6 +105,76 @@ class ImageRecognition:
         
         return templates
     
+    def _load_template(self, path: str) -> Union[np.ndarray, None]:
+        """Preprocessed template and its SIFT features, from the disk cache when the file content is unchanged"""
+        cache_file = None
+        if self.use_template_cache:
+            with open(path, 'rb') as f:
+                content_hash = hashlib.sha1(f.read()).hexdigest()
+            cache_dir = os.path.join(os.path.dirname(path), TEMPLATE_CACHE_DIRNAME)
+            cache_file = os.path.join(cache_dir, f"{content_hash}_{_template_cache_key()}.npz")
+            
+            if os.path.exists(cache_file):
+                try:
+                    with np.load(cache_file) as data:
+                        processed = data['processed']
+                        descriptors = data['descriptors'] if data['has_descriptors'] else None
+                        self._template_features[self._template_digest(processed)] = (int(data['keypoint_count']), descriptors)
+                    return processed
+                except Exception as e:
+                    print(f"Warning: Could not read template cache {cache_file}: {str(e)}")
+        
+        # Load and preprocess image
+        img = cv2.imread(path)
+        if img is None:
+            return None
+        processed = self._preprocess_image(img)
+        keypoint_count, descriptors = self._features_for(processed)
+        
+        if cache_file is not None:
+            try:
+                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+                temp_file = cache_file + ".tmp.npz"
+                np.savez(
+                    temp_file,
+                    processed=processed,
+                    keypoint_count=keypoint_count,
+                    has_descriptors=descriptors is not None,
+                    descriptors=descriptors if descriptors is not None else np.empty((0, 128), dtype=np.float32)
+                )
+                os.replace(temp_file, cache_file)
+            except Exception as e:
+                print(f"Warning: Could not cache template to {cache_file}: {str(e)}")
+        
+        return processed
+    
+    def _template_digest(self, template: np.ndarray) -> str:
+        return hashlib.sha1(np.ascontiguousarray(template).data).hexdigest() + str(template.shape)
+    
+    def _features_for(self, template: np.ndarray):
+        """(keypoint count, descriptors) of a template, computed once per distinct template image"""
+        digest = self._template_digest(template)
+        features = self._template_features.get(digest)
+        if features is None:
+            keypoints, descriptors = self.sift.detectAndCompute(template, None)
+            features = (len(keypoints), descriptors)
+            self._template_features[digest] = features
+        return features
+    
+    def _index_for(self, template: np.ndarray):
+        """(keypoint count, DescriptorIndex over the template's descriptors), built once per distinct template image
+        
+        The index is None when the template has fewer than two descriptors.
+        """
+        digest = self._template_digest(template)
+        indexed = self._template_indexes.get(digest)
+        if indexed is None:
+            keypoint_count, descriptors = self._features_for(template)
+            index = DescriptorIndex(descriptors) if descriptors is not None and len(descriptors) >= 2 else None
+            indexed = (keypoint_count, index)
+            self._template_indexes[digest] = indexed
+        return indexed
+    
     def _preprocess_image(self, img: np.ndarray) -> np.ndarray:
         """Preprocess image for better matching"""
         # Convert to grayscale
@@ -53,16 +193,18 @@ class ImageRecognition:
         
         return thresh
     
-    def detect_characters(self, screenshot_path: str, templates: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
-        """Detect characters in screenshot using multiple methods"""
+    def detect_characters(self, screenshot: Union[str, np.ndarray], templates: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Detect characters in a screenshot path or in-memory BGR frame using multiple methods"""
         results = []
         
         try:
-            # Load screenshot
-            screenshot = cv2.imread(screenshot_path)
-            if screenshot is None:
-                print(f"Failed to load screenshot: {screenshot_path}")
-                return results
+            # Load screenshot unless we were handed a frame already
+            if not isinstance(screenshot, np.ndarray):
+                screenshot_path = screenshot
+                screenshot = cv2.imread(screenshot_path)
+                if screenshot is None:
+                    print(f"Failed to load screenshot: {screenshot_path}")
+                    return results
             
             # Preprocess screenshot
             processed_screenshot = self._preprocess_image(screenshot)
@@ -75,9 +217,9 @@ class ImageRecognition:
             feature_results = self._feature_matching(screenshot, templates)
             results.extend(feature_results)
             
-            # Method 3: OCR text detection (if character names are visible)
-            ocr_results = self._ocr_detection(screenshot)
-            results.extend(ocr_results)
+            # Method 3: OCR of the text regions, only if neither method above decided
+            if self.ocr_regions and not self._is_conclusive(results):
+                results.extend(self._ocr_detection(screenshot))
             
             # Method 4: Color-based detection - DISABLED to avoid false positives
             # color_results = self._color_detection(screenshot, templates)
@@ -91,9 +233,24 @@ class ImageRecognition:
             print(f"Error in character detection: {str(e)}")
         
         return results
-    
+
+    def match_templates(self, screenshot: np.ndarray, templates: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Template matching alone (method 1 of detect_characters) on a BGR frame"""
+        return self._template_matching(self._preprocess_image(screenshot), templates)
+
+    def match_features(self, screenshot: np.ndarray, templates: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Feature matching alone (method 2 of detect_characters) on a BGR frame"""
+        return self._feature_matching(screenshot, templates)
+
+    def read_text(self, screenshot: np.ndarray) -> List[Dict[str, Any]]:
+        """OCR of the text regions alone (method 3 of detect_characters) on a BGR frame"""
+        return self._ocr_detection(screenshot)
+
     def _template_matching(self, screenshot: np.ndarray, templates: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
         """Template matching method"""
+        if self.template_mode == 'coarse_to_fine':
+            return self._coarse_to_fine_matching(screenshot, templates)
+        
         results = []
         
         for template_name, template in templates.items():
@@ -139,63 +296,150 @@ class ImageRecognition:
         
         return results
     
+    def _coarse_to_fine_matching(self, screenshot: np.ndarray, templates: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Template matching with COARSE_METHOD on a pyramid level, refined at full resolution
+        
+        The screenshot pyramid is built once for all templates. For every
+        template scale, the best COARSE_CANDIDATES peaks on the coarse level
+        are followed down the pyramid in small windows around their position,
+        so the whole screenshot is only searched at 1/2**PYRAMID_LEVELS size.
+        """
+        results = []
+        screenshot_pyramid = [screenshot]
+        for _ in range(PYRAMID_LEVELS):
+            screenshot_pyramid.append(cv2.pyrDown(screenshot_pyramid[-1]))
+        
+        for template_name, template in templates.items():
+            try:
+                best_confidence = -1.0
+                best_location = None
+                best_scale = None
+                
+                for scale in self.template_scales:
+                    pyramid = self._template_pyramid(template, scale)
+                    if pyramid[0].shape[0] > screenshot.shape[0] or pyramid[0].shape[1] > screenshot.shape[1]:
+                        continue
+                    confidence, location = self._match_pyramid(screenshot_pyramid, pyramid)
+                    if location is not None and confidence > best_confidence:
+                        best_confidence = confidence
+                        best_location = location
+                        best_scale = scale
+                
+                if best_location is not None and best_confidence >= self.confidence_threshold:
+                    results.append({
+                        'method': 'template_matching',
+                        'template': template_name,
+                        'confidence': best_confidence,
+                        'location': best_location,
+                        'method_used': COARSE_METHOD,
+                        'scale': best_scale
+                    })
+            
+            except Exception as e:
+                print(f"Template matching error for {template_name}: {str(e)}")
+        
+        return results
+    
+    def _template_pyramid(self, template: np.ndarray, scale: float) -> List[np.ndarray]:
+        """Resized template and its pyramid levels, down to MIN_COARSE_TEMPLATE_SIZE (cached per template)"""
+        key = (self._template_digest(template), scale)
+        pyramid = self._template_pyramids.get(key)
+        if pyramid is None:
+            if scale != 1.0:
+                size = (max(1, round(template.shape[1] * scale)), max(1, round(template.shape[0] * scale)))
+                template = cv2.resize(template, size, interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+            pyramid = [template]
+            while len(pyramid) <= PYRAMID_LEVELS and min(pyramid[-1].shape[:2]) // 2 >= MIN_COARSE_TEMPLATE_SIZE:
+                pyramid.append(cv2.pyrDown(pyramid[-1]))
+            self._template_pyramids[key] = pyramid
+        return pyramid
+    
+    def _match_pyramid(self, screenshot_pyramid: List[np.ndarray], pyramid: List[np.ndarray]) -> Tuple[float, Tuple[int, int]]:
+        """(confidence, top-left location) of the best full-resolution match among the coarse candidates
+        
+        Location is None when no coarse peak comes within COARSE_REJECT_SLACK
+        of the confidence threshold (blurred binary images score higher at
+        the coarse level, so such templates can't match at full resolution).
+        """
+        level = len(pyramid) - 1
+        coarse = cv2.matchTemplate(screenshot_pyramid[level], pyramid[level], COARSE_METHOD)
+        _, top_score, _, _ = cv2.minMaxLoc(coarse)
+        if level == 0:
+            _, _, _, max_loc = cv2.minMaxLoc(coarse)
+            return top_score, max_loc
+        if top_score < self.confidence_threshold - COARSE_REJECT_SLACK:
+            return top_score, None
+        
+        best_confidence = -1.0
+        best_location = None
+        suppress_x, suppress_y = max(1, pyramid[level].shape[1] // 2), max(1, pyramid[level].shape[0] // 2)
+        for _ in range(COARSE_CANDIDATES):
+            _, score, _, (x, y) = cv2.minMaxLoc(coarse)
+            if score < top_score - COARSE_SCORE_GAP:
+                break
+            # Suppress this peak so the next candidate is a different place
+            coarse[max(0, y - suppress_y):y + suppress_y + 1, max(0, x - suppress_x):x + suppress_x + 1] = -1.0
+            
+            # Follow the candidate down the pyramid in small windows
+            confidence = score
+            for finer in range(level - 1, -1, -1):
+                confidence, (x, y) = self._refine(screenshot_pyramid[finer], pyramid[finer], x * 2, y * 2)
+            if confidence > best_confidence:
+                best_confidence = confidence
+                best_location = (x, y)
+        
+        return best_confidence, best_location
+    
+    def _refine(self, screenshot: np.ndarray, template: np.ndarray, x: int, y: int) -> Tuple[float, Tuple[int, int]]:
+        """Best match within REFINE_MARGIN pixels of (x, y)"""
+        height, width = template.shape[:2]
+        x1, y1 = max(0, x - REFINE_MARGIN), max(0, y - REFINE_MARGIN)
+        x2 = min(screenshot.shape[1], x + width + REFINE_MARGIN)
+        y2 = min(screenshot.shape[0], y + height + REFINE_MARGIN)
+        _, confidence, _, (fine_x, fine_y) = cv2.minMaxLoc(cv2.matchTemplate(screenshot[y1:y2, x1:x2], template, COARSE_METHOD))
+        return confidence, (x1 + fine_x, y1 + fine_y)
+    
     def _feature_matching(self, screenshot: np.ndarray, templates: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
         """Feature matching using SIFT/SURF"""
         results = []
         
         try:
-            # Initialize SIFT detector
-            sift = cv2.SIFT_create()
-            
             # Find keypoints and descriptors for screenshot
-            kp1, des1 = sift.detectAndCompute(screenshot, None)
+            kp1, des1 = self.sift.detectAndCompute(screenshot, None)
             
             if des1 is None:
                 return results
+            screenshot_points = cv2.KeyPoint_convert(kp1).reshape(-1, 2)
             
             for template_name, template in templates.items():
                 try:
-                    # Find keypoints and descriptors for template
-                    kp2, des2 = sift.detectAndCompute(template, None)
+                    # Keypoint count and descriptor index for template (built once per template)
+                    template_keypoints, template_index = self._index_for(template)
                     
-                    if des2 is None:
+                    if template_index is None:
                         continue
                     
-                    # FLANN matcher
-                    FLANN_INDEX_KDTREE = 1
-                    index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
-                    search_params = dict(checks=50)
-                    flann = cv2.FlannBasedMatcher(index_params, search_params)
-                    
-                    matches = flann.knnMatch(des1, des2, k=2)
+                    # Two nearest template descriptors of every screenshot descriptor
+                    _, nearest_distances, second_distances = two_nearest(template_index.distances(des1))
                     
                     # Apply ratio test
-                    good_matches = []
-                    for match_pair in matches:
-                        if len(match_pair) == 2:
-                            m, n = match_pair
-                            if m.distance < 0.7 * n.distance:
-                                good_matches.append(m)
+                    good = ratio_test(nearest_distances, second_distances)
+                    match_count = int(np.count_nonzero(good))
                     
                     # Calculate confidence based on number of good matches
-                    confidence = len(good_matches) / max(len(kp1), len(kp2)) if max(len(kp1), len(kp2)) > 0 else 0
+                    confidence = match_count / max(len(kp1), template_keypoints) if max(len(kp1), template_keypoints) > 0 else 0
                     
                     if confidence >= self.confidence_threshold * 0.5:  # Lower threshold for feature matching
                         # Calculate center point of matches
-                        if good_matches:
-                            src_pts = np.float32([kp1[m.queryIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-                            dst_pts = np.float32([kp2[m.trainIdx].pt for m in good_matches]).reshape(-1, 1, 2)
-                            
-                            # Calculate center
-                            center_x = int(np.mean(src_pts[:, 0, 0]))
-                            center_y = int(np.mean(src_pts[:, 0, 1]))
+                        if match_count:
+                            center_x, center_y = screenshot_points[good].mean(axis=0).astype(int)
                             
                             results.append({
                                 'method': 'feature_matching',
                                 'template': template_name,
                                 'confidence': confidence,
-                                'location': (center_x, center_y),
-                                'matches': len(good_matches)
+                                'location': (int(center_x), int(center_y)),
+                                'matches': match_count
                             })
                 
                 except Exception as e:
@@ -206,34 +450,79 @@ class ImageRecognition:
         
         return results
     
+    def _is_conclusive(self, results: List[Dict[str, Any]]) -> bool:
+        """True once some method has a detection at the confidence threshold"""
+        return any(r['confidence'] >= self.confidence_threshold for r in results)
+    
+    def _ocr_crops(self, screenshot: np.ndarray) -> List[Tuple[str, Tuple[int, int, int, int], np.ndarray]]:
+        """(region name, rect, grayscale crop) of every configured text region, scaled to the screenshot"""
+        height, width = screenshot.shape[:2]
+        scale_x = width / REFERENCE_SIZE[0]
+        scale_y = height / REFERENCE_SIZE[1]
+        gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY) if screenshot.ndim == 3 else screenshot
+        
+        crops = []
+        for name, rects in self.ocr_regions.items():
+            for x, y, w, h in rects:
+                x1, y1 = max(0, int(x * scale_x)), max(0, int(y * scale_y))
+                x2, y2 = min(width, int((x + w) * scale_x)), min(height, int((y + h) * scale_y))
+                if x2 > x1 and y2 > y1:
+                    crops.append((name, (x1, y1, x2 - x1, y2 - y1), gray[y1:y2, x1:x2]))
+        return crops
+    
+    def _stack_crops(self, crops: List[np.ndarray]) -> Tuple[np.ndarray, List[int]]:
+        """Enlarge the crops and stack them in one white-padded column; returns the image and each crop's top row"""
+        enlarged = [cv2.resize(crop, None, fx=OCR_UPSCALE, fy=OCR_UPSCALE, interpolation=cv2.INTER_CUBIC) for crop in crops]
+        width = max(crop.shape[1] for crop in enlarged) + 2 * OCR_PADDING
+        height = sum(crop.shape[0] + OCR_PADDING for crop in enlarged) + OCR_PADDING
+        column = np.full((height, width), 255, dtype=np.uint8)
+        
+        tops = []
+        y = OCR_PADDING
+        for crop in enlarged:
+            column[y:y + crop.shape[0], OCR_PADDING:OCR_PADDING + crop.shape[1]] = crop
+            tops.append(y)
+            y += crop.shape[0] + OCR_PADDING
+        return column, tops
+    
     def _ocr_detection(self, screenshot: np.ndarray) -> List[Dict[str, Any]]:
-        """OCR-based text detection"""
+        """OCR-based text detection
+        
+        Only the configured text regions are read, stacked into one image so
+        a single tesseract run covers all of them. Each keyword found is
+        reported at the center of the region it was read in.
+        """
         results = []
         
         try:
-            # Convert to PIL Image for OCR
-            pil_image = Image.fromarray(cv2.cvtColor(screenshot, cv2.COLOR_BGR2RGB))
-            
-            # Extract text
-            text = pytesseract.image_to_string(pil_image, config=self.ocr_config)
+            crops = self._ocr_crops(screenshot)
+            if not crops:
+                return results
+            column, tops = self._stack_crops([crop for _, _, crop in crops])
             
-            # Look for character names in the text
-            # This would need to be customized based on the specific game
-            character_keywords = [
-                'SSR', 'SR', 'R', 'UR',  # Rarity indicators
-                '5★', '4★', '3★',  # Star ratings
-                # Add specific character names here
-            ]
+            # Extract words with their positions in the stacked image
+            data = pytesseract.image_to_data(Image.fromarray(column), config=self.ocr_config,
+                                             output_type=pytesseract.Output.DICT)
             
-            for keyword in character_keywords:
-                if keyword.lower() in text.lower():
-                    results.append({
-                        'method': 'ocr',
-                        'template': keyword,
-                        'confidence': 0.9,  # High confidence for text detection
-                        'location': (0, 0),  # Text location not specific
-                        'text_found': keyword
-                    })
+            keywords = {keyword.lower(): keyword for keyword in OCR_KEYWORDS}
+            for text, top, word_height, word_confidence in zip(data['text'], data['top'], data['height'], data['conf']):
+                keyword = keywords.get(text.strip().lower())
+                if keyword is None or float(word_confidence) < 0:
+                    continue
+                
+                # Which crop the word's center lies in
+                index = bisect.bisect_right(tops, top + word_height // 2) - 1
+                if index < 0:
+                    continue
+                name, (x, y, w, h), _ = crops[index]
+                results.append({
+                    'method': 'ocr',
+                    'template': keyword,
+                    'confidence': float(word_confidence) / 100,
+                    'location': (x + w // 2, y + h // 2),
+                    'text_found': keyword,
+                    'region': name
+                })
         
         except Exception as e:
             print(f"OCR detection error: {str(e)}")
@@ -332,9 +621,9 @@ class ImageRecognition:
         except Exception as e:
             print(f"Error creating debug image: {str(e)}")
 
-def detect_characters_in_screenshot(screenshot_path: str, template_paths: List[str] = None, 
-                                  confidence_threshold: float = 0.8) -> List[Dict[str, Any]]:
-    """Convenience function for character detection"""
+def detect_characters_in_screenshot(screenshot_path: Union[str, np.ndarray], template_paths: List[str] = None, 
+                                  confidence_threshold: float = 0.8, template_mode: str = 'exhaustive') -> List[Dict[str, Any]]:
+    """Convenience function for character detection (accepts a path or an in-memory frame)"""
     # If no template paths provided, use all images from characters folder
     if template_paths is None:
         characters_dir = "characters"
@@ -352,10 +641,65 @@ def detect_characters_in_screenshot(screenshot_path: str, template_paths: List[s
         print("Warning: No character images provided")
         return []
     
-    recognizer = ImageRecognition(confidence_threshold)
-    templates = recognizer.load_character_images(template_paths)
+    recognizer, templates = get_recognizer(template_paths, confidence_threshold, template_mode)
     return recognizer.detect_characters(screenshot_path, templates)
 
+
+_recognizers = OrderedDict()  # (template files, threshold, template mode) -> (recognizer, templates)
+_recognizers_lock = threading.Lock()
+
+
+def _template_files_key(template_paths: List[str]) -> Tuple:
+    """(path, mtime, size) of every template, so an edited or replaced file gets a new recognizer"""
+    files = []
+    for path in template_paths:
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+            files.append((path, stat.st_mtime, stat.st_size))
+        except OSError:
+            files.append((path, None, None))
+    return tuple(files)
+
+
+def get_recognizer(template_paths: List[str], confidence_threshold: float = 0.8,
+                   template_mode: str = 'exhaustive') -> Tuple[ImageRecognition, Dict[str, np.ndarray]]:
+    """Return a warm recognizer and its loaded templates, shared by every caller with the same templates and settings"""
+    key = (_template_files_key(template_paths), confidence_threshold, template_mode)
+    with _recognizers_lock:
+        cached = _recognizers.get(key)
+        if cached is not None:
+            _recognizers.move_to_end(key)
+            return cached
+    
+    # Load outside the lock so other template sets aren't held up
+    recognizer = ImageRecognition(confidence_threshold, template_mode=template_mode)
+    cached = (recognizer, recognizer.load_character_images(template_paths))
+    
+    with _recognizers_lock:
+        # Drop recognizers for older versions of the same files
+        paths = {path for path, _, _ in key[0]}
+        for old_key in [k for k in _recognizers if k[1:] == key[1:] and {p for p, _, _ in k[0]} == paths]:
+            del _recognizers[old_key]
+        _recognizers[key] = cached
+        while len(_recognizers) > RECOGNIZER_CACHE_SIZE:
+            _recognizers.popitem(last=False)
+    return cached
+
+
+def clear_recognizer_cache(template_paths: List[str] = None) -> int:
+    """Forget cached recognizers (only those using any of template_paths if given); returns how many were dropped"""
+    with _recognizers_lock:
+        if template_paths is None:
+            dropped = len(_recognizers)
+            _recognizers.clear()
+            return dropped
+        paths = {os.path.abspath(path) for path in template_paths}
+        stale = [key for key in _recognizers if any(path in paths for path, _, _ in key[0])]
+        for key in stale:
+            del _recognizers[key]
+        return len(stale)
+
 if __name__ == "__main__":
     # Test the image recognition
     import sys
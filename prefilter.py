@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Detection Prefilter
+Cheap checks run in front of SIFT so frames that clearly can't contain the
+target are rejected before feature extraction
+
+Each stage looks at the card slots of a downscaled copy of the frame:
+- 'histogram': hue/saturation histogram overlap with the character images
+- 'ncc': normalized cross-correlation with small copies of the character images
+
+Stages run in the configured order and a frame is rejected by the first
+stage whose best slot score is below that stage's threshold. Per-stage
+rejection counts and timings are kept so the thresholds can be tuned
+(see tune_prefilter.py).
+"""
+
+import time
+import threading
+import cv2
+from screen_capture import to_bgr
+from detection_roi import CARD_SLOTS, REFERENCE_SIZE
+from smart_character_detection import list_character_images
+
+PREFILTER_STAGES = ('histogram', 'ncc')
+
+# (stage, threshold) in the order they run, tuned on saved_images with tune_prefilter.py:
+# the lowest histogram score on a hit frame is 0.318. 'ncc' is left out: its lowest hit score
+# (0.319) is too close to any threshold that rejects something, and after the histogram it
+# rejected no frames at 0.30.
+DEFAULT_CASCADE = [('histogram', 0.20)]
+
+# Frames are checked at a quarter of the 720x1280 reference size
+PREFILTER_SCALE = 0.25
+NCC_SEARCH_MARGIN = 8  # Downscaled pixels the card may sit away from its slot
+HISTOGRAM_BINS = [30, 32]  # Hue, saturation
+HISTOGRAM_MIN_SATURATION = 40  # Grey, white and dark pixels say nothing about the character
+HISTOGRAM_MIN_VALUE = 40
+
+
+class PrefilterCascade:
+    """Cost-ordered cheap checks that reject frames before SIFT"""
+
+    def __init__(self, stages=None, slots=CARD_SLOTS, scale=PREFILTER_SCALE):
+        self.stages = list(stages if stages is not None else DEFAULT_CASCADE)
+        for name, _ in self.stages:
+            if name not in PREFILTER_STAGES:
+                raise ValueError(f"Unknown prefilter stage '{name}' (expected one of {PREFILTER_STAGES})")
+
+        self.slots = slots
+        self.scale = scale
+        self.small_size = (int(REFERENCE_SIZE[0] * scale), int(REFERENCE_SIZE[1] * scale))
+
+        self.histograms = []  # One normalized H-S histogram per character image
+        self.templates = []  # One slot-sized grayscale copy per character image
+
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def learn(self, character_images_dir="characters"):
+        """Build the histogram and template references from every character's images"""
+        self.histograms = []
+        self.templates = []
+
+        slot_w, slot_h = self.slots[0][2:]
+        template_size = (max(1, int(slot_w * self.scale)), max(1, int(slot_h * self.scale)))
+
+        for _, path in list_character_images(character_images_dir):
+            img = cv2.imread(path)
+            if img is None:
+                continue
+
+            self.histograms.append(self._histogram(img))
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            self.templates.append(cv2.resize(gray, template_size, interpolation=cv2.INTER_AREA))
+
+        return len(self.templates) > 0
+
+    def score(self, frame):
+        """Best slot score for every stage (used for tuning; check() stops early)"""
+        small = self._downscale(frame)
+        return {name: self._run_stage(name, small) for name in PREFILTER_STAGES}
+
+    def check(self, frame):
+        """Run the cascade on a frame, returning (passed, name of the rejecting stage or None)"""
+        start = time.perf_counter()
+        small = self._downscale(frame)
+        downscale_time = time.perf_counter() - start
+
+        rejected_by = None
+        timings = []
+        for name, threshold in self.stages:
+            stage_start = time.perf_counter()
+            score = self._run_stage(name, small)
+            timings.append((name, time.perf_counter() - stage_start))
+            if score < threshold:
+                rejected_by = name
+                break
+
+        with self._stats_lock:
+            self.stats['frames'] += 1
+            self.stats['time'] += downscale_time
+            for name, elapsed in timings:
+                stage = self.stats['stages'][name]
+                stage['checked'] += 1
+                stage['time'] += elapsed
+                self.stats['time'] += elapsed
+            if rejected_by:
+                self.stats['stages'][rejected_by]['rejected'] += 1
+
+        return rejected_by is None, rejected_by
+
+    def record_detection_time(self, seconds):
+        """Record how long the full detection took on a frame that passed"""
+        with self._stats_lock:
+            self.stats['detections'] += 1
+            self.stats['detection_time'] += seconds
+
+    def pop_stats(self):
+        """Return the stats gathered so far and start counting again (for detection worker processes)"""
+        with self._stats_lock:
+            stats = self.stats
+            self.stats = self._empty_stats()
+        return stats
+
+    def merge_stats(self, stats):
+        """Add stats popped from another cascade (e.g. in a detection worker process)"""
+        with self._stats_lock:
+            for key in ('frames', 'time', 'detections', 'detection_time'):
+                self.stats[key] += stats[key]
+            for name, stage in stats['stages'].items():
+                if name in self.stats['stages']:
+                    for key in ('checked', 'rejected', 'time'):
+                        self.stats['stages'][name][key] += stage[key]
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = self._empty_stats()
+
+    def _empty_stats(self):
+        return {
+            'frames': 0,
+            'time': 0.0,
+            'detections': 0,
+            'detection_time': 0.0,
+            'stages': {name: {'checked': 0, 'rejected': 0, 'time': 0.0} for name, _ in self.stages},
+        }
+
+    def report(self):
+        """Per-stage rejection rates and estimated time saved, as printable lines"""
+        with self._stats_lock:
+            stats = {
+                'frames': self.stats['frames'],
+                'time': self.stats['time'],
+                'detections': self.stats['detections'],
+                'detection_time': self.stats['detection_time'],
+                'stages': {name: dict(stage) for name, stage in self.stats['stages'].items()},
+            }
+
+        frames = stats['frames']
+        if frames == 0:
+            return ["Prefilter: no frames checked"]
+
+        lines = []
+        rejected = 0
+        for name, threshold in self.stages:
+            stage = stats['stages'][name]
+            rejected += stage['rejected']
+            rate = stage['rejected'] / stage['checked'] if stage['checked'] else 0.0
+            avg_ms = stage['time'] / stage['checked'] * 1000 if stage['checked'] else 0.0
+            lines.append(f"Prefilter {name} (>= {threshold:.2f}): rejected {stage['rejected']}/{stage['checked']} "
+                         f"({rate:.0%}), {avg_ms:.1f}ms/frame")
+
+        line = f"Prefilter total: rejected {rejected}/{frames} frames ({rejected / frames:.0%})"
+        if stats['detections']:
+            avg_detection = stats['detection_time'] / stats['detections']
+            saved = rejected * avg_detection - stats['time']
+            line += f", saved ~{saved:.1f}s (full detection {avg_detection * 1000:.0f}ms/frame)"
+        lines.append(line)
+        return lines
+
+    def _downscale(self, frame):
+        """Shrink the frame to the prefilter size as BGR"""
+        small = cv2.resize(frame, self.small_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 2:
+            return cv2.cvtColor(small, cv2.COLOR_GRAY2BGR)
+        return to_bgr(small) if small.shape[2] == 4 else small
+
+    def _slot_windows(self, small, margin=0):
+        """Yield each card slot cut out of the downscaled frame, grown by margin pixels"""
+        height, width = small.shape[:2]
+        for x, y, w, h in self.slots:
+            x1, y1 = int(x * self.scale) - margin, int(y * self.scale) - margin
+            x2, y2 = int((x + w) * self.scale) + margin, int((y + h) * self.scale) + margin
+            yield small[max(0, y1):min(height, y2), max(0, x1):min(width, x2)]
+
+    def _run_stage(self, name, small):
+        if name == 'histogram':
+            return self._histogram_score(small)
+        return self._ncc_score(small)
+
+    def _histogram(self, image):
+        """Hue/saturation histogram of the coloured pixels, summing to 1 (all zero if there are none)"""
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        colored = cv2.inRange(hsv, (0, HISTOGRAM_MIN_SATURATION, HISTOGRAM_MIN_VALUE), (180, 255, 255))
+        hist = cv2.calcHist([hsv], [0, 1], colored, HISTOGRAM_BINS, [0, 180, 0, 256])
+        total = hist.sum()
+        return hist / total if total else hist
+
+    def _histogram_score(self, small):
+        """Best histogram overlap (0-1) between any slot and any character image"""
+        best = 0.0
+        for window in self._slot_windows(small):
+            hist = self._histogram(window)
+            for reference in self.histograms:
+                best = max(best, cv2.compareHist(hist, reference, cv2.HISTCMP_INTERSECT))
+        return best
+
+    def _ncc_score(self, small):
+        """Best normalized cross-correlation between any slot and any character image"""
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        best = -1.0
+        for window in self._slot_windows(gray, NCC_SEARCH_MARGIN):
+            for template in self.templates:
+                if window.shape[0] < template.shape[0] or window.shape[1] < template.shape[1]:
+                    continue
+                result = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+                best = max(best, float(result.max()))
+        return best
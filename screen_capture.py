@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Screen Capture
+Grabs frames from LDPlayer instances straight into memory over `exec-out`
+
+Two capture modes are supported:
+- 'png': `screencap -p`, decoded into a BGR image
+- 'raw': plain `screencap` framebuffer, exposed as a zero-copy RGBA view
+
+Frames with 4 channels are always RGBA (raw framebuffer order), frames with
+3 channels are BGR (OpenCV order). Use to_bgr()/to_gray() to normalize.
+"""
+
+import struct
+import cv2
+import numpy as np
+
+CAPTURE_MODES = ('raw', 'png')
+
+# Raw screencap pixel formats (android.graphics.PixelFormat) we know how to read
+RAW_FORMAT_RGBA_8888 = 1
+RAW_FORMAT_RGBX_8888 = 2
+RAW_BYTES_PER_PIXEL = 4
+
+
+def capture_screenshot(adb_client, port, mode='png', timeout=None):
+    """Capture a screenshot over the shared AdbClient without touching the device's or host's disk"""
+    if mode not in CAPTURE_MODES:
+        raise ValueError(f"Unknown capture mode '{mode}' (expected one of {CAPTURE_MODES})")
+
+    if mode == 'raw':
+        return parse_raw_screencap(adb_client.exec_out(port, 'screencap', timeout=timeout))
+    return decode_png(adb_client.exec_out(port, 'screencap -p', timeout=timeout))
+
+
+def capture_bottom_rows(adb_client, port, width, rows, timeout=None):
+    """Capture only the bottom rows of the raw framebuffer, cropped on the device
+
+    Raw screencap output ends with the last pixel row, so `tail -c` on the
+    device sends just those rows (and no header) over adb.
+    """
+    count = width * rows * RAW_BYTES_PER_PIXEL
+    return parse_raw_rows(adb_client.exec_out(port, f'screencap | tail -c {count}', timeout=timeout), width, rows)
+
+
+def decode_png(data):
+    """Decode PNG bytes streamed from screencap into a BGR image"""
+    if not data:
+        raise ValueError("screencap returned no data")
+
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError(f"Could not decode screencap output ({len(data)} bytes)")
+
+    return frame
+
+
+def parse_raw_screencap(data):
+    """Wrap raw screencap output in a read-only (height, width, 4) RGBA view without copying
+
+    The header is width, height and pixel format as little-endian uint32,
+    followed by a colour-space field on Android 9+, so its size is derived
+    from whatever is left over after the pixel data.
+    """
+    if len(data) < 12:
+        raise ValueError(f"Raw screencap output too short ({len(data)} bytes)")
+
+    width, height, pixel_format = struct.unpack_from('<3I', data, 0)
+    if pixel_format not in (RAW_FORMAT_RGBA_8888, RAW_FORMAT_RGBX_8888):
+        raise ValueError(f"Unsupported raw screencap pixel format: {pixel_format}")
+
+    pixel_bytes = width * height * RAW_BYTES_PER_PIXEL
+    header_size = len(data) - pixel_bytes
+    if header_size not in (12, 16):
+        raise ValueError(f"Raw screencap size mismatch: {len(data)} bytes for {width}x{height}")
+
+    frame = np.frombuffer(data, dtype=np.uint8, count=pixel_bytes, offset=header_size)
+    return frame.reshape(height, width, RAW_BYTES_PER_PIXEL)
+
+
+def parse_raw_rows(data, width, rows):
+    """Wrap the bottom rows of a raw screencap in a read-only (rows, width, 4) RGBA view without copying"""
+    pixel_bytes = width * rows * RAW_BYTES_PER_PIXEL
+    if len(data) != pixel_bytes:
+        raise ValueError(f"Raw screencap rows size mismatch: {len(data)} bytes for {rows} rows of {width} pixels")
+
+    return np.frombuffer(data, dtype=np.uint8).reshape(rows, width, RAW_BYTES_PER_PIXEL)
+
+
+def to_bgr(frame):
+    """Return a new, writable BGR copy of a frame (for drawing and PNG encoding)"""
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
+    return frame.copy()
+
+
+def to_gray(frame):
+    """Convert a BGR, RGBA or already-grayscale frame to grayscale"""
+    if frame.ndim == 2:
+        return frame
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
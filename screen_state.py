@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Screen State
+Tells which screen an instance is on from a tiny fingerprint of a few UI regions
+
+A fingerprint is a 16x4 colour thumbnail of each STATE_REGIONS rectangle
+(the exchange points bar and the button row), about 0.5ms per frame. Both
+lie in the bottom strip of the screen (below STRIP_TOP), so a sample only
+needs those rows: capture_bottom_rows() crops them on the device, about a
+sixth of a full frame. classify() compares the fingerprint with references
+learned from screen_states/<state>/*.png and returns the nearest state, or
+'unknown' when nothing is within MAX_STATE_DISTANCE.
+
+ScreenStateTracker samples every instance with the classifier and reports
+when an instance enters the results screen, so a full capture and
+detection run once per result screen instead of at fixed timing marks.
+
+Usage:
+    python screen_state.py add <state> <screenshot>...   # add reference screenshots
+    python screen_state.py [frames_dir]                  # classify every frame (default saved_images)
+"""
+
+import os
+import sys
+import time
+import shutil
+import threading
+import cv2
+import numpy as np
+from screen_capture import to_bgr
+from detection_roi import REFERENCE_SIZE
+
+SCREEN_STATES = ('results', 'loading', 'menu')
+UNKNOWN_STATE = 'unknown'
+RESULTS_STATE = 'results'
+
+TRIGGER_MODES = ('screen state', 'timings')
+
+DEFAULT_STATES_DIR = "screen_states"
+
+# UI regions fingerprinted, as (x, y, w, h) at the 720x1280 reference size:
+# the support exchange points bar and the Back / Scout Again buttons of the result screen
+STATE_REGIONS = [
+    (0, 1070, 720, 50),
+    (0, 1170, 720, 90),
+]
+STRIP_TOP = 1060  # Reference row above every region; samples capture only the rows below it
+FINGERPRINT_SIZE = (16, 4)  # Thumbnail of each region (width, height)
+
+# Mean absolute difference (0-1) to the nearest reference; on saved_images result screens are
+# within 0.01 of each other and every other screen is over 0.3 away
+MAX_STATE_DISTANCE = 0.06
+
+SAMPLE_INTERVAL = 2  # Seconds between state samples of an instance
+CONFIRM_SAMPLES = 2  # Consecutive results samples before the screen counts as entered (lets the cards settle)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def fingerprint(frame, regions=STATE_REGIONS, full_height=None):
+    """Concatenated region thumbnails of a frame, as float32 values in 0-1
+
+    frame may be just the bottom rows of a screen full_height rows tall
+    (see strip_rows()); the regions are then found relative to it.
+    """
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        frame = to_bgr(frame)
+    elif frame.ndim == 2:
+        frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+    height, width = frame.shape[:2]
+    full_height = full_height or height
+    offset = full_height - height  # Rows above the strip that weren't captured
+    sx = width / REFERENCE_SIZE[0]
+    sy = full_height / REFERENCE_SIZE[1]
+    parts = []
+    for x, y, w, h in regions:
+        top = int(y * sy) - offset
+        if top < 0:
+            raise ValueError(f"Region {(x, y, w, h)} starts above the {height}-row strip")
+        crop = frame[top:max(int((y + h) * sy) - offset, top + 1),
+                     int(x * sx):max(int((x + w) * sx), int(x * sx) + 1)]
+        parts.append(cv2.resize(crop, FINGERPRINT_SIZE, interpolation=cv2.INTER_AREA).ravel())
+    return np.concatenate(parts).astype(np.float32) / 255.0
+
+
+def strip_rows(full_height):
+    """Rows at the bottom of a full_height screen that a state sample needs"""
+    return full_height - int(STRIP_TOP * full_height / REFERENCE_SIZE[1])
+
+
+def sample_timings(duration, interval=SAMPLE_INTERVAL):
+    """State sample marks (seconds from the cycle start) covering a cycle"""
+    return [k * interval for k in range(int(duration / interval))]
+
+
+class ScreenStateClassifier:
+    """Nearest-reference screen state from region fingerprints"""
+
+    def __init__(self, max_distance=MAX_STATE_DISTANCE, regions=STATE_REGIONS):
+        self.max_distance = max_distance
+        self.regions = regions
+        self.references = {}  # state -> (n, fingerprint length) array
+
+    def learn(self, states_dir=DEFAULT_STATES_DIR):
+        """Fingerprint the reference screenshots in states_dir/<state>/; returns True if any were found"""
+        self.references = {}
+        if not os.path.isdir(states_dir):
+            return False
+
+        for state in sorted(os.listdir(states_dir)):
+            folder = os.path.join(states_dir, state)
+            if not os.path.isdir(folder) or state.startswith('.'):
+                continue
+            for file in sorted(os.listdir(folder)):
+                if not file.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                frame = cv2.imread(os.path.join(folder, file))
+                if frame is None:
+                    print(f"⚠️  Could not load state reference: {os.path.join(folder, file)}")
+                    continue
+                self.add_reference(state, frame)
+
+        return len(self.references) > 0
+
+    def add_reference(self, state, frame):
+        """Add one reference screenshot for a state"""
+        if state not in SCREEN_STATES and state not in self.references:
+            print(f"⚠️  '{state}' is not one of {', '.join(SCREEN_STATES)}; learning it anyway")
+        fp = fingerprint(frame, self.regions)[np.newaxis, :]
+        current = self.references.get(state)
+        self.references[state] = fp if current is None else np.vstack([current, fp])
+
+    def has_state(self, state):
+        return state in self.references
+
+    def reference_counts(self):
+        return {state: len(fps) for state, fps in self.references.items()}
+
+    def classify(self, frame, full_height=None):
+        """(state, distance to its nearest reference); 'unknown' if no reference is close enough
+
+        frame is a full screen, or its bottom strip_rows() of a screen full_height rows tall.
+        """
+        fp = fingerprint(frame, self.regions, full_height)
+        best_state = UNKNOWN_STATE
+        best_distance = float('inf')
+        for state, fps in self.references.items():
+            distance = float(np.abs(fps - fp).mean(axis=1).min())
+            if distance < best_distance:
+                best_state, best_distance = state, distance
+        if best_distance > self.max_distance:
+            return UNKNOWN_STATE, best_distance
+        return best_state, best_distance
+
+
+class ScreenStateTracker:
+    """Per-instance screen state, reporting when an instance enters the results screen
+
+    An instance enters the results screen once it has been sampled on it
+    confirm_samples times in a row; it can only enter again after a sample
+    on another screen. Instance states are kept across cycles so a results
+    screen left over from the last cycle isn't scanned twice; only the
+    stats are reset per cycle.
+    """
+
+    def __init__(self, classifier, confirm_samples=CONFIRM_SAMPLES):
+        self.classifier = classifier
+        self.confirm_samples = max(1, confirm_samples)
+        self._instances = {}  # instance id -> {'state', 'streak', 'entered'}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def sample(self, instance_id, frame, full_height=None):
+        """Classify one sampled frame (or bottom strip); returns (state, entered results)"""
+        start = time.perf_counter()
+        state, _ = self.classifier.classify(frame, full_height)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            tracked = self._instances.setdefault(instance_id, {'state': None, 'streak': 0, 'entered': False})
+            if state == tracked['state']:
+                tracked['streak'] += 1
+            else:
+                tracked.update(state=state, streak=1, entered=False)
+
+            entered = (state == RESULTS_STATE and not tracked['entered']
+                       and tracked['streak'] >= self.confirm_samples)
+            if entered:
+                tracked['entered'] = True
+
+            self.stats['samples'] += 1
+            if full_height and frame.shape[0] < full_height:
+                self.stats['strips'] += 1
+            else:
+                self.stats['full_captures'] += 1
+            self.stats['time'] += elapsed
+            self.stats['states'][state] = self.stats['states'].get(state, 0) + 1
+            if entered:
+                self.stats['entered'] += 1
+        return state, entered
+
+    def record_full_capture(self):
+        """Count a full capture taken outside sample() (the frame scanned on entering results)"""
+        with self._lock:
+            self.stats['full_captures'] += 1
+
+    def state(self, instance_id):
+        with self._lock:
+            tracked = self._instances.get(instance_id)
+            return tracked['state'] if tracked else None
+
+    def forget(self, instance_id=None):
+        """Drop the tracked state of one instance, or of all of them"""
+        with self._lock:
+            if instance_id is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(instance_id, None)
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {'samples': 0, 'strips': 0, 'full_captures': 0, 'time': 0.0, 'states': {}, 'entered': 0}
+
+    def report(self):
+        """Samples per state, captures and result screens entered, as printable lines"""
+        with self._lock:
+            samples = self.stats['samples']
+            strips = self.stats['strips']
+            full_captures = self.stats['full_captures']
+            elapsed = self.stats['time']
+            states = dict(self.stats['states'])
+            entered = self.stats['entered']
+        if not samples:
+            return ["Screen state: no samples"]
+
+        counts = ', '.join(f"{state} {count}" for state, count in sorted(states.items()))
+        return [f"Screen state: {samples} samples ({counts}), {elapsed / samples * 1000:.2f}ms avg to classify, "
+                f"{entered} result screens entered",
+                f"Screen state captures: {strips} bottom strips, {full_captures} full frames"]
+
+
+def add_references(state, paths, states_dir=DEFAULT_STATES_DIR):
+    """Copy screenshots into states_dir/<state>/ as references"""
+    folder = os.path.join(states_dir, state)
+    os.makedirs(folder, exist_ok=True)
+    added = 0
+    for path in paths:
+        if cv2.imread(path) is None:
+            print(f"ERROR: Could not load screenshot: {path}")
+            continue
+        shutil.copy2(path, os.path.join(folder, os.path.basename(path)))
+        added += 1
+    print(f"✅ Added {added} '{state}' references to {folder}")
+    return added
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == 'add':
+        add_references(sys.argv[2], sys.argv[3:])
+        return
+
+    frames_dir = sys.argv[1] if len(sys.argv) > 1 else "saved_images"
+    classifier = ScreenStateClassifier()
+    if not classifier.learn():
+        print(f"ERROR: No state references in {DEFAULT_STATES_DIR}/ "
+              f"(add some with: python screen_state.py add results <screenshot>)")
+        return
+    print(f"References: {classifier.reference_counts()}")
+
+    counts = {}
+    for file in sorted(f for f in os.listdir(frames_dir) if f.lower().endswith(IMAGE_EXTENSIONS)):
+        frame = cv2.imread(os.path.join(frames_dir, file))
+        if frame is None:
+            continue
+        state, distance = classifier.classify(frame)
+        counts[state] = counts.get(state, 0) + 1
+        print(f"  {file}: {state} ({distance:.3f})")
+
+    print(f"\n{counts}")
+
+
+if __name__ == "__main__":
+    main()
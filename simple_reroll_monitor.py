@@ -12,11 +12,25 @@ import subprocess
 import time
 import os
 import threading
+import queue
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 import configparser
-from smart_character_detection import SmartCharacterDetector
+from smart_character_detection import SmartCharacterDetector, FEATURE_BACKENDS, count_by_character
+from screen_capture import capture_screenshot, capture_bottom_rows, to_bgr, CAPTURE_MODES
+from adb_client import get_adb_client
+from detection_roi import ROI_MODES, card_slot_roi, learn_roi, load_roi, save_roi
+from prefilter import PrefilterCascade
+from detection_service import DetectionService, DETECTION_ENGINES
+from detection_cascade import DetectionCascade, TemplateStage, SmartStage, FeatureStage, DETECTION_METHODS
+from card_classifier import CardSlotClassifier, PullLog, summarize_slots
+from capture_scheduler import CaptureScheduler, LATE_POLICIES
+from async_monitor import AsyncMonitorEngine, async_capture_screenshot, MONITOR_ENGINES
+from screen_state import ScreenStateClassifier, ScreenStateTracker, TRIGGER_MODES, DEFAULT_STATES_DIR, SAMPLE_INTERVAL, sample_timings, strip_rows
 import pyautogui
 import cv2
+import numpy as np
 import hashlib
 
 class SimpleRerollMonitor:
@@ -32,6 +46,7 @@ class SimpleRerollMonitor:
         
         # Variables
         self.is_monitoring = False
+        self.stop_event = threading.Event()  # Set on Stop; wakes the capture scheduler and cycle waits
         self.adb_path = tk.StringVar(value=self.config.get('LDPlayer', 'adb_path', fallback='E:\\LDPlayer\\LDPlayer9\\adb.exe'))
         self.instance_ports = []
         self.instance_count = tk.IntVar(value=1)
@@ -46,9 +61,28 @@ class SimpleRerollMonitor:
         self.deduplication_distance = tk.IntVar(value=150)  # Distance threshold for deduplication (pixels)
         self.auto_close_instances = tk.BooleanVar(value=True)  # Auto close instances when they reach target
         self.ldplayer_console_path = tk.StringVar(value='E:\\LDPlayer\\LDPlayer9\\ldconsole.exe')  # LDPlayer console path
+        self.capture_mode = tk.StringVar(value='raw')  # 'raw' framebuffer or 'png' screencap
+        self.capture_workers = tk.IntVar(value=8)  # Max instances captured in parallel at each timing mark
+        self.detection_workers = tk.IntVar(value=2)  # Threads analyzing frames while captures are still running
+        self.detection_roi = tk.StringVar(value='card slots')  # Where SIFT looks for features: 'card slots', 'learned' or 'off'
+        self.use_prefilter = tk.BooleanVar(value=False)  # Reject frames with cheap checks before SIFT (opt-in)
+        self.detection_engine = tk.StringVar(value='threads')  # 'threads' share one detector, 'processes' use every core
+        self.feature_backend = tk.StringVar(value='sift')  # 'sift', or the faster binary 'orb' / 'akaze' descriptors
+        self.use_slot_classifier = tk.BooleanVar(value=False)  # Identify every card slot and write a pull log
+        self.late_policy = tk.StringVar(value='compress')  # Missed marks: 'capture' late, 'compress' to the latest, or 'skip'
+        self.monitor_engine = tk.StringVar(value='threads')  # 'threads' capture marks in lockstep, 'asyncio' runs a coroutine per instance
+        self.capture_trigger = tk.StringVar(value='timings')  # 'timings' scans at fixed marks, 'screen state' on entering the results screen
+        self.detection_method = tk.StringVar(value='smart')  # 'smart' detector alone, or the 'cascade' that adds the other methods
         
         # Smart character detector
         self.character_detector = None
+        self.detection_service = None  # Process pool used while monitoring with the 'processes' engine
+        self.detection_cascade = None  # DetectionCascade while monitoring with the 'cascade' detection method
+        self.async_engine = None  # AsyncMonitorEngine while monitoring with the 'asyncio' engine
+        self.state_tracker = None  # ScreenStateTracker while monitoring with the 'screen state' trigger
+        self.screen_sizes = {}  # {port: (width, height)} from full captures, for bottom-strip samples
+        self.slot_classifier = None  # CardSlotClassifier when the slot classifier is on
+        self.pull_log = None
         self.detector_initialized = False
         self.confidence_threshold = 0.85  # Increased from 0.7 to 0.85
         
@@ -59,6 +93,11 @@ class SimpleRerollMonitor:
         self.instance_last_screenshots = {}  # {instance_id: last_screenshot_hash}
         self.ignored_instances = set()  # Set of instance IDs to ignore due to duplicates
         
+        # Shared state touched by capture/detection workers
+        self.results_lock = threading.Lock()
+        self.engine_lock = threading.Lock()  # Guards async_engine between the Tk thread (Stop) and the monitoring thread
+        self.log_lock = threading.Lock()
+        
         # Statistics
         self.current_cycles = 0
         self.successful_pulls = 0
@@ -143,11 +182,67 @@ class SimpleRerollMonitor:
         ttk.Spinbox(main_frame, from_=20, to=200, textvariable=self.deduplication_distance, width=10).grid(row=12, column=1, sticky=tk.W, padx=(5, 0), pady=2)
         ttk.Label(main_frame, text="(Removes duplicate detections within this distance)", font=('Arial', 8)).grid(row=12, column=2, sticky=tk.W, padx=(5, 0), pady=2)
         
+        # Performance
+        ttk.Label(main_frame, text="Performance", font=('Arial', 12, 'bold')).grid(row=13, column=0, columnspan=3, pady=(20, 10), sticky=tk.W)
+        
+        self.performance_frame = ttk.Frame(main_frame)
+        self.performance_frame.grid(row=14, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        
+        ttk.Label(self.performance_frame, text="Capture Mode:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        ttk.Combobox(self.performance_frame, textvariable=self.capture_mode, values=CAPTURE_MODES, state='readonly', width=8).grid(row=0, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        ttk.Label(self.performance_frame, text="(raw skips PNG encode/decode; PNG is only written for saved images)", font=('Arial', 8)).grid(row=0, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        ttk.Label(self.performance_frame, text="Capture Workers:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        ttk.Spinbox(self.performance_frame, from_=1, to=20, textvariable=self.capture_workers, width=8).grid(row=1, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        ttk.Label(self.performance_frame, text="(instances captured in parallel at each timing mark)", font=('Arial', 8)).grid(row=1, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        ttk.Label(self.performance_frame, text="Detection Workers:").grid(row=2, column=0, sticky=tk.W, pady=2)
+        ttk.Spinbox(self.performance_frame, from_=1, to=16, textvariable=self.detection_workers, width=8).grid(row=2, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        ttk.Label(self.performance_frame, text="(frames are analyzed as soon as they are captured)", font=('Arial', 8)).grid(row=2, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        ttk.Label(self.performance_frame, text="Detection ROI:").grid(row=3, column=0, sticky=tk.W, pady=2)
+        roi_combo = ttk.Combobox(self.performance_frame, textvariable=self.detection_roi, values=ROI_MODES, state='readonly', width=10)
+        roi_combo.grid(row=3, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        roi_combo.bind('<<ComboboxSelected>>', lambda e: self.apply_detection_roi())
+        ttk.Label(self.performance_frame, text="(only search card slots; 'learned' uses slots that held hits in saved_images)", font=('Arial', 8)).grid(row=3, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        ttk.Checkbutton(self.performance_frame, text="Prefilter", variable=self.use_prefilter, command=self.apply_prefilter).grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=2)
+        ttk.Label(self.performance_frame, text="(skip SIFT on frames whose card slots look nothing like the character; tune with tune_prefilter.py)", font=('Arial', 8)).grid(row=4, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        ttk.Label(self.performance_frame, text="Detection Engine:").grid(row=5, column=0, sticky=tk.W, pady=2)
+        ttk.Combobox(self.performance_frame, textvariable=self.detection_engine, values=DETECTION_ENGINES, state='readonly', width=10).grid(row=5, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        ttk.Label(self.performance_frame, text="(processes run one warm detector per detection worker on separate cores)", font=('Arial', 8)).grid(row=5, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        ttk.Label(self.performance_frame, text="Feature Backend:").grid(row=6, column=0, sticky=tk.W, pady=2)
+        backend_combo = ttk.Combobox(self.performance_frame, textvariable=self.feature_backend, values=FEATURE_BACKENDS, state='readonly', width=10)
+        backend_combo.grid(row=6, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        backend_combo.bind('<<ComboboxSelected>>', lambda e: self.apply_feature_backend())
+        ttk.Label(self.performance_frame, text="(orb/akaze are faster than sift; compare them with benchmark_backends.py)", font=('Arial', 8)).grid(row=6, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        ttk.Checkbutton(self.performance_frame, text="Slot Classifier", variable=self.use_slot_classifier, command=self.apply_slot_classifier).grid(row=7, column=0, columnspan=2, sticky=tk.W, pady=2)
+        ttk.Label(self.performance_frame, text="(identify every card slot from card_index/ and log all pulls to pull_log.csv)", font=('Arial', 8)).grid(row=7, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        ttk.Label(self.performance_frame, text="Missed Marks:").grid(row=8, column=0, sticky=tk.W, pady=2)
+        ttk.Combobox(self.performance_frame, textvariable=self.late_policy, values=LATE_POLICIES, state='readonly', width=10).grid(row=8, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        ttk.Label(self.performance_frame, text="(when a slow mark makes the next ones late: capture them late, compress to the latest, or skip)", font=('Arial', 8)).grid(row=8, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        ttk.Label(self.performance_frame, text="Monitoring Engine:").grid(row=9, column=0, sticky=tk.W, pady=2)
+        ttk.Combobox(self.performance_frame, textvariable=self.monitor_engine, values=MONITOR_ENGINES, state='readonly', width=10).grid(row=9, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        ttk.Label(self.performance_frame, text="(asyncio captures each instance on its own schedule without a thread per emulator; good for 20+ instances)", font=('Arial', 8)).grid(row=9, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        ttk.Label(self.performance_frame, text="Capture Trigger:").grid(row=10, column=0, sticky=tk.W, pady=2)
+        ttk.Combobox(self.performance_frame, textvariable=self.capture_trigger, values=TRIGGER_MODES, state='readonly', width=10).grid(row=10, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        ttk.Label(self.performance_frame, text="(screen state samples each instance and scans only on entering the results screen; references in screen_states/)", font=('Arial', 8)).grid(row=10, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        ttk.Label(self.performance_frame, text="Detection Method:").grid(row=11, column=0, sticky=tk.W, pady=2)
+        ttk.Combobox(self.performance_frame, textvariable=self.detection_method, values=DETECTION_METHODS, state='readonly', width=10).grid(row=11, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        ttk.Label(self.performance_frame, text="(cascade runs template matching first and feature matching/OCR only when smart detection is unsure)", font=('Arial', 8)).grid(row=11, column=2, sticky=tk.W, padx=(5, 0), pady=2)
+        
         # Screenshot Timings
-        ttk.Label(main_frame, text="Screenshot Timings", font=('Arial', 12, 'bold')).grid(row=13, column=0, columnspan=3, pady=(20, 10), sticky=tk.W)
+        ttk.Label(main_frame, text="Screenshot Timings", font=('Arial', 12, 'bold')).grid(row=15, column=0, columnspan=3, pady=(20, 10), sticky=tk.W)
         
         timing_frame = ttk.Frame(main_frame)
-        timing_frame.grid(row=14, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        timing_frame.grid(row=16, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
         
         self.timing_entry = tk.StringVar(value="128, 143, 157, 172, 187, 201, 216")  # Default screenshot timings (2:08, 2:23, 2:37, 2:52, 3:07, 3:21, 3:36)
         ttk.Label(timing_frame, text="Screenshot times (seconds, comma-separated):").pack(side=tk.LEFT)
@@ -158,29 +253,29 @@ class SimpleRerollMonitor:
         
         # Timing list
         self.timing_listbox = tk.Listbox(main_frame, height=4)
-        self.timing_listbox.grid(row=15, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        self.timing_listbox.grid(row=17, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
         
         # Load default timings
         self.load_default_timings()
         
         # Character Configuration
-        ttk.Label(main_frame, text="Character Configuration", font=('Arial', 12, 'bold')).grid(row=16, column=0, columnspan=3, pady=(20, 10), sticky=tk.W)
+        ttk.Label(main_frame, text="Character Configuration", font=('Arial', 12, 'bold')).grid(row=18, column=0, columnspan=3, pady=(20, 10), sticky=tk.W)
         
-        ttk.Label(main_frame, text="Target Character:").grid(row=17, column=0, sticky=tk.W, pady=2)
-        ttk.Entry(main_frame, textvariable=self.target_character, width=30).grid(row=17, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        ttk.Label(main_frame, text="Target Character:").grid(row=19, column=0, sticky=tk.W, pady=2)
+        ttk.Entry(main_frame, textvariable=self.target_character, width=30).grid(row=19, column=1, sticky=tk.W, padx=(5, 0), pady=2)
         
         # Smart Detection Info
-        ttk.Label(main_frame, text="Smart Detection", font=('Arial', 12, 'bold')).grid(row=18, column=0, columnspan=3, pady=(20, 10), sticky=tk.W)
+        ttk.Label(main_frame, text="Smart Detection", font=('Arial', 12, 'bold')).grid(row=20, column=0, columnspan=3, pady=(20, 10), sticky=tk.W)
         
         info_frame = ttk.Frame(main_frame)
-        info_frame.grid(row=19, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        info_frame.grid(row=21, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
         
         ttk.Label(info_frame, text="Using smart detection with all images from 'characters' folder").pack(side=tk.LEFT)
         ttk.Button(info_frame, text="Initialize Detector", command=self.initialize_detector).pack(side=tk.LEFT, padx=(10, 0))
         
         # Control Buttons
         control_frame = ttk.Frame(main_frame)
-        control_frame.grid(row=20, column=0, columnspan=3, pady=20)
+        control_frame.grid(row=22, column=0, columnspan=3, pady=20)
         
         self.start_button = ttk.Button(control_frame, text="Start Monitoring", command=self.start_monitoring)
         self.start_button.pack(side=tk.LEFT, padx=(0, 10))
@@ -195,11 +290,11 @@ class SimpleRerollMonitor:
         ttk.Button(control_frame, text="Debug ADB", command=self.debug_adb).pack(side=tk.LEFT)
         
         # Status and Log
-        ttk.Label(main_frame, text="Status & Log", font=('Arial', 12, 'bold')).grid(row=21, column=0, columnspan=3, pady=(20, 10), sticky=tk.W)
+        ttk.Label(main_frame, text="Status & Log", font=('Arial', 12, 'bold')).grid(row=23, column=0, columnspan=3, pady=(20, 10), sticky=tk.W)
         
         # Status frame
         status_frame = ttk.Frame(main_frame)
-        status_frame.grid(row=22, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        status_frame.grid(row=24, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
         
         ttk.Label(status_frame, text="Cycles:").pack(side=tk.LEFT)
         self.cycle_label = ttk.Label(status_frame, text="0")
@@ -211,7 +306,7 @@ class SimpleRerollMonitor:
         
         # Instance status frame
         self.instance_status_frame = ttk.Frame(main_frame)
-        self.instance_status_frame.grid(row=23, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        self.instance_status_frame.grid(row=25, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
         
         ttk.Label(self.instance_status_frame, text="Per-Instance Pulls:", font=('Arial', 10, 'bold')).pack(side=tk.LEFT)
         
@@ -220,10 +315,10 @@ class SimpleRerollMonitor:
         
         # Log area
         self.log_text = scrolledtext.ScrolledText(main_frame, height=10, width=80)
-        self.log_text.grid(row=24, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        self.log_text.grid(row=26, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
         
         # Configure main frame row weights
-        main_frame.rowconfigure(24, weight=1)
+        main_frame.rowconfigure(26, weight=1)
         
         # Bind Page Down key to trigger macro in LDPlayer
         self.root.bind('<Next>', lambda event: self.trigger_macro())
@@ -289,6 +384,8 @@ class SimpleRerollMonitor:
             # Common LDPlayer ADB ports (5555-5564 for instances 1-10)
             possible_ports = list(range(5555, 5565))
             discovered_ports = []
+            adb_client = get_adb_client(adb_path)
+            self.log(f"Probing instances over {adb_client.transport}")
             
             # First, get list of already connected devices
             try:
@@ -317,52 +414,25 @@ class SimpleRerollMonitor:
                 try:
                     self.log(f"Testing port {port}...")
                     
-                    # If already connected, test it directly
-                    if port in connected_ports:
-                        try:
-                            result = subprocess.run(
-                                [adb_path, '-s', f'127.0.0.1:{port}', 'shell', 'echo', 'test'], 
-                                capture_output=True, text=True, timeout=5
-                            )
-                            
-                            if result.returncode == 0:
-                                discovered_ports.append(port)
-                                self.log(f"✅ Found already connected instance on port {port}")
-                                continue
-                        except Exception as e:
-                            self.log(f"❌ Error testing already connected port {port}: {str(e)}")
-                    
-                    # Method 1: Try shell command
-                    try:
-                        result = subprocess.run(
-                            [adb_path, '-s', f'127.0.0.1:{port}', 'shell', 'echo', 'test'], 
-                            capture_output=True, text=True, timeout=5
-                        )
-                        
-                        if result.returncode == 0:
-                            discovered_ports.append(port)
-                            self.log(f"✅ Found instance on port {port} (method 1)")
-                            continue
+                    # Method 1: Try shell command over the pooled connection
+                    if adb_client.is_alive(port):
+                        discovered_ports.append(port)
+                        if port in connected_ports:
+                            self.log(f"✅ Found already connected instance on port {port}")
                         else:
-                            self.log(f"❌ Port {port} failed shell test: {result.stderr}")
-                    except subprocess.TimeoutExpired:
-                        self.log(f"⏱️ Timeout on port {port} (method 1)")
-                    except Exception as e:
-                        self.log(f"❌ Error testing port {port} (method 1): {str(e)}")
+                            self.log(f"✅ Found instance on port {port} (method 1)")
+                        continue
+                    else:
+                        self.log(f"❌ Port {port} failed shell test")
                     
                     # Method 2: Try getprop command
                     try:
-                        result = subprocess.run(
-                            [adb_path, '-s', f'127.0.0.1:{port}', 'shell', 'getprop', 'ro.product.model'], 
-                            capture_output=True, text=True, timeout=5
-                        )
+                        model = adb_client.getprop(port, 'ro.product.model')
                         
-                        if result.returncode == 0 and result.stdout.strip():
+                        if model:
                             discovered_ports.append(port)
-                            self.log(f"✅ Found instance on port {port} (method 2): {result.stdout.strip()}")
+                            self.log(f"✅ Found instance on port {port} (method 2): {model}")
                             continue
-                    except subprocess.TimeoutExpired:
-                        self.log(f"⏱️ Timeout on port {port} (method 2)")
                     except Exception as e:
                         self.log(f"❌ Error testing port {port} (method 2): {str(e)}")
                     
@@ -497,12 +567,17 @@ class SimpleRerollMonitor:
         """Initialize the smart character detector"""
         try:
             self.log("Initializing smart character detector...")
-            self.character_detector = SmartCharacterDetector(confidence_threshold=self.confidence_threshold)
+            self.character_detector = SmartCharacterDetector(
+                confidence_threshold=self.confidence_threshold,
+                prefilter=PrefilterCascade() if self.use_prefilter.get() else None,
+                backend=self.feature_backend.get()
+            )
+            self.apply_detection_roi()
             
             if self.character_detector.learn_character():
                 self.detector_initialized = True
                 self.log("✅ Smart character detector initialized successfully!")
-                self.log(f"Ready to detect Twin Turbo characters using all images from 'characters' folder (confidence threshold: {self.confidence_threshold})")
+                self.log(f"Ready to detect {', '.join(self.character_detector.character_names)} using all images from 'characters' folder (confidence threshold: {self.confidence_threshold}, backend: {self.character_detector.backend})")
             else:
                 self.log("❌ Failed to initialize character detector")
                 self.detector_initialized = False
@@ -511,6 +586,72 @@ class SimpleRerollMonitor:
             self.log(f"Error initializing detector: {str(e)}")
             self.detector_initialized = False
     
+    def apply_feature_backend(self):
+        """Re-learn the character with the selected feature backend"""
+        if not self.character_detector or self.character_detector.backend == self.feature_backend.get():
+            return
+        if self.is_monitoring:
+            self.log("⚠️  Stop monitoring before changing the feature backend")
+            self.feature_backend.set(self.character_detector.backend)
+            return
+        
+        self.log(f"Switching feature backend to {self.feature_backend.get()}...")
+        self.initialize_detector()
+    
+    def apply_slot_classifier(self):
+        """Turn the card-slot classifier and pull log on or off"""
+        if not self.use_slot_classifier.get():
+            self.slot_classifier = None
+            self.pull_log = None
+            self.log("Slot classifier: off")
+            return
+        
+        classifier = CardSlotClassifier()
+        if classifier.learn():
+            self.log(f"Slot classifier: {len(classifier.names)} known cards of {len(set(classifier.names))} characters")
+        else:
+            self.log("Slot classifier: card_index/ is empty, cards will be added as the detector finds them "
+                     "(run card_classifier.py harvest to collect the rest)")
+        self.pull_log = PullLog()
+        self.slot_classifier = classifier
+    
+    def apply_prefilter(self):
+        """Turn the detection prefilter on or off"""
+        if not self.character_detector:
+            return
+        
+        self.character_detector.set_prefilter(PrefilterCascade() if self.use_prefilter.get() else None)
+        self.log(f"Prefilter: {'on' if self.character_detector.prefilter else 'off'}")
+    
+    def apply_detection_roi(self):
+        """Restrict the detector to the selected region of interest"""
+        if not self.character_detector:
+            return
+        
+        mode = self.detection_roi.get()
+        rects = None
+        try:
+            if mode == 'card slots':
+                rects = card_slot_roi()
+            elif mode == 'learned':
+                rects = load_roi()
+                if rects is None:
+                    self.log("Learning detection ROI from saved_images...")
+                    result = learn_roi(self.saved_images_folder)
+                    rects = result['rects']
+                    if rects:
+                        save_roi(rects)
+                        self.log(f"Learned ROI from {result['hits']} hits ({len(result['outliers'])} outside card slots ignored)")
+                    else:
+                        self.log("⚠️  No annotated hits to learn from, using all card slots")
+                        rects = card_slot_roi()
+        except Exception as e:
+            self.log(f"Error loading detection ROI: {str(e)}, using all card slots")
+            rects = card_slot_roi()
+        
+        self.character_detector.set_roi(rects)
+        self.log(f"Detection ROI: {mode}" + (f" ({len(rects)} regions)" if rects else " (full frame)"))
+    
     def test_adb_connection(self):
         """Test ADB connection to instances"""
         if not self.instance_ports:
@@ -522,13 +663,12 @@ class SimpleRerollMonitor:
             messagebox.showerror("Error", f"ADB not found at: {adb_path}")
             return
         
-        self.log("Testing ADB connections...")
+        adb_client = get_adb_client(adb_path)
+        self.log(f"Testing ADB connections ({adb_client.transport})...")
         
         for i, port in enumerate(self.instance_ports):
             try:
-                result = subprocess.run([adb_path, '-s', f'127.0.0.1:{port}', 'shell', 'echo', 'test'], 
-                                      capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
+                if adb_client.is_alive(port):
                     self.log(f"Instance {i+1} (port {port}): Connected")
                 else:
                     self.log(f"Instance {i+1} (port {port}): Failed to connect")
@@ -572,6 +712,7 @@ class SimpleRerollMonitor:
             # Test ADB kill-server and start-server
             try:
                 self.log("Restarting ADB server...")
+                get_adb_client(adb_path).close()  # Drop pooled connections, they reconnect on next use
                 subprocess.run([adb_path, 'kill-server'], capture_output=True, timeout=5)
                 time.sleep(1)
                 subprocess.run([adb_path, 'start-server'], capture_output=True, timeout=5)
@@ -628,13 +769,11 @@ class SimpleRerollMonitor:
             
             self.log(f"Taking test screenshot from instance 1 (port {port})...")
             
-            # Take screenshot
-            subprocess.run([adb_path, '-s', f'127.0.0.1:{port}', 'shell', 'screencap', '/sdcard/screenshot.png'], check=True)
-            
-            # Pull screenshot
-            subprocess.run([adb_path, '-s', f'127.0.0.1:{port}', 'pull', '/sdcard/screenshot.png', filename], check=True)
+            # Stream screenshot into memory, then save it for inspection
+            screenshot = capture_screenshot(get_adb_client(adb_path), port, mode=self.capture_mode.get())
+            cv2.imwrite(filename, to_bgr(screenshot))
             
-            self.log(f"Test screenshot saved as: {filename}")
+            self.log(f"Test screenshot saved as: {filename} ({screenshot.shape[1]}x{screenshot.shape[0]})")
             
         except Exception as e:
             self.log(f"Error taking test screenshot: {str(e)}")
@@ -793,6 +932,7 @@ class SimpleRerollMonitor:
             return
         
         self.is_monitoring = True
+        self.stop_event.clear()
         self.start_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
         
@@ -817,24 +957,89 @@ class SimpleRerollMonitor:
     def stop_monitoring(self):
         """Stop monitoring instances"""
         self.is_monitoring = False
+        self.stop_event.set()
+        with self.engine_lock:
+            if self.async_engine is not None:
+                self.async_engine.stop()
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
         self.log("Monitoring stopped")
     
     def monitoring_loop(self):
         """Main monitoring loop with automatic repetition"""
+        capture_pool = None
+        detection_pool = None
+        async_engine = None
         try:
-            adb_path = self.adb_path.get()
+            adb_client = get_adb_client(self.adb_path.get())
             duration = self.monitoring_duration.get()
             cycle_duration = self.cycle_duration.get()
             target_pulls = self.target_pulls.get()
             auto_repeat = self.auto_repeat.get()
+            capture_mode = self.capture_mode.get()
             
             self.log(f"Starting automatic reroll monitoring...")
             self.log(f"Cycle duration: {cycle_duration}s")
             self.log(f"Target pulls: {target_pulls}")
             self.log(f"Auto repeat: {'Enabled' if auto_repeat else 'Disabled'}")
-            self.log(f"Screenshots will be taken at: {', '.join([str(t) + 's' for t in self.screenshot_timings])}")
+            self.log(f"Capture mode: {capture_mode}")
+            
+            # Captures fire on monotonic deadlines; Stop wakes the scheduler at once
+            scheduler = CaptureScheduler(self.late_policy.get(), stop_event=self.stop_event)
+            self.log(f"Missed marks: {scheduler.late_policy}")
+            
+            capture_workers = max(1, self.capture_workers.get())
+            detection_workers = max(1, self.detection_workers.get())
+            self.log(f"Capture workers: {capture_workers}")
+            self.log(f"Detection workers: {detection_workers}")
+            
+            if self.monitor_engine.get() == 'asyncio':
+                # One coroutine per instance instead of lockstep marks; the engine runs its own worker pools
+                async_engine = AsyncMonitorEngine(capture_workers, detection_workers, log=self.log)
+                async_engine.start()
+                with self.engine_lock:
+                    self.async_engine = async_engine
+                self.log("Monitoring engine: asyncio (one coroutine per instance)")
+            else:
+                # Bounded pool so every instance is captured at (nearly) the same moment
+                capture_pool = ThreadPoolExecutor(max_workers=capture_workers, thread_name_prefix='capture')
+                # Detection workers consume frames while later captures are still in flight
+                detection_pool = ThreadPoolExecutor(max_workers=detection_workers, thread_name_prefix='detect')
+            
+            # Each detection thread hands its frame to its own warm worker process
+            if self.detection_engine.get() == 'processes' and self.detector_initialized:
+                self.log(f"Starting {detection_workers} detection processes...")
+                service = DetectionService(
+                    detection_workers,
+                    confidence_threshold=self.confidence_threshold,
+                    roi_rects=self.character_detector.roi_rects,
+                    use_prefilter=self.character_detector.prefilter is not None,
+                    backend=self.character_detector.backend
+                )
+                try:
+                    service.start()
+                    self.detection_service = service
+                    self.log("✅ Detection processes ready")
+                except Exception as e:
+                    service.close()
+                    self.log(f"❌ Could not start detection processes ({str(e)}), using threads")
+            
+            if self.detection_method.get() == 'cascade' and self.detector_initialized:
+                self.detection_cascade = self.build_detection_cascade()
+            
+            # Screen state trigger: cheap samples decide when to scan, instead of the fixed timings
+            if self.capture_trigger.get() == 'screen state':
+                classifier = ScreenStateClassifier()
+                if classifier.learn(DEFAULT_STATES_DIR) and classifier.has_state('results'):
+                    self.state_tracker = ScreenStateTracker(classifier)
+                    self.screen_sizes = {}
+                    self.log(f"Capture trigger: screen state, sampling the bottom of each screen every {SAMPLE_INTERVAL}s "
+                             f"(references: {classifier.reference_counts()})")
+                else:
+                    self.log(f"⚠️  No 'results' references in {DEFAULT_STATES_DIR}/, using the screenshot timings "
+                             f"(add some with: python screen_state.py add results <screenshot>)")
+            if self.state_tracker is None:
+                self.log(f"Screenshots will be taken at: {', '.join([str(t) + 's' for t in self.screenshot_timings])}")
             self.log("Waiting for macro trigger (Page Down)...")
             
             while self.is_monitoring:
@@ -864,131 +1069,24 @@ class SimpleRerollMonitor:
                 # Start monitoring immediately
                 self.log("⏳ Starting screenshot monitoring...")
                 
-                # Run one monitoring cycle
-                cycle_start_time = time.time()
-                screenshot_count = 0
-                next_timing_index = 0
-                
-                while self.is_monitoring and (time.time() - cycle_start_time) < duration:
-                    current_time = time.time() - cycle_start_time
-                    
-                    # Check if it's time for the next screenshot
-                    if (next_timing_index < len(self.screenshot_timings) and 
-                        current_time >= self.screenshot_timings[next_timing_index]):
-                        
-                        screenshot_count += 1
-                        timing = self.screenshot_timings[next_timing_index]
-                        self.log(f"Taking screenshots at {timing}s mark (cycle {self.current_cycles}, round {screenshot_count})...")
-                        
-                        # Take screenshots from all active instances first (for exact timing)
-                        screenshot_files = []
-                        for i, port in enumerate(self.instance_ports):
-                            instance_id = i + 1
-                            
-                            # Skip closed instances
-                            if instance_id in self.closed_instances:
-                                self.log(f"Instance {instance_id}: Skipped (already closed)")
-                                continue
-                            
-                            try:
-                                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                                filename = f"screenshot_cycle{self.current_cycles}_instance_{instance_id}_t{timing}s_{timestamp}.png"
-                                
-                                # Take screenshot
-                                subprocess.run([adb_path, '-s', f'127.0.0.1:{port}', 'shell', 'screencap', '/sdcard/screenshot.png'], check=True)
-                                
-                                # Pull screenshot
-                                subprocess.run([adb_path, '-s', f'127.0.0.1:{port}', 'pull', '/sdcard/screenshot.png', filename], check=True)
-                                
-                                # Save all images from first and last instance during first cycle
-                                instance_ids = list(self.instance_pulls.keys())
-                                first_instance = instance_ids[0] if instance_ids else None
-                                last_instance = instance_ids[-1] if instance_ids else None
-                                if self.current_cycles == 1 and instance_id in [first_instance, last_instance]:
-                                    saved_filename = os.path.join(self.saved_images_folder, f"cycle1_instance{instance_id}_t{timing}s_{timestamp}.png")
-                                    try:
-                                        import shutil
-                                        shutil.copy2(filename, saved_filename)
-                                        self.log(f"Instance {instance_id}: Screenshot saved to {saved_filename}")
-                                    except Exception as e:
-                                        self.log(f"Error saving image for instance {instance_id}: {str(e)}")
-                                
-                                screenshot_files.append((instance_id, filename, port))
-                                self.log(f"Instance {instance_id}: Screenshot taken and saved")
-                                
-                            except Exception as e:
-                                self.log(f"Error taking screenshot from instance {instance_id}: {str(e)}")
-                        
-                        # Now scan all screenshots
-                        self.log(f"Scanning {len(screenshot_files)} screenshots for Twin Turbo...")
-                        for instance_id, filename, port in screenshot_files:
-                            try:
-                                # Check for duplicate screenshot
-                                if self.is_duplicate_screenshot(instance_id, filename):
-                                    self.ignored_instances.add(instance_id)
-                                    self.log(f"🚫 Instance {instance_id}: Ignoring all pulls for this cycle due to duplicate screenshot")
-                                    continue
-                                
-                                # Skip if instance is already ignored for this cycle
-                                if instance_id in self.ignored_instances:
-                                    self.log(f"🚫 Instance {instance_id}: Skipping scan (ignored due to previous duplicate)")
-                                    continue
-                                
-                                # Check for target character
-                                detections = self.detect_character_with_details(filename)
-                                if detections:
-                                    self.instance_pulls[instance_id] += 1
-                                    self.successful_pulls += 1
-                                    
-                                    self.log(f"SUCCESS! Found {self.target_character.get()} in instance {instance_id} at {timing}s mark!")
-                                    self.log(f"Instance {instance_id} pulls: {self.instance_pulls[instance_id]}")
-                                    self.log(f"Total pulls: {self.successful_pulls}")
-                                    
-                                    # Save annotated screenshot
-                                    annotated_filename = self.save_annotated_screenshot(filename, detections, instance_id, timing)
-                                    self.log(f"Saved annotated screenshot: {annotated_filename}")
-                                    
-                                    # Check if this instance has reached target
-                                    if self.instance_pulls[instance_id] >= target_pulls:
-                                        self.log(f"🎉 Instance {instance_id} has reached target of {target_pulls} pulls!")
-                                        self.log(f"Instance {instance_id} is ready!")
-                                        
-                                        # Close the instance if auto-close is enabled
-                                        if self.auto_close_instances.get():
-                                            self.log(f"🔄 Auto-closing instance {instance_id}...")
-                                            if self.close_ldplayer_instance(instance_id):
-                                                self.log(f"✅ Instance {instance_id} closed successfully")
-                                            else:
-                                                self.log(f"⚠️ Failed to close instance {instance_id}, but it has reached target")
-                                    
-                                    # Update display
-                                    self.update_instance_labels()
-                                else:
-                                    self.log(f"Instance {instance_id}: No Twin Turbo detected")
-                                
-                                # Delete original screenshot after scanning
-                                try:
-                                    os.remove(filename)
-                                    self.log(f"Instance {instance_id}: Original screenshot deleted after scanning")
-                                except Exception as e:
-                                    self.log(f"Instance {instance_id}: Failed to delete original screenshot: {str(e)}")
-                                
-                            except Exception as e:
-                                self.log(f"Error scanning instance {instance_id}: {str(e)}")
-                                # Try to clean up the file even if scanning failed
-                                try:
-                                    os.remove(filename)
-                                except:
-                                    pass
-                        
-                        next_timing_index += 1
-                    
-                    # Sleep for a short interval to check timing
-                    time.sleep(0.1)
+                if async_engine is not None:
+                    self.run_async_cycle(async_engine, adb_client, capture_mode, duration, target_pulls)
+                elif self.state_tracker is not None:
+                    self.run_state_cycle(scheduler, adb_client, capture_pool, detection_pool, capture_mode, duration, target_pulls)
+                else:
+                    self.run_scheduled_cycle(scheduler, adb_client, capture_pool, detection_pool, detection_workers,
+                                             capture_mode, duration, target_pulls)
                 
                 self.log(f"Cycle {self.current_cycles} completed.")
                 self.log(f"Instance pulls: {dict(self.instance_pulls)}")
                 self.log(f"Total pulls: {self.successful_pulls}")
+                detector = self.detection_service or self.character_detector
+                if detector and detector.prefilter:
+                    for line in detector.prefilter.report():
+                        self.log(line)
+                if self.detection_cascade is not None:
+                    for line in self.detection_cascade.report():
+                        self.log(line)
                 self.update_status()
                 
                 # Check if any active instance has reached target
@@ -1018,7 +1116,7 @@ class SimpleRerollMonitor:
                 if auto_repeat:
                     # Wait for cycle duration before starting next cycle
                     self.log(f"Waiting {cycle_duration}s before next cycle...")
-                    time.sleep(cycle_duration)
+                    self.stop_event.wait(cycle_duration)
                 else:
                     break
             
@@ -1045,16 +1143,385 @@ class SimpleRerollMonitor:
         except Exception as e:
             self.log(f"Monitoring error: {str(e)}")
         finally:
+            if capture_pool is not None:
+                capture_pool.shutdown(wait=False)
+            if detection_pool is not None:
+                detection_pool.shutdown(wait=False)
+            self.detection_cascade = None
+            if self.detection_service is not None:
+                self.detection_service.close()
+                self.detection_service = None
+            if async_engine is not None:
+                with self.engine_lock:
+                    self.async_engine = None
+                async_engine.close()
+            self.state_tracker = None
             self.stop_monitoring()
     
-    def detect_character(self, screenshot_path):
+    def build_detection_cascade(self):
+        """Cascade around the warm smart detector (or detection processes); None if it can't start
+
+        OCR is left out: it reads rarity badges, which every result screen has.
+        """
+        detector = self.detection_service or self.character_detector
+        detect = detector.detect if self.detection_service is not None else detector.detect_character
+        cascade = DetectionCascade([
+            TemplateStage(self.confidence_threshold),
+            SmartStage(self.confidence_threshold, detect=detect),
+            FeatureStage(self.confidence_threshold),
+        ])
+        if not cascade.prepare():
+            self.log("⚠️  Detection cascade could not start, using smart detection alone")
+            return None
+        self.log(f"Detection method: cascade ({', '.join(stage.name for stage in cascade.ordered_stages())})")
+        return cascade
+    
+    def run_scheduled_cycle(self, scheduler, adb_client, capture_pool, detection_pool, detection_workers,
+                            capture_mode, duration, target_pulls):
+        """Run one cycle with the threads engine: every instance at every mark inside the cycle, marks in lockstep"""
+        cycle_start_time = time.time()
+        cycle_start = time.monotonic()
+        screenshot_count = 0
+        scheduler.clear()
+        scheduler.reset_stats()
+        scheduler.schedule_marks(cycle_start, [t for t in self.screenshot_timings if t < duration],
+                                 list(range(1, len(self.instance_ports) + 1)))
+        
+        while self.is_monitoring:
+            events = scheduler.next_due()
+            if not events:
+                break
+            
+            for timing in sorted({event['timing'] for event in events}):
+                mark_events = [event for event in events if event['timing'] == timing]
+                screenshot_count += 1
+                lateness = max(event['lateness'] for event in mark_events)
+                self.log(f"Taking screenshots at {timing}s mark (cycle {self.current_cycles}, round {screenshot_count}, "
+                         f"{lateness * 1000:.0f}ms after deadline)...")
+                
+                # Capture and scan the due instances as one overlapped pipeline
+                mark_time = cycle_start_time + timing
+                self.process_timing_mark(adb_client, capture_pool, detection_pool, detection_workers,
+                                         capture_mode, timing, mark_time, target_pulls,
+                                         [event['instance_id'] for event in mark_events])
+        
+        # Wait out the rest of the cycle
+        scheduler.wait_until(cycle_start + duration)
+        for line in scheduler.report():
+            self.log(line)
+    
+    def run_async_cycle(self, engine, adb_client, capture_mode, duration, target_pulls):
+        """Run one cycle with the asyncio engine: each instance captured and scanned on its own schedule"""
+        if self.state_tracker is not None:
+            timings = sample_timings(duration)
+            self.state_tracker.reset_stats()
+        else:
+            timings = [t for t in self.screenshot_timings if t < duration]
+        instances = [(i + 1, port) for i, port in enumerate(self.instance_ports)]
+        skews = []
+        
+        instance_ids = {port: instance_id for instance_id, port in instances}
+        
+        async def capture(port):
+            if self.state_tracker is not None:
+                # None unless the instance just entered the results screen
+                return await asyncio.get_running_loop().run_in_executor(
+                    engine.capture_pool, self.sample_screen_state, adb_client, instance_ids[port], port, capture_mode
+                )
+            return await async_capture_screenshot(adb_client, port, capture_mode, executor=engine.capture_pool)
+        
+        def on_frame(instance_id, port, timing, screenshot, captured_at, lateness):
+            with self.results_lock:
+                skews.append(lateness)
+            if self.state_tracker is not None:
+                if screenshot is None:
+                    return
+                self.log(f"Instance {instance_id}: Results screen at {timing}s, scanning")
+            else:
+                self.log(f"Instance {instance_id}: Screenshot taken {lateness:+.3f}s from {timing}s mark ({time.time() - captured_at:.3f}s capture)")
+            self.scan_capture(self._prepare_capture(instance_id, port, timing, screenshot, captured_at, lateness),
+                              timing, target_pulls)
+        
+        completed = engine.run_cycle(instances, timings, duration, capture, on_frame,
+                                     is_active=lambda instance_id: instance_id not in self.closed_instances)
+        if not completed:
+            self.log("Cycle stopped")
+        if skews:
+            self.log(f"Capture lateness: mean {sum(skews) / len(skews) * 1000:.1f}ms, max {max(skews) * 1000:.1f}ms "
+                     f"across {len(skews)} captures")
+        if self.state_tracker is not None:
+            self.log_state_report(duration)
+    
+    def run_state_cycle(self, scheduler, adb_client, capture_pool, detection_pool, capture_mode, duration, target_pulls):
+        """Run one cycle with the screen state trigger: sample every instance each SAMPLE_INTERVAL
+        and scan only the frames where an instance enters the results screen"""
+        cycle_start_time = time.time()
+        cycle_start = time.monotonic()
+        scheduler.clear()
+        scheduler.reset_stats()
+        self.state_tracker.reset_stats()
+        scheduler.schedule_marks(cycle_start, sample_timings(duration), list(range(1, len(self.instance_ports) + 1)))
+        
+        sampling = {}  # instance id -> future of its running sample
+        scans = []
+        while self.is_monitoring:
+            events = scheduler.next_due()
+            if not events:
+                break
+            
+            for event in events:
+                instance_id = event['instance_id']
+                if instance_id in self.closed_instances:
+                    continue
+                # An instance still being sampled skips this sample rather than queueing up
+                running = sampling.get(instance_id)
+                if running is not None and not running.done():
+                    continue
+                sampling[instance_id] = capture_pool.submit(
+                    self._sample_state, detection_pool, scans, adb_client, instance_id,
+                    self.instance_ports[instance_id - 1], capture_mode, event['timing'], cycle_start_time, target_pulls
+                )
+        
+        # Wait out the rest of the cycle, then for the last samples and scans
+        scheduler.wait_until(cycle_start + duration)
+        wait(list(sampling.values()))
+        wait(scans)
+        for line in scheduler.report():
+            self.log(line)
+        self.log_state_report(duration)
+    
+    def _sample_state(self, detection_pool, scans, adb_client, instance_id, port, capture_mode, timing, cycle_start_time, target_pulls):
+        """Capture worker: sample one instance's screen and queue a full scan when it enters the results screen"""
+        try:
+            captured_at = time.time()
+            screenshot = self.sample_screen_state(adb_client, instance_id, port, capture_mode)
+            if screenshot is None:
+                return
+            
+            self.log(f"Instance {instance_id}: Results screen at {timing}s, scanning")
+            capture = self._prepare_capture(instance_id, port, timing, screenshot, captured_at,
+                                            captured_at - (cycle_start_time + timing))
+            scans.append(detection_pool.submit(self.scan_capture, capture, timing, target_pulls))
+        except Exception as e:
+            self.log(f"Error sampling instance {instance_id}: {str(e)}")
+    
+    def sample_screen_state(self, adb_client, instance_id, port, capture_mode):
+        """Sample one instance's screen state; returns a full frame to scan if it just entered the results screen, else None
+        
+        Samples read only the bottom strip of the framebuffer, cropped on the
+        device; the first sample of a port is a full capture to learn its
+        screen size. Entering the results screen costs one full capture.
+        """
+        size = self.screen_sizes.get(port)
+        if size is None:
+            screenshot, _, _ = self.capture_instance(adb_client, port, capture_mode)
+            self.screen_sizes[port] = (screenshot.shape[1], screenshot.shape[0])
+            _, entered = self.state_tracker.sample(instance_id, screenshot)
+            return screenshot if entered else None
+        
+        width, height = size
+        try:
+            strip = capture_bottom_rows(adb_client, port, width, strip_rows(height))
+        except ValueError:
+            # Screen size changed: learn it again from a full capture next time
+            self.screen_sizes.pop(port, None)
+            raise
+        _, entered = self.state_tracker.sample(instance_id, strip, height)
+        if not entered:
+            return None
+        
+        screenshot, _, _ = self.capture_instance(adb_client, port, capture_mode)
+        self.state_tracker.record_full_capture()
+        return screenshot
+    
+    def log_state_report(self, duration):
+        """Log the cycle's screen state samples against the captures and scans fixed timings would have cost"""
+        for line in self.state_tracker.report():
+            self.log(line)
+        active = len(self.instance_ports) - len(self.closed_instances)
+        fixed_scans = active * len([t for t in self.screenshot_timings if t < duration])
+        self.log(f"Full scans: {self.state_tracker.stats['entered']} on entering results "
+                 f"(fixed timings: {fixed_scans} full captures and scans)")
+    
+    def process_timing_mark(self, adb_client, capture_pool, detection_pool, detection_workers, capture_mode, timing, mark_time,
+                            target_pulls, instance_ids=None):
+        """Capture every active instance (of instance_ids, if given) and scan the frames as they arrive
+        
+        Capture workers push frames into a bounded queue and detection workers
+        consume them immediately, so a mark costs roughly max(capture, detect)
+        instead of their sum.
+        """
+        mark_started = time.time()
+        frame_queue = queue.Queue(maxsize=detection_workers * 2)
+        skews = []
+        
+        # Producers: one capture task per active instance
+        capture_futures = []
+        for i, port in enumerate(self.instance_ports):
+            instance_id = i + 1
+            
+            if instance_ids is not None and instance_id not in instance_ids:
+                continue
+            
+            # Skip closed instances
+            if instance_id in self.closed_instances:
+                self.log(f"Instance {instance_id}: Skipped (already closed)")
+                continue
+            
+            capture_futures.append(capture_pool.submit(
+                self._capture_to_queue, frame_queue, adb_client, instance_id, port,
+                capture_mode, timing, mark_time, skews
+            ))
+        
+        # Consumers: detection workers scan frames as soon as they are queued
+        detection_futures = [
+            detection_pool.submit(self._scan_from_queue, frame_queue, timing, target_pulls)
+            for _ in range(detection_workers)
+        ]
+        
+        # Once every capture has been queued, tell each consumer to finish
+        wait(capture_futures)
+        for _ in detection_futures:
+            frame_queue.put(None)
+        wait(detection_futures)
+        
+        if skews:
+            self.log(f"Capture skew at {timing}s mark: {min(skews):+.3f}s to {max(skews):+.3f}s across {len(skews)} instances")
+        self.log(f"{timing}s mark processed in {time.time() - mark_started:.2f}s")
+    
+    def _capture_to_queue(self, frame_queue, adb_client, instance_id, port, capture_mode, timing, mark_time, skews):
+        """Capture worker: grab one instance's frame and hand it to the detection workers"""
+        try:
+            # Stream screenshot straight into memory
+            screenshot, captured_at, capture_duration = self.capture_instance(adb_client, port, capture_mode)
+            skew = captured_at - mark_time
+            capture = self._prepare_capture(instance_id, port, timing, screenshot, captured_at, skew)
+            
+            self.log(f"Instance {instance_id}: Screenshot taken {skew:+.3f}s from mark ({capture_duration:.3f}s capture)")
+            with self.results_lock:
+                skews.append(skew)
+            
+            # Blocks while detection is behind, which keeps memory bounded
+            frame_queue.put(capture)
+            
+        except Exception as e:
+            self.log(f"Error taking screenshot from instance {instance_id}: {str(e)}")
+    
+    def _prepare_capture(self, instance_id, port, timing, screenshot, captured_at, skew):
+        """Name a captured frame (saving first-cycle frames of the first and last instance) for scan_capture"""
+        timestamp = datetime.fromtimestamp(captured_at).strftime("%Y%m%d_%H%M%S")
+        filename = f"screenshot_cycle{self.current_cycles}_instance_{instance_id}_t{timing}s_{timestamp}.png"
+        
+        # Save all images from first and last instance during first cycle
+        instance_ids = list(self.instance_pulls.keys())
+        first_instance = instance_ids[0] if instance_ids else None
+        last_instance = instance_ids[-1] if instance_ids else None
+        if self.current_cycles == 1 and instance_id in [first_instance, last_instance]:
+            saved_filename = os.path.join(self.saved_images_folder, f"cycle1_instance{instance_id}_t{timing}s_{timestamp}.png")
+            try:
+                cv2.imwrite(saved_filename, to_bgr(screenshot))
+                self.log(f"Instance {instance_id}: Screenshot saved to {saved_filename}")
+            except Exception as e:
+                self.log(f"Error saving image for instance {instance_id}: {str(e)}")
+        
+        return {
+            'instance_id': instance_id,
+            'port': port,
+            'filename': filename,
+            'screenshot': screenshot,
+            'captured_at': captured_at,
+            'skew': skew
+        }
+    
+    def _scan_from_queue(self, frame_queue, timing, target_pulls):
+        """Detection worker: scan queued frames until the end-of-mark sentinel arrives"""
+        while True:
+            capture = frame_queue.get()
+            if capture is None:
+                return
+            self.scan_capture(capture, timing, target_pulls)
+    
+    def scan_capture(self, capture, timing, target_pulls):
+        """Check one captured frame for the target character and act on any hit"""
+        instance_id = capture['instance_id']
+        filename = capture['filename']
+        screenshot = capture['screenshot']
+        try:
+            with self.results_lock:
+                # Check for duplicate screenshot
+                if self.is_duplicate_screenshot(instance_id, screenshot):
+                    self.ignored_instances.add(instance_id)
+                    self.log(f"🚫 Instance {instance_id}: Ignoring all pulls for this cycle due to duplicate screenshot")
+                    return
+                
+                # Skip if instance is already ignored for this cycle
+                if instance_id in self.ignored_instances:
+                    self.log(f"🚫 Instance {instance_id}: Skipping scan (ignored due to previous duplicate)")
+                    return
+            
+            # Identify every card and log the pulls once per result screen
+            slots = None
+            if self.slot_classifier is not None:
+                slots = self.slot_classifier.classify(screenshot)
+                if self.pull_log.record(instance_id, self.current_cycles, timing, slots):
+                    self.log(f"Instance {instance_id} pulled: {summarize_slots(slots)}")
+            
+            # Check for target character (runs in parallel across workers)
+            detections = self.detect_character_with_details(screenshot)
+            if slots is not None and detections:
+                for name in self.slot_classifier.learn_from_detections(screenshot, slots, detections):
+                    self.log(f"Instance {instance_id}: saved a possible {name} card to card_index/_unsorted/{name}/ for review")
+            if not detections:
+                self.log(f"Instance {instance_id}: No target characters detected")
+                return
+            
+            with self.results_lock:
+                self.instance_pulls[instance_id] += 1
+                self.successful_pulls += 1
+                instance_pulls = self.instance_pulls[instance_id]
+                
+                found = ', '.join(f"{count}x {name}" for name, count in count_by_character(detections).items())
+                self.log(f"SUCCESS! Found {found} in instance {instance_id} at {timing}s mark!")
+                self.log(f"Instance {instance_id} pulls: {instance_pulls}")
+                self.log(f"Total pulls: {self.successful_pulls}")
+            
+            # Save annotated screenshot
+            annotated_filename = self.save_annotated_screenshot(screenshot, filename, detections, instance_id, timing)
+            self.log(f"Saved annotated screenshot: {annotated_filename}")
+            
+            # Check if this instance has reached target
+            if instance_pulls >= target_pulls:
+                self.log(f"🎉 Instance {instance_id} has reached target of {target_pulls} pulls!")
+                self.log(f"Instance {instance_id} is ready!")
+                
+                # Close the instance if auto-close is enabled
+                if self.auto_close_instances.get():
+                    self.log(f"🔄 Auto-closing instance {instance_id}...")
+                    if self.close_ldplayer_instance(instance_id):
+                        self.log(f"✅ Instance {instance_id} closed successfully")
+                    else:
+                        self.log(f"⚠️ Failed to close instance {instance_id}, but it has reached target")
+            
+            # Update display
+            self.update_instance_labels()
+            
+        except Exception as e:
+            self.log(f"Error scanning instance {instance_id}: {str(e)}")
+    
+    def capture_instance(self, adb_client, port, capture_mode):
+        """Capture one instance, returning the frame, when it was requested and how long it took"""
+        captured_at = time.time()
+        screenshot = capture_screenshot(adb_client, port, mode=capture_mode)
+        return screenshot, captured_at, time.time() - captured_at
+    
+    def detect_character(self, screenshot):
         """Detect target character in screenshot using smart detection"""
         try:
             if not self.detector_initialized or not self.character_detector:
                 return False
             
             # Use smart character detection with deduplication
-            detections = self.detect_character_with_details(screenshot_path)
+            detections = self.detect_character_with_details(screenshot)
             
             # Return True if any unique detections found
             return len(detections) > 0
@@ -1063,24 +1530,31 @@ class SimpleRerollMonitor:
             self.log(f"Character detection error: {str(e)}")
             return False
     
-    def detect_character_with_details(self, screenshot_path):
+    def detect_character_with_details(self, screenshot):
         """Detect target character and return detailed detection results"""
         try:
             if not self.detector_initialized or not self.character_detector:
                 return []
             
-            # Use smart character detection
-            detections = self.character_detector.detect_character(screenshot_path)
+            # Use smart character detection, alone or inside the detection cascade
+            if self.detection_cascade is not None:
+                detections = self.detection_cascade.detect(screenshot)
+            elif self.detection_service is not None:
+                detections = self.detection_service.detect(screenshot)
+            else:
+                detections = self.character_detector.detect_character(screenshot)
             
             if detections:
                 # Log all detections
                 for detection in detections:
-                    self.log(f"Detection: Twin Turbo ({detection['method']}) - Confidence: {detection['confidence']:.2f}, Matches: {detection['matches']}")
+                    self.log(f"Detection: {detection['template']} ({detection['method']}) - Confidence: {detection['confidence']:.2f}, Matches: {detection.get('matches', 0)}")
                 
-                # Filter by confidence threshold
-                filtered_detections = [d for d in detections if d['confidence'] >= self.confidence_threshold]
+                # Filter by confidence threshold, counting only the characters the detector learned
+                characters = set(self.character_detector.character_names)
+                filtered_detections = [d for d in detections
+                                       if d['confidence'] >= self.confidence_threshold and d['template'] in characters]
                 
-                # Remove duplicates (characters too close together)
+                # Remove duplicates (the same character too close together)
                 unique_detections = []
                 for detection in filtered_detections:
                     location = detection['location']
@@ -1089,6 +1563,8 @@ class SimpleRerollMonitor:
                     is_duplicate = False
                     dedup_distance = self.deduplication_distance.get()
                     for existing in unique_detections:
+                        if existing['template'] != detection['template']:
+                            continue
                         existing_location = existing['location']
                         distance = ((location[0] - existing_location[0])**2 + 
                                    (location[1] - existing_location[1])**2)**0.5
@@ -1100,7 +1576,7 @@ class SimpleRerollMonitor:
                     if not is_duplicate:
                         unique_detections.append(detection)
                 
-                self.log(f"After deduplication: {len(unique_detections)} unique Twin Turbo instances")
+                self.log(f"After deduplication: {len(unique_detections)} unique instances {count_by_character(unique_detections)}")
                 return unique_detections
             
             return []
@@ -1108,23 +1584,17 @@ class SimpleRerollMonitor:
             self.log(f"Character detection error: {str(e)}")
             return []
     
-    def save_annotated_screenshot(self, original_filename, detections, instance_id, timing):
+    def save_annotated_screenshot(self, screenshot, original_filename, detections, instance_id, timing):
         """Save screenshot with detection markers pointing out Twin Turbo locations"""
         try:
-            # Load the screenshot
-            screenshot = cv2.imread(original_filename)
-            if screenshot is None:
-                self.log(f"Could not load screenshot for annotation: {original_filename}")
-                return None
-            
-            # Create annotated version
-            annotated_img = screenshot.copy()
+            # Create annotated version (PNG encoding only happens for frames we keep)
+            annotated_img = to_bgr(screenshot)
             
             # Draw detection markers
             for i, detection in enumerate(detections):
                 location = detection['location']
                 confidence = detection['confidence']
-                matches = detection['matches']
+                matches = detection.get('matches', 0)  # Template and OCR hits have no match count
                 
                 # Draw circle around detection
                 cv2.circle(annotated_img, location, 40, (0, 255, 0), 3)
@@ -1135,12 +1605,12 @@ class SimpleRerollMonitor:
                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
                 
                 # Draw label with details
-                label = f"Twin Turbo {i+1} (Conf: {confidence:.2f}, Matches: {matches})"
+                label = f"{detection['template']} {i+1} (Conf: {confidence:.2f}, Matches: {matches})"
                 cv2.putText(annotated_img, label, (location[0] + 50, location[1]), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
             
             # Add title
-            title = f"Instance {instance_id} - {timing}s - {len(detections)} Twin Turbo(s) Found"
+            title = f"Instance {instance_id} - {timing}s - {len(detections)} Character(s) Found"
             cv2.putText(annotated_img, title, (10, 30), 
                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
             
@@ -1178,19 +1648,18 @@ class SimpleRerollMonitor:
                 status = " (IGNORED)"
             label.config(text=f"Instance {instance_id}: {pulls}/{target}{status}")
     
-    def calculate_image_hash(self, image_path):
-        """Calculate hash of image for duplicate detection"""
+    def calculate_image_hash(self, screenshot):
+        """Calculate hash of in-memory screenshot pixels for duplicate detection"""
         try:
-            with open(image_path, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+            return hashlib.md5(np.ascontiguousarray(screenshot).data).hexdigest()
         except Exception as e:
             self.log(f"Error calculating image hash: {str(e)}")
             return None
     
-    def is_duplicate_screenshot(self, instance_id, screenshot_path):
+    def is_duplicate_screenshot(self, instance_id, screenshot):
         """Check if screenshot is duplicate of previous one for this instance"""
         try:
-            current_hash = self.calculate_image_hash(screenshot_path)
+            current_hash = self.calculate_image_hash(screenshot)
             if current_hash is None:
                 return False
             
@@ -1211,9 +1680,10 @@ class SimpleRerollMonitor:
     def log(self, message):
         """Add message to log"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        with self.log_lock:  # Capture/detection workers log concurrently
+            self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
+            self.log_text.see(tk.END)
+            self.root.update_idletasks()
 
 def main():
     root = tk.Tk()
@@ -2,166 +2,398 @@
 """
 Smart Character Detection
 Learns what Twin Turbo looks like from multiple images and detects the character intelligently
+
+Images directly in characters/ are learned as Twin_Turbo. Each subfolder
+(characters/<Name>/) is learned as its own character, and every
+descriptor is labelled with its character so one matching pass per frame
+finds all of them.
 """
 
 import cv2
 import numpy as np
 import os
 import sys
+import time
+import hashlib
 from typing import List, Dict, Any
+from screen_capture import to_gray
+from detection_roi import build_roi_mask
+
+# SIFT settings used for both learning and detection (part of the model cache key)
+SIFT_PARAMS = {
+    'nfeatures': 2000,
+    'nOctaveLayers': 3,
+    'contrastThreshold': 0.04,
+    'edgeThreshold': 10,
+    'sigma': 1.6,
+}
+
+# Binary descriptor settings (matched with Hamming distance instead of squared L2)
+ORB_PARAMS = {
+    'nfeatures': 2000,
+    'scaleFactor': 1.2,
+    'nlevels': 12,  # Character images are up to ~4x larger than a card on the result screen
+}
+AKAZE_PARAMS = {
+    'threshold': 0.001,
+}
+
+# Feature backends the detector can run on
+FEATURE_BACKENDS = ('sift', 'orb', 'akaze')
+
+# Clustering settings for grouping matched points into character instances
+CLUSTER_RADIUS = 100  # Pixels from the seed point
+CLUSTER_MIN_POINTS = 5  # Minimum points for valid detection
+
+RATIO_TEST = 0.7  # Lowe's ratio test
+MIN_GOOD_MATCHES = 10
+
+# Learned features are cached per character image inside the characters folder
+MODEL_CACHE_DIRNAME = ".model_cache"
+
+# Character name for images directly in the characters folder
+DEFAULT_CHARACTER = "Twin_Turbo"
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff')
+
+
+def _file_hash(path):
+    """Content hash of a file, used to notice added or changed character images"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def list_character_images(character_images_dir="characters"):
+    """(character name, image path) for every character image
+    
+    Top-level images belong to DEFAULT_CHARACTER; images in a subfolder
+    belong to the character named after the folder. Hidden folders such
+    as the model cache are skipped.
+    """
+    images = []
+    subfolders = []
+    for entry in sorted(os.listdir(character_images_dir)):
+        path = os.path.join(character_images_dir, entry)
+        if os.path.isdir(path):
+            if not entry.startswith('.'):
+                subfolders.append((entry, path))
+        elif entry.lower().endswith(IMAGE_EXTENSIONS):
+            images.append((DEFAULT_CHARACTER, path))
+    
+    for name, folder in subfolders:
+        for file in sorted(os.listdir(folder)):
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                images.append((name, os.path.join(folder, file)))
+    return images
+
+
+def _backend_params(backend):
+    return {'sift': SIFT_PARAMS, 'orb': ORB_PARAMS, 'akaze': AKAZE_PARAMS}[backend]
+
+
+def _params_key(backend='sift'):
+    """Short key for the feature settings, so changing them invalidates the cache"""
+    settings = repr(sorted(_backend_params(backend).items())) + cv2.__version__
+    if backend != 'sift':
+        settings = backend + settings  # SIFT keeps its original key so existing caches stay valid
+    return hashlib.sha1(settings.encode('utf-8')).hexdigest()[:12]
+
+
+def create_extractor(backend):
+    """Feature extractor for a backend"""
+    if backend == 'sift':
+        return cv2.SIFT_create(**SIFT_PARAMS)
+    if backend == 'orb':
+        return cv2.ORB_create(**ORB_PARAMS)
+    if backend == 'akaze':
+        if not hasattr(cv2, 'AKAZE_create'):
+            raise RuntimeError("AKAZE is not available in this OpenCV build")
+        return cv2.AKAZE_create(**AKAZE_PARAMS)
+    raise ValueError(f"Unknown feature backend '{backend}' (expected one of {FEATURE_BACKENDS})")
+
+
+class DescriptorIndex:
+    """Descriptors prepared once for exact nearest-neighbour search against the descriptors of each frame
+    
+    The descriptors are kept transposed next to their squared norms, so
+    comparing a frame is a single matrix product giving squared L2
+    distances. Binary descriptors are unpacked to one value per bit first,
+    which makes the same product give their Hamming distance.
+    """
+    
+    def __init__(self, descriptors, backend='sift'):
+        self.backend = backend
+        vectors = self._vectors(descriptors)
+        self._transposed = np.ascontiguousarray(vectors.T)
+        self._squared_norms = np.einsum('ij,ij->i', vectors, vectors)
+    
+    def __len__(self):
+        return len(self._squared_norms)
+    
+    def _vectors(self, descriptors):
+        if self.backend == 'sift':
+            return np.asarray(descriptors, dtype=np.float32)
+        return np.unpackbits(np.asarray(descriptors, dtype=np.uint8), axis=1).astype(np.float32)
+    
+    def distances(self, query):
+        """(len(query), len(self)) matrix of distances from every query descriptor to every indexed one
+        
+        Squared L2 for SIFT, Hamming for binary descriptors.
+        """
+        query = self._vectors(query)
+        distances = query @ self._transposed
+        distances *= -2
+        distances += np.einsum('ij,ij->i', query, query)[:, np.newaxis]
+        distances += self._squared_norms
+        return np.maximum(distances, 0, out=distances)  # Rounding can dip just below zero
+
+
+def two_nearest(distances, axis=1):
+    """(nearest index, nearest distance, second-nearest distance) along one axis of a distance matrix
+    
+    The matrix is modified in place (the nearest entries are masked out to
+    find the second-nearest ones).
+    """
+    nearest = np.expand_dims(np.argmin(distances, axis=axis), axis)
+    nearest_distances = np.take_along_axis(distances, nearest, axis)
+    np.put_along_axis(distances, nearest, np.inf, axis)
+    second_distances = distances.min(axis=axis)
+    return nearest.squeeze(axis), nearest_distances.squeeze(axis), second_distances
+
+
+def ratio_test(nearest, second, backend='sift', ratio=RATIO_TEST):
+    """Lowe's ratio test on arrays of nearest and second-nearest distances from two_nearest"""
+    if backend == 'sift':
+        ratio = ratio * ratio  # SIFT distances are squared
+    return nearest < ratio * second
+
 
 class SmartCharacterDetector:
     """Smart detector that learns character features from multiple images"""
     
-    def __init__(self, confidence_threshold=0.7):
+    def __init__(self, confidence_threshold=0.7, use_model_cache=True, roi_rects=None, prefilter=None, backend='sift',
+                 verbose=True):
         self.confidence_threshold = confidence_threshold
+        self.verbose = verbose  # False keeps progress quiet; errors and warnings are always printed
+        self.backend = backend
+        self.use_model_cache = use_model_cache
+        self.roi_rects = roi_rects  # Only look for features inside these (x, y, w, h) rects (see detection_roi)
+        self._roi_masks = {}  # {frame shape: (mask, bounding box)}
+        self.prefilter = prefilter  # Optional PrefilterCascade run before SIFT
         self.character_features = []
-        self.character_keypoints = []
+        self.character_points = np.empty((0, 2), dtype=np.float32)  # Keypoint (x, y) in the character image
+        self.character_sizes = np.empty(0, dtype=np.float32)
+        self.character_angles = np.empty(0, dtype=np.float32)
         self.character_descriptors = []
+        self.character_labels = np.empty(0, dtype=np.int32)  # Index into character_names for every descriptor
+        self.character_names = []
+        self.character_index = None  # DescriptorIndex over character_descriptors, rebuilt whenever the model is learned
+        
+        # Created once and reused for every screenshot (safe to share between detection threads)
+        self.extractor = create_extractor(backend)
         
     def learn_character(self, character_images_dir="characters"):
-        """Learn what the character looks like from multiple images"""
-        print("=== LEARNING TWIN TURBO CHARACTER ===")
+        """Learn what the characters look like from multiple images
+        
+        Top-level images are DEFAULT_CHARACTER and each subfolder is another
+        character (see list_character_images). Features are cached per image
+        under characters/.model_cache, keyed on
+        the image content and feature settings, so only new or changed images
+        are run through the extractor again.
+        """
+        self._log("=== LEARNING CHARACTERS ===")
         
         if not os.path.exists(character_images_dir):
             print(f"ERROR: Characters directory '{character_images_dir}' not found")
             return False
         
         # Get all character images
-        character_images = []
-        for file in os.listdir(character_images_dir):
-            if file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff')):
-                character_images.append(os.path.join(character_images_dir, file))
+        character_images = list_character_images(character_images_dir)
         
         if not character_images:
             print(f"ERROR: No image files found in '{character_images_dir}' directory")
             return False
         
-        print(f"Learning from {len(character_images)} character images:")
-        for img in character_images:
-            print(f"  - {os.path.basename(img)}")
-        print()
+        self._log(f"Learning from {len(character_images)} character images:")
+        for name, img in character_images:
+            self._log(f"  - {name}: {os.path.basename(img)}")
+        self._log("")
         
-        # Initialize SIFT detector
-        sift = cv2.SIFT_create()
+        cache_dir = os.path.join(character_images_dir, MODEL_CACHE_DIRNAME)
+        params_key = _params_key(self.backend)
         
-        # Extract features from all character images
-        all_keypoints = []
-        all_descriptors = []
+        # Extract (or load) features from all character images
+        all_features = []
+        all_names = []
+        used_cache_files = set()
         
-        for img_path in character_images:
+        for name, img_path in character_images:
             try:
-                # Load image
-                img = cv2.imread(img_path)
-                if img is None:
-                    print(f"Warning: Could not load {img_path}")
-                    continue
-                
-                # Convert to grayscale
-                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+                cache_file = os.path.join(cache_dir, f"{_file_hash(img_path)}_{params_key}.npz")
+                used_cache_files.add(os.path.basename(cache_file))
                 
-                # Extract SIFT features
-                keypoints, descriptors = sift.detectAndCompute(gray, None)
+                if self.use_model_cache and os.path.exists(cache_file):
+                    features = self._load_features(cache_file)
+                    source = "cached"
+                else:
+                    # Load image
+                    img = cv2.imread(img_path)
+                    if img is None:
+                        print(f"Warning: Could not load {img_path}")
+                        continue
+                    
+                    # Extract features
+                    keypoints, descriptors = self.extractor.detectAndCompute(to_gray(img), None)
+                    features = self._features_from_keypoints(keypoints, descriptors)
+                    source = "extracted"
+                    
+                    if self.use_model_cache:
+                        self._save_features(cache_file, features)
                 
-                if descriptors is not None and len(keypoints) > 0:
-                    all_keypoints.extend(keypoints)
-                    all_descriptors.append(descriptors)
-                    print(f"✅ {os.path.basename(img_path)}: {len(keypoints)} features")
+                if len(features['descriptors']) > 0:
+                    all_features.append(features)
+                    all_names.append(name)
+                    self._log(f"✅ {os.path.basename(img_path)}: {len(features['descriptors'])} features ({source})")
                 else:
                     print(f"⚠️  {os.path.basename(img_path)}: No features found")
                     
             except Exception as e:
                 print(f"Error processing {img_path}: {str(e)}")
         
-        if not all_descriptors:
+        if self.use_model_cache:
+            self._prune_model_cache(cache_dir, params_key, used_cache_files)
+        
+        if not all_features:
             print("ERROR: No features could be extracted from character images")
             return False
         
-        # Combine all descriptors
-        self.character_descriptors = np.vstack(all_descriptors)
-        self.character_keypoints = all_keypoints
-        
-        print(f"\n✅ Learned {len(self.character_keypoints)} total features")
-        print(f"✅ Character model ready for detection")
+        # Combine all features
+        self.character_descriptors = np.vstack([f['descriptors'] for f in all_features])
+        self.character_points = np.vstack([f['points'] for f in all_features])
+        self.character_sizes = np.concatenate([f['sizes'] for f in all_features])
+        self.character_angles = np.concatenate([f['angles'] for f in all_features])
+        self.character_index = DescriptorIndex(self.character_descriptors, self.backend)
+        
+        # Label every descriptor with its character
+        self.character_names = sorted(set(all_names), key=all_names.index)
+        self.character_labels = np.concatenate([
+            np.full(len(f['descriptors']), self.character_names.index(name), dtype=np.int32)
+            for f, name in zip(all_features, all_names)
+        ])
+        
+        self._log(f"\n✅ Learned {len(self.character_descriptors)} total features")
+        if len(self.character_names) > 1:
+            for i, name in enumerate(self.character_names):
+                self._log(f"  {name}: {np.count_nonzero(self.character_labels == i)} features")
+        
+        if self.prefilter is not None and not self.prefilter.learn(character_images_dir):
+            print("⚠️  Prefilter could not learn from the character images, disabling it")
+            self.prefilter = None
+        
+        self._log(f"✅ Character model ready for detection")
         return True
     
-    def detect_character(self, screenshot_path):
-        """Detect Twin Turbo character in screenshot using learned features"""
-        print(f"\n=== DETECTING TWIN TURBO ===")
-        print(f"Screenshot: {os.path.basename(screenshot_path)}")
+    def _log(self, message):
+        """Print a progress message unless the detector is quiet"""
+        if self.verbose:
+            print(message)
+    
+    def _features_from_keypoints(self, keypoints, descriptors):
+        """Flatten extractor output into plain arrays that can be cached
+        
+        SIFT descriptors are float32, ORB/AKAZE descriptors are packed uint8 bits.
+        """
+        descriptor_dtype = np.float32 if self.backend == 'sift' else np.uint8
+        if descriptors is None or len(keypoints) == 0:
+            return {
+                'descriptors': np.empty((0, self.extractor.descriptorSize()), dtype=descriptor_dtype),
+                'points': np.empty((0, 2), dtype=np.float32),
+                'sizes': np.empty(0, dtype=np.float32),
+                'angles': np.empty(0, dtype=np.float32),
+            }
+        return {
+            'descriptors': np.asarray(descriptors, dtype=descriptor_dtype),
+            'points': np.array([kp.pt for kp in keypoints], dtype=np.float32),
+            'sizes': np.array([kp.size for kp in keypoints], dtype=np.float32),
+            'angles': np.array([kp.angle for kp in keypoints], dtype=np.float32),
+        }
+    
+    def _load_features(self, cache_file):
+        """Load cached features for one character image"""
+        with np.load(cache_file) as data:
+            return {key: data[key] for key in ('descriptors', 'points', 'sizes', 'angles')}
+    
+    def _save_features(self, cache_file, features):
+        """Cache features for one character image (written atomically)"""
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            temp_file = cache_file + ".tmp.npz"
+            np.savez(temp_file, **features)
+            os.replace(temp_file, cache_file)
+        except Exception as e:
+            print(f"Warning: Could not cache features to {cache_file}: {str(e)}")
+    
+    def _prune_model_cache(self, cache_dir, params_key, used_cache_files):
+        """Drop cache entries for images that were removed or changed"""
+        if not os.path.isdir(cache_dir):
+            return
+        for file in os.listdir(cache_dir):
+            if file.endswith(f"_{params_key}.npz") and file not in used_cache_files:
+                try:
+                    os.remove(os.path.join(cache_dir, file))
+                except OSError:
+                    pass
+    
+    def detect_character(self, screenshot):
+        """Detect the learned characters in a screenshot path or in-memory BGR/RGBA frame"""
+        self._log(f"\n=== DETECTING {', '.join(self.character_names).upper() or 'CHARACTERS'} ===")
+        if isinstance(screenshot, np.ndarray):
+            self._log(f"Screenshot: in-memory frame ({screenshot.shape[1]}x{screenshot.shape[0]})")
+        else:
+            self._log(f"Screenshot: {os.path.basename(screenshot)}")
         
         if self.character_descriptors is None or len(self.character_descriptors) == 0:
             print("ERROR: Character model not learned. Run learn_character() first.")
             return []
         
+        detection_start = None
         try:
-            # Load screenshot
-            screenshot = cv2.imread(screenshot_path)
-            if screenshot is None:
-                print(f"ERROR: Could not load screenshot: {screenshot_path}")
-                return []
-            
-            # Convert to grayscale
-            gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+            # Load screenshot unless we were handed a frame already
+            if not isinstance(screenshot, np.ndarray):
+                screenshot_path = screenshot
+                screenshot = cv2.imread(screenshot_path)
+                if screenshot is None:
+                    print(f"ERROR: Could not load screenshot: {screenshot_path}")
+                    return []
             
-            # Initialize SIFT detector
-            sift = cv2.SIFT_create()
+            # Reject frames that clearly can't contain the character before running SIFT
+            if self.prefilter is not None:
+                passed, rejected_by = self.prefilter.check(screenshot)
+                if not passed:
+                    self._log(f"Rejected by {rejected_by} prefilter")
+                    return []
+                detection_start = time.perf_counter()
             
             # Extract features from screenshot
-            screenshot_keypoints, screenshot_descriptors = sift.detectAndCompute(gray, None)
+            screenshot_keypoints, screenshot_descriptors, offset = self._extract_features(screenshot)
             
-            if screenshot_descriptors is None:
-                print("No features found in screenshot")
+            if screenshot_descriptors is None or len(screenshot_descriptors) < 2:
+                self._log("No features found in screenshot")
                 return []
             
-            print(f"Found {len(screenshot_keypoints)} features in screenshot")
-            
-            # FLANN matcher for fast matching
-            FLANN_INDEX_KDTREE = 1
-            index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
-            search_params = dict(checks=50)
-            flann = cv2.FlannBasedMatcher(index_params, search_params)
+            self._log(f"Found {len(screenshot_keypoints)} features in screenshot")
             
-            # Match features
-            matches = flann.knnMatch(self.character_descriptors, screenshot_descriptors, k=2)
+            # Match each learned feature against the screenshot (exact search over the model's index)
+            query_indices, train_indices = self._match_frame(screenshot_descriptors)
             
-            # Apply ratio test to get good matches
-            good_matches = []
-            for match_pair in matches:
-                if len(match_pair) == 2:
-                    m, n = match_pair
-                    if m.distance < 0.7 * n.distance:  # Lowe's ratio test
-                        good_matches.append(m)
+            self._log(f"Found {len(query_indices)} good matches")
             
-            print(f"Found {len(good_matches)} good matches")
-            
-            if len(good_matches) < 10:  # Need minimum matches
-                print("Not enough good matches found")
+            if len(query_indices) < MIN_GOOD_MATCHES:  # Need minimum matches
+                self._log("Not enough good matches found")
                 return []
             
-            # Group matches by location to find character instances
-            character_instances = self._group_matches_by_location(
-                good_matches, 
-                self.character_keypoints, 
-                screenshot_keypoints
-            )
-            
-            # Convert to detection format
-            detections = []
-            for i, instance in enumerate(character_instances):
-                center_x, center_y = instance['center']
-                confidence = instance['confidence']
-                
-                detections.append({
-                    'method': 'smart_detection',
-                    'template': 'Twin_Turbo',
-                    'confidence': confidence,
-                    'location': (int(center_x), int(center_y)),
-                    'matches': instance['match_count']
-                })
-            
-            # Sort by confidence
-            detections.sort(key=lambda x: x['confidence'], reverse=True)
+            matched_points = self._keypoint_points(screenshot_keypoints, offset)[train_indices]
+            detections = self._build_detections(query_indices, matched_points)
             
             return detections
             
@@ -170,56 +402,200 @@ class SmartCharacterDetector:
             import traceback
             traceback.print_exc()
             return []
-    
-    def _group_matches_by_location(self, good_matches, char_keypoints, screenshot_keypoints):
-        """Group matches by location to find distinct character instances"""
-        if not good_matches:
-            return []
         
-        # Get matched points in screenshot
-        matched_points = []
-        for match in good_matches:
-            point = screenshot_keypoints[match.trainIdx].pt
-            matched_points.append(point)
-        
-        # Cluster points to find character instances
-        instances = []
-        used_points = set()
+        finally:
+            if detection_start is not None:
+                self.prefilter.record_detection_time(time.perf_counter() - detection_start)
+    
+    def detect_batch(self, frames):
+        """Detect the learned characters in several in-memory frames at once (e.g. every instance at one timing mark)
+        
+        Every frame is prefiltered, run through the extractor and matched
+        against the model's index in turn, giving the same detections as
+        detect_character() on each frame, with one summary line for the batch.
+        
+        Returns one detection list per frame, in the same order.
+        """
+        results = [[] for _ in frames]
+        if not frames:
+            return results
+        if self.character_descriptors is None or len(self.character_descriptors) == 0:
+            print("ERROR: Character model not learned. Run learn_character() first.")
+            return results
         
-        for i, point in enumerate(matched_points):
-            if i in used_points:
-                continue
+        try:
+            batch_start = time.perf_counter()
+            rejected = 0
+            for i, frame in enumerate(frames):
+                if self.prefilter is not None:
+                    passed, _ = self.prefilter.check(frame)
+                    if not passed:
+                        rejected += 1
+                        continue
+                keypoints, descriptors, offset = self._extract_features(frame)
+                if descriptors is None or len(descriptors) < 2:
+                    continue
+                query_indices, train_indices = self._match_frame(descriptors)
+                if len(query_indices) >= MIN_GOOD_MATCHES:
+                    matched_points = self._keypoint_points(keypoints, offset)[train_indices]
+                    results[i] = self._build_detections(query_indices, matched_points)
             
-            # Find nearby points (same character instance)
-            cluster_points = [point]
-            used_points.add(i)
+            elapsed = time.perf_counter() - batch_start
+            if self.prefilter is not None and len(frames) > rejected:
+                # Spread the batch time over the frames that passed, for the prefilter's savings estimate
+                for _ in range(len(frames) - rejected):
+                    self.prefilter.record_detection_time(elapsed / (len(frames) - rejected))
             
-            for j, other_point in enumerate(matched_points):
-                if j in used_points:
-                    continue
-                
-                # Calculate distance
-                distance = ((point[0] - other_point[0])**2 + (point[1] - other_point[1])**2)**0.5
-                if distance < 100:  # Within 100 pixels
-                    cluster_points.append(other_point)
-                    used_points.add(j)
+            found = sum(len(r) for r in results)
+            self._log(f"Batch of {len(frames)} frames: {found} detections, {rejected} rejected by prefilter "
+                  f"({elapsed * 1000:.0f}ms)")
+            return results
             
-            # Calculate cluster center and confidence
-            if len(cluster_points) >= 5:  # Minimum points for valid detection
-                center_x = sum(p[0] for p in cluster_points) / len(cluster_points)
-                center_y = sum(p[1] for p in cluster_points) / len(cluster_points)
-                
-                # Confidence based on number of matches and their quality
-                confidence = min(0.95, len(cluster_points) / 20.0 + 0.5)
+        except Exception as e:
+            print(f"ERROR during batch detection: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return [[] for _ in frames]
+    
+    def _match_frame(self, descriptors):
+        """(learned descriptor indices, frame descriptor indices) of the learned features passing the ratio test
+        
+        Each learned descriptor is paired with its nearest frame descriptor and
+        kept if that is clearly closer than the second-nearest one.
+        """
+        nearest, nearest_distances, second_distances = two_nearest(self.character_index.distances(descriptors), axis=0)
+        good = ratio_test(nearest_distances, second_distances, self.backend)
+        return np.flatnonzero(good), nearest[good]
+    
+    def _extract_features(self, screenshot):
+        """Keypoints and descriptors of a BGR/RGBA frame, plus the (x, y) offset of the ROI crop they came from"""
+        # Convert to grayscale (raw RGBA framebuffer views are read in place)
+        gray = to_gray(screenshot)
+        
+        # Only run SIFT over the ROI's bounding box, masked down to the card slots
+        mask, offset = None, (0, 0)
+        roi = self._roi_mask(gray.shape)
+        if roi is not None:
+            mask, (x1, y1, x2, y2) = roi
+            gray = gray[y1:y2, x1:x2]
+            offset = (x1, y1)
+        
+        keypoints, descriptors = self.extractor.detectAndCompute(gray, mask)
+        return keypoints, descriptors, offset
+    
+    def _keypoint_points(self, keypoints, offset):
+        """(N, 2) frame coordinates of keypoints (offset undoes the ROI crop)"""
+        points = cv2.KeyPoint_convert(keypoints).astype(np.float64).reshape(-1, 2)
+        points += offset
+        return points
+    
+    def _build_detections(self, query_indices, matched_points):
+        """Cluster matched screenshot points into detection dicts per character, highest confidence first
+        
+        query_indices are the learned descriptors that matched and
+        matched_points the (N, 2) screenshot points they matched.
+        'template' holds the character name.
+        """
+        if len(self.character_names) <= 1:
+            groups = [(self.character_names[0] if self.character_names else DEFAULT_CHARACTER, matched_points)]
+        else:
+            labels = self.character_labels[query_indices]
+            groups = [(name, matched_points[labels == i]) for i, name in enumerate(self.character_names)]
+        
+        detections = []
+        for name, points in groups:
+            # Group matches by location to find character instances
+            character_instances = group_points_by_location(points)
+            
+            # Convert to detection format
+            for instance in character_instances:
+                center_x, center_y = instance['center']
+                confidence = instance['confidence']
                 
-                instances.append({
-                    'center': (center_x, center_y),
+                detections.append({
+                    'method': 'smart_detection',
+                    'template': name,
                     'confidence': confidence,
-                    'match_count': len(cluster_points),
-                    'points': cluster_points
+                    'location': (int(center_x), int(center_y)),
+                    'matches': instance['match_count']
                 })
         
-        return instances
+        # Sort by confidence
+        detections.sort(key=lambda x: x['confidence'], reverse=True)
+        
+        return detections
+    
+    def set_prefilter(self, prefilter, character_images_dir="characters"):
+        """Change the prefilter cascade (None runs SIFT on every frame)"""
+        if prefilter is not None and not prefilter.learn(character_images_dir):
+            print("⚠️  Prefilter could not learn from the character images, disabling it")
+            prefilter = None
+        self.prefilter = prefilter
+    
+    def set_roi(self, roi_rects):
+        """Change the detection ROI (None searches the whole frame)"""
+        self.roi_rects = roi_rects
+        self._roi_masks = {}
+    
+    def _roi_mask(self, shape):
+        """ROI mask cropped to its bounding box (x1, y1, x2, y2) for this frame size, built once per size"""
+        if not self.roi_rects:
+            return None
+        roi = self._roi_masks.get(shape[:2])
+        if roi is None:
+            mask = build_roi_mask(shape, self.roi_rects)
+            ys, xs = np.nonzero(mask)
+            if len(xs) == 0:
+                return None
+            x1, y1, x2, y2 = xs.min(), ys.min(), xs.max() + 1, ys.max() + 1
+            roi = (np.ascontiguousarray(mask[y1:y2, x1:x2]), (int(x1), int(y1), int(x2), int(y2)))
+            self._roi_masks[shape[:2]] = roi
+        return roi
+
+
+def group_points_by_location(points, radius=CLUSTER_RADIUS, min_points=CLUSTER_MIN_POINTS):
+    """Greedily cluster (N, 2) screenshot points into character instances
+    
+    Points are taken as seeds in order; each seed claims every unclaimed
+    point within radius of it. Only the unclaimed points are compared at
+    each step, so busy screens shrink the work as clusters are removed.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    remaining = np.arange(len(points))
+    instances = []
+    
+    while remaining.size:
+        seed = points[remaining[0]]
+        dx = points[remaining, 0] - seed[0]
+        dy = points[remaining, 1] - seed[1]
+        nearby = dx**2 + dy**2 < radius**2  # The seed itself is at distance 0
+        
+        cluster_points = points[remaining[nearby]]
+        remaining = remaining[~nearby]
+        
+        # Calculate cluster center and confidence
+        if len(cluster_points) >= min_points:
+            center_x, center_y = cluster_points.mean(axis=0)
+            
+            # Confidence based on number of matches and their quality
+            confidence = min(0.95, len(cluster_points) / 20.0 + 0.5)
+            
+            instances.append({
+                'center': (float(center_x), float(center_y)),
+                'confidence': confidence,
+                'match_count': len(cluster_points),
+                'points': [tuple(p) for p in cluster_points.tolist()]
+            })
+    
+    return instances
+
+def count_by_character(detections, confidence_threshold=0.0):
+    """Number of detections per character name at or above the confidence threshold"""
+    counts = {}
+    for detection in detections:
+        if detection['confidence'] >= confidence_threshold:
+            counts[detection['template']] = counts.get(detection['template'], 0) + 1
+    return counts
 
 def count_twin_turbo(screenshot_path, confidence_threshold=0.7):
     """Count Twin Turbo characters using smart detection"""
@@ -249,6 +625,8 @@ def count_twin_turbo(screenshot_path, confidence_threshold=0.7):
         # Check if too close to existing detections
         is_duplicate = False
         for existing in unique_detections:
+            if existing['template'] != detection['template']:
+                continue
             existing_location = existing['location']
             distance = ((location[0] - existing_location[0])**2 + 
                        (location[1] - existing_location[1])**2)**0.5
@@ -272,7 +650,7 @@ def count_twin_turbo(screenshot_path, confidence_threshold=0.7):
             location = detection['location']
             confidence = detection['confidence']
             matches = detection['matches']
-            print(f"  {i+1}. At {location} (confidence: {confidence:.3f}, matches: {matches})")
+            print(f"  {i+1}. {detection['template']} at {location} (confidence: {confidence:.3f}, matches: {matches})")
         
         # Show visual results
         show_visual_results(screenshot_path, unique_detections)
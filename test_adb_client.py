@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the AdbClient's adb binary fallback
+"""
+
+import os
+import sys
+import stat
+import tempfile
+from adb_client import AdbClient
+
+# Stand-in adb binary: logs its arguments and only knows devices it was told to connect to
+FAKE_ADB = '''#!{python}
+import os, sys
+folder = os.path.dirname(os.path.abspath(__file__))
+with open(os.path.join(folder, 'calls.log'), 'a') as f:
+    f.write(' '.join(sys.argv[1:]) + '\\n')
+connected = os.path.join(folder, 'connected')
+if sys.argv[1] == 'connect':
+    if sys.argv[2].endswith(':5599'):
+        print('cannot connect to ' + sys.argv[2] + ': Connection refused (10061)')
+    else:
+        open(connected, 'w').close()
+        print('connected to ' + sys.argv[2])
+elif not os.path.exists(connected):
+    sys.stderr.write("error: device '" + sys.argv[2] + "' not found\\n")
+    sys.exit(1)
+else:
+    print(sys.argv[-1])
+'''
+
+
+def make_fake_adb(folder):
+    """Write the stand-in adb into folder and return the path to run it by"""
+    script = os.path.join(folder, 'fake_adb.py')
+    with open(script, 'w') as f:
+        f.write(FAKE_ADB.format(python=sys.executable))
+    if os.name == 'nt':
+        path = os.path.join(folder, 'adb.bat')
+        with open(path, 'w') as f:
+            f.write(f'@"{sys.executable}" "{script}" %*\n')
+        return path
+    os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+    return script
+
+
+def read_calls(folder):
+    with open(os.path.join(folder, 'calls.log')) as f:
+        return f.read().splitlines()
+
+
+def test_binary_fallback_connects_first():
+    """A port the adb server never saw is connected before its first command, and again after the server loses it"""
+    with tempfile.TemporaryDirectory() as folder:
+        client = AdbClient(make_fake_adb(folder))
+        client.use_adb_shell = False
+
+        assert client.is_alive(5555)
+        assert client.is_alive(5555)
+        assert read_calls(folder) == ['connect 127.0.0.1:5555'] + ['-s 127.0.0.1:5555 shell echo test'] * 2
+
+        # adb server restarted: the command fails, the port is reconnected and the command retried
+        os.remove(os.path.join(folder, 'connected'))
+        assert client.shell(5555, 'echo again').strip() == 'again'
+        assert read_calls(folder)[3:] == ['-s 127.0.0.1:5555 shell echo again', 'connect 127.0.0.1:5555',
+                                          '-s 127.0.0.1:5555 shell echo again']
+
+        # Refused connections fail without running the command
+        assert not client.is_alive(5599)
+        assert read_calls(folder)[-1] == 'connect 127.0.0.1:5599'
+
+        # Closing a port makes the next command connect again
+        client.close(5555)
+        assert client.is_alive(5555)
+        assert read_calls(folder)[-2:] == ['connect 127.0.0.1:5555', '-s 127.0.0.1:5555 shell echo test']
+
+    print("Binary fallback connects ports before using them")
+
+
+if __name__ == "__main__":
+    test_binary_fallback_connects_first()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for the asyncio monitoring engine
+"""
+
+import time
+import asyncio
+import threading
+import numpy as np
+from async_monitor import AsyncMonitorEngine
+
+
+def test_every_instance_is_captured_without_a_thread_each():
+    engine = AsyncMonitorEngine(capture_workers=2, detection_workers=2, log=lambda message: None)
+    engine.start()
+    frames = []
+    lock = threading.Lock()
+
+    async def capture(port):
+        await asyncio.sleep(0.01 if port % 5 else 0.2)  # Every fifth instance is slow
+        return np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def on_frame(instance_id, port, timing, frame, captured_at, lateness):
+        with lock:
+            frames.append((instance_id, timing, lateness))
+
+    try:
+        threads_before = threading.active_count()
+        instances = [(i + 1, 5555 + 2 * i) for i in range(25)]
+        start = time.monotonic()
+        assert engine.run_cycle(instances, [0.05, 0.1], 0.15, capture, on_frame,
+                                is_active=lambda instance_id: instance_id != 25)
+        elapsed = time.monotonic() - start
+
+        assert sorted((i, t) for i, t, _ in frames) == [(i, t) for i in range(1, 25) for t in (0.05, 0.1)]
+        # Slow instances are late for their second mark, the others are not held up by them
+        assert all(lateness < 0.1 for i, t, lateness in frames if (5555 + 2 * (i - 1)) % 5)
+        assert elapsed < 1
+        assert threading.active_count() - threads_before <= 2
+    finally:
+        engine.close()
+
+
+def test_stop_cancels_the_cycle():
+    engine = AsyncMonitorEngine(log=lambda message: None)
+    engine.start()
+
+    async def capture(port):
+        await asyncio.sleep(60)
+
+    try:
+        threading.Timer(0.1, engine.stop).start()
+        start = time.monotonic()
+        assert not engine.run_cycle([(1, 5555), (2, 5557)], [0.0], 60, capture, lambda *args: None)
+        assert time.monotonic() - start < 1
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    test_every_instance_is_captured_without_a_thread_each()
+    test_stop_cancels_the_cycle()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for the deadline-based capture scheduler
+"""
+
+import time
+import threading
+from capture_scheduler import CaptureScheduler
+
+
+def test_marks_fire_on_time_in_order():
+    scheduler = CaptureScheduler('capture')
+    start = time.monotonic()
+    scheduler.schedule_marks(start, [0.05, 0.1], [1, 2])
+
+    first = scheduler.next_due()
+    assert [(e['timing'], e['instance_id']) for e in first] == [(0.05, 1), (0.05, 2)]
+    second = scheduler.next_due()
+    assert [e['timing'] for e in second] == [0.1, 0.1]
+    assert time.monotonic() - start >= 0.1
+    assert all(0 <= e['lateness'] < 0.05 for e in first + second)
+    assert scheduler.next_due() == []
+    assert "4 captures" in scheduler.report()[0]
+
+
+def test_missed_marks_are_compressed_or_skipped():
+    now = time.monotonic()
+
+    compressing = CaptureScheduler('compress')
+    compressing.schedule_marks(now - 10, [1, 2, 3], [1, 2])
+    events = compressing.next_due()
+    assert [(e['timing'], e['instance_id']) for e in events] == [(3, 1), (3, 2)]
+    assert compressing.stats['compressed'] == 4
+
+    skipping = CaptureScheduler('skip', max_lateness=2.0)
+    skipping.schedule_marks(now - 5, [1, 4], [1])  # 4s and 1s late
+    skipping.schedule(now + 0.05, 1, 5.05)
+    assert [e['timing'] for e in skipping.next_due()] == [4]
+    assert skipping.stats['skipped'] == 1
+    assert [e['timing'] for e in skipping.next_due()] == [5.05]
+
+    late = CaptureScheduler('capture')
+    late.schedule_marks(now - 10, [1, 2], [1])
+    assert [e['timing'] for e in late.next_due()] == [1, 2]
+
+
+def test_stop_and_earlier_events_wake_the_wait():
+    scheduler = CaptureScheduler()
+    scheduler.schedule(time.monotonic() + 10, 1, 10)
+
+    # An earlier event scheduled from another thread is fired first
+    threading.Timer(0.05, lambda: scheduler.schedule(time.monotonic() + 0.05, 2, 0.1)).start()
+    start = time.monotonic()
+    assert [e['instance_id'] for e in scheduler.next_due()] == [2]
+    assert time.monotonic() - start < 1
+
+    # Stop returns at once with nothing
+    threading.Timer(0.05, scheduler.stop).start()
+    start = time.monotonic()
+    assert scheduler.next_due() == []
+    assert time.monotonic() - start < 1
+    assert not scheduler.wait_until(time.monotonic() + 10)
+
+
+if __name__ == "__main__":
+    test_marks_fire_on_time_in_order()
+    test_missed_marks_are_compressed_or_skipped()
+    test_stop_and_earlier_events_wake_the_wait()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the card-slot classifier and pull log
+"""
+
+import os
+import csv
+import shutil
+import tempfile
+import cv2
+from card_classifier import CardSlotClassifier, PullLog, harvest, slot_crops, card_hash, UNSORTED_DIRNAME
+
+SAVED_IMAGES_DIR = "saved_images"
+
+
+def test_harvested_cards_identify_their_slots():
+    """Cards harvested from saved_images and given a name are found again, other pulls stay unknown"""
+    frames = sorted(f for f in os.listdir(SAVED_IMAGES_DIR) if '_ANNOTATED_' not in f)
+    first = cv2.imread(os.path.join(SAVED_IMAGES_DIR, frames[0]))
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        added = harvest(SAVED_IMAGES_DIR, index_dir)
+        assert added > 0
+        assert harvest(SAVED_IMAGES_DIR, index_dir) == 0  # Nothing new the second time
+
+        # Label the first frame's cards
+        os.mkdir(os.path.join(index_dir, "First"))
+        for crop in slot_crops(first):
+            name = f"{card_hash(crop).tobytes().hex()}.png"
+            shutil.move(os.path.join(index_dir, UNSORTED_DIRNAME, name), os.path.join(index_dir, "First", name))
+
+        classifier = CardSlotClassifier()
+        assert classifier.learn(index_dir)
+
+    slots = classifier.classify(first)
+    assert [s['slot'] for s in slots] == list(range(1, 11))
+    assert all(s['character'] == "First" for s in slots)
+
+    # Raw RGBA captures hash the same as BGR
+    rgba = cv2.cvtColor(first, cv2.COLOR_BGR2RGBA)
+    assert [s['hash'] for s in classifier.classify(rgba)] == [s['hash'] for s in slots]
+
+    unknown = sum(s['character'] is None for s in classifier.classify(cv2.imread(os.path.join(SAVED_IMAGES_DIR, frames[1]))))
+    assert unknown >= 8, f"Only {unknown} slots of another pull were unknown"
+
+
+def test_detections_are_suggested_for_review():
+    """Confident smart detections in unknown slots are saved to _unsorted/<Name>/ once, never into the index"""
+    frame_file = sorted(f for f in os.listdir(SAVED_IMAGES_DIR) if '_ANNOTATED_' not in f)[0]
+    frame = cv2.imread(os.path.join(SAVED_IMAGES_DIR, frame_file))
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        classifier = CardSlotClassifier()
+        classifier.learn(index_dir)
+        slots = classifier.classify(frame)
+        detections = [
+            {'template': "Sure", 'method': 'smart_detection', 'confidence': 0.95, 'location': slots[0]['location']},
+            {'template': "Unsure", 'method': 'smart_detection', 'confidence': 0.8, 'location': slots[1]['location']},
+            {'template': "Template", 'method': 'template_matching', 'confidence': 1.0, 'location': slots[2]['location']},
+        ]
+
+        assert classifier.learn_from_detections(frame, slots, detections, index_dir) == ["Sure"]
+        assert os.listdir(os.path.join(index_dir, UNSORTED_DIRNAME)) == ["Sure"]
+        assert os.listdir(os.path.join(index_dir, UNSORTED_DIRNAME, "Sure")) == [f"{slots[0]['hash']}.png"]
+        assert len(classifier.index) == 0 and slots[0]['character'] is None
+
+        # Already waiting for review, also for a fresh classifier and for harvest
+        assert classifier.learn_from_detections(frame, slots, detections, index_dir) == []
+        fresh = CardSlotClassifier()
+        fresh.learn(index_dir)
+        assert fresh.learn_from_detections(frame, fresh.classify(frame), detections, index_dir) == []
+        assert harvest(SAVED_IMAGES_DIR, index_dir) > 0
+        assert f"{slots[0]['hash']}.png" not in os.listdir(os.path.join(index_dir, UNSORTED_DIRNAME))
+
+
+def test_pull_log_writes_each_screen_once():
+    classifier = CardSlotClassifier()
+    frames = sorted(f for f in os.listdir(SAVED_IMAGES_DIR) if '_ANNOTATED_' not in f)[:2]
+    first, second = [classifier.classify(cv2.imread(os.path.join(SAVED_IMAGES_DIR, f))) for f in frames]
+
+    with tempfile.TemporaryDirectory() as folder:
+        log = PullLog(os.path.join(folder, "pulls.csv"))
+        assert log.record(1, 1, 128, first)
+        assert not log.record(1, 1, 143, first)  # Same screen again
+        assert log.record(2, 1, 128, first)  # Another instance
+        assert log.record(1, 1, 157, second)
+
+        with open(log.path, newline='') as f:
+            rows = list(csv.DictReader(f))
+    assert len(rows) == 30
+    assert all(row['character'] == '' for row in rows)
+
+
+if __name__ == "__main__":
+    test_harvested_cards_identify_their_slots()
+    test_detections_are_suggested_for_review()
+    test_pull_log_writes_each_screen_once()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent card hash index
+"""
+
+import os
+import tempfile
+import cv2
+import numpy as np
+from card_hash_index import CardHashIndex, HASH_INDEX_DIRNAME, hamming, hash_to_int
+
+
+def test_search_matches_brute_force():
+    """Multi-index search finds exactly the hashes a full scan finds"""
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 256, (3000, 8), dtype=np.uint8)
+    index = CardHashIndex()
+    for i, card in enumerate(hashes):
+        index.add(card, str(i))
+
+    values = [hash_to_int(card) for card in hashes]
+    for i in range(50):
+        query = hashes[i].copy()
+        query[i % 8] ^= rng.integers(0, 256, dtype=np.uint8)  # Up to 8 bits off
+        query_value = hash_to_int(query)
+        expected = sorted((hamming(query_value, v), str(j)) for j, v in enumerate(values) if hamming(query_value, v) <= 10)
+        found = [(distance, entry['name']) for distance, entry in index.search(query, 10)]
+        assert sorted(found) == expected
+
+
+def test_sync_is_incremental_and_persistent():
+    """Only new or changed images are hashed, removed ones are dropped, and the index reopens from disk"""
+    hashed = []
+
+    def hash_image(path):
+        hashed.append(os.path.basename(path))
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        return np.packbits(cv2.resize(image, (8, 8)).flatten() > 127)
+
+    with tempfile.TemporaryDirectory() as image_dir:
+        os.mkdir(os.path.join(image_dir, "Alpha"))
+        os.mkdir(os.path.join(image_dir, "_unsorted"))
+        rng = np.random.default_rng(1)
+        for name in ("a.png", "b.png"):
+            cv2.imwrite(os.path.join(image_dir, "Alpha", name), rng.integers(0, 256, (32, 32), dtype=np.uint8))
+        cv2.imwrite(os.path.join(image_dir, "_unsorted", "c.png"), rng.integers(0, 256, (32, 32), dtype=np.uint8))
+
+        directory = os.path.join(image_dir, HASH_INDEX_DIRNAME)
+        index = CardHashIndex(directory)
+        assert index.sync(image_dir, hash_image) == (2, 0)
+        assert sorted(hashed) == ["a.png", "b.png"]
+
+        # Reopened index is memory-mapped and needs no hashing
+        hashed.clear()
+        reopened = CardHashIndex(directory)
+        assert isinstance(reopened.hashes, np.memmap)
+        assert reopened.sync(image_dir, hash_image) == (0, 0)
+        assert hashed == []
+        assert reopened.names() == ["Alpha", "Alpha"]
+        card = hash_image(os.path.join(image_dir, "Alpha", "a.png"))
+        entry, distance = reopened.nearest(card, 0)
+        assert entry['source'] == os.path.join("Alpha", "a.png") and distance == 0
+
+        # One image removed, one added
+        hashed.clear()
+        os.remove(os.path.join(image_dir, "Alpha", "b.png"))
+        os.mkdir(os.path.join(image_dir, "Beta"))
+        cv2.imwrite(os.path.join(image_dir, "Beta", "d.png"), rng.integers(0, 256, (32, 32), dtype=np.uint8))
+        assert reopened.sync(image_dir, hash_image) == (1, 1)
+        assert hashed == ["d.png"]
+        assert sorted(CardHashIndex(directory).names()) == ["Alpha", "Beta"]
+
+
+if __name__ == "__main__":
+    test_search_matches_brute_force()
+    test_sync_is_incremental_and_persistent()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for the cost-ordered detection cascade
+"""
+
+import time
+import numpy as np
+from detection_cascade import DetectionCascade, DetectionStage, SmartStage, TemplateStage, OcrStage, build_cascade, COST_SAMPLES
+
+
+class FixedStage(DetectionStage):
+    """Stage returning a fixed score, recording every call"""
+
+    def __init__(self, name, cost, score, accept=None, reject=None, calls=None):
+        super().__init__(accept, reject)
+        self.name = name
+        self.cost = cost
+        self.score = score
+        self.calls = calls if calls is not None else []
+
+    def run(self, frame):
+        self.calls.append(self.name)
+        if self.score is None:
+            raise RuntimeError("broken stage")
+        return self.score, [{'method': self.name, 'template': 'x', 'confidence': self.score, 'location': (0, 0)}]
+
+
+FRAME = np.zeros((64, 36, 3), dtype=np.uint8)
+
+
+def test_stages_run_cheapest_first_and_stop_on_a_decision():
+    calls = []
+    cascade = DetectionCascade([
+        FixedStage('slow', 300, 0.9, accept=0.7, calls=calls),
+        FixedStage('cheap', 5, 0.4, accept=0.7, reject=0.1, calls=calls),
+        FixedStage('medium', 50, 0.8, accept=0.7, calls=calls),
+    ])
+    detections = cascade.detect(FRAME)
+    assert calls == ['cheap', 'medium']
+    assert [d['stage'] for d in detections] == ['medium']
+
+    # Reject ends the cascade with nothing
+    calls.clear()
+    cascade.stages[1].score = 0.05
+    assert cascade.detect(FRAME) == []
+    assert calls == ['cheap']
+
+    stats = cascade.stats['stages']
+    assert stats['cheap']['runs'] == 2 and stats['cheap']['rejected'] == 1
+    assert stats['medium']['accepted'] == 1
+    assert stats['slow']['runs'] == 0
+    assert len(cascade.report()) == 4
+
+
+def test_undecided_frames_return_nothing_and_errors_are_skipped():
+    calls = []
+    cascade = DetectionCascade([
+        FixedStage('a', 1, 0.3, accept=0.7, calls=calls),
+        FixedStage('broken', 2, None, accept=0.7, calls=calls),
+        FixedStage('b', 3, 0.5, accept=0.7, calls=calls),
+    ])
+    assert cascade.detect(FRAME) == []
+    assert calls == ['a', 'broken', 'b']
+    assert cascade.stats['stages']['broken']['errors'] == 1
+    assert cascade.stats['undecided'] == 1
+
+
+def test_measured_cost_reorders_stages():
+    """A stage estimated cheap but measured slow moves behind the others"""
+
+    class SlowStage(FixedStage):
+        def run(self, frame):
+            time.sleep(0.02)
+            return super().run(frame)
+
+    cascade = DetectionCascade([SlowStage('optimistic', 1, 0.3), FixedStage('honest', 10, 0.3)])
+    assert [s.name for s in cascade.ordered_stages()] == ['optimistic', 'honest']
+    for _ in range(COST_SAMPLES):
+        cascade.detect(FRAME)
+    assert [s.name for s in cascade.ordered_stages()] == ['honest', 'optimistic']
+
+
+def test_unsure_smart_detections_go_on_to_later_stages():
+    """No cluster rejects, a large cluster accepts, and the smallest clusters let the later stages run"""
+    found = []
+    smart = SmartStage(0.7, detect=lambda frame: list(found))
+    assert smart.prepare()  # The given detector is already learned
+    calls = []
+    cascade = DetectionCascade([smart, FixedStage('feature', 1000, 0.2, accept=0.7, calls=calls)])
+
+    assert cascade.detect(FRAME) == []
+    assert calls == [] and cascade.stats['stages']['smart']['rejected'] == 1
+
+    # An unsure cluster only counts if a later stage confirms it
+    found[:] = [{'method': 'smart_detection', 'template': 'x', 'confidence': 0.75, 'location': (0, 0), 'matches': 5}]
+    assert cascade.detect(FRAME) == []
+    assert calls == ['feature']
+    cascade.stages[1].score = 0.8
+    assert [d['stage'] for d in cascade.detect(FRAME)] == ['feature']
+    calls.clear()
+    cascade.stages[1].score = 0.2
+
+    found[:] = [dict(found[0], confidence=0.95, matches=30)]
+    assert [d['stage'] for d in cascade.detect(FRAME)] == ['smart']
+    assert calls == [] and cascade.stats['stages']['smart']['accepted'] == 1
+
+    # A stricter confidence threshold raises the accept score
+    assert SmartStage(0.9, detect=lambda frame: []).decide(0.85) is None
+
+
+def test_ocr_never_accepts():
+    """Rarity badges are on every result screen, so a confident read decides nothing"""
+    ocr = OcrStage(0.7)
+    assert ocr.decide(1.0) is None
+    assert OcrStage(0.7, reject=0.5).decide(0.1) == 'reject'
+
+
+def test_template_detections_are_named_after_their_character():
+    stage = TemplateStage(0.7)
+    assert stage.prepare()
+    labelled = stage._label([{'template': name} for name in stage.templates])
+    assert {d['template'] for d in labelled} == {'Twin_Turbo'}
+
+
+def test_unknown_stage():
+    try:
+        build_cascade(('prefilter', 'magic'))
+    except ValueError:
+        return
+    assert False, "Expected ValueError"
+
+
+if __name__ == "__main__":
+    test_stages_run_cheapest_first_and_stop_on_a_decision()
+    test_undecided_frames_return_nothing_and_errors_are_skipped()
+    test_measured_cost_reorders_stages()
+    test_unsure_smart_detections_go_on_to_later_stages()
+    test_ocr_never_accepts()
+    test_template_detections_are_named_after_their_character()
+    test_unknown_stage()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Test script for the detection ROI
+"""
+
+import os
+import re
+import cv2
+import numpy as np
+from detection_roi import CARD_SLOTS, card_slot_roi, find_annotated_hits, build_roi_mask, learn_roi
+
+SAVED_IMAGES_DIR = "saved_images"
+
+
+def test_annotated_hits_match_filenames():
+    """Every hit marker is found: _ANNOTATED_TwinTurboN files hold N markers"""
+    for file in sorted(os.listdir(SAVED_IMAGES_DIR)):
+        match = re.search(r'_ANNOTATED_TwinTurbo(\d+)', file)
+        if not match:
+            continue
+        hits = find_annotated_hits(cv2.imread(os.path.join(SAVED_IMAGES_DIR, file)))
+        assert len(hits) == int(match.group(1)), f"{file}: found {len(hits)} markers"
+
+
+def test_learned_roi_covers_card_slots():
+    """Learned rectangles are padded card slots and the mask follows the frame size"""
+    result = learn_roi(SAVED_IMAGES_DIR)
+    assert result['rects'] and set(result['rects']) <= set(card_slot_roi())
+    print(f"Learned {len(result['rects'])} slots from {result['hits']} hits, {len(result['outliers'])} outliers")
+
+    mask = build_roi_mask((1280, 720), result['rects'])
+    x, y, w, h = CARD_SLOTS[0]
+    assert mask[y + h // 2, x + w // 2] == 255
+    assert mask[10, 10] == 0  # Status bar is never searched
+
+    half_mask = build_roi_mask((640, 360), result['rects'])
+    assert half_mask.shape == (640, 360)
+    assert abs(np.count_nonzero(half_mask) / half_mask.size - np.count_nonzero(mask) / mask.size) < 0.01
+
+
+if __name__ == "__main__":
+    test_annotated_hits_match_filenames()
+    test_learned_roi_covers_card_slots()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test script for the multi-process detection service
+"""
+
+import os
+import time
+import cv2
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from detection_service import DetectionService
+
+SAVED_IMAGES_DIR = "saved_images"
+
+
+def test_service_returns_detection_dicts():
+    """Workers return the same detection dicts as SmartCharacterDetector.detect_character"""
+    files = sorted(f for f in os.listdir(SAVED_IMAGES_DIR) if '_ANNOTATED_TwinTurbo8' in f or '_ANNOTATED_TwinTurbo7' in f)
+    frames = [cv2.imread(os.path.join(SAVED_IMAGES_DIR, f)) for f in files]
+    frames.append(cv2.cvtColor(frames[0], cv2.COLOR_BGR2RGBA))  # Raw captures are sent as-is
+
+    service = DetectionService(workers=2, use_prefilter=True)
+    service.start()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            results = list(pool.map(service.detect, frames))
+    finally:
+        service.close()
+
+    for file, detections in zip(files + ['rgba'], results):
+        assert detections, f"{file}: nothing detected"
+        for detection in detections:
+            assert set(detection) == {'method', 'template', 'confidence', 'location', 'matches'}
+            assert detection['method'] == 'smart_detection'
+        print(f"{file}: {len(detections)} detections")
+
+    assert service.prefilter.report()[-1].startswith(f"Prefilter total: rejected 0/{len(frames)}")
+
+
+def test_close_cancels_waiting_frames():
+    """Frames still queued when the service closes are cancelled instead of detected"""
+    frame = cv2.imread(os.path.join(SAVED_IMAGES_DIR, sorted(os.listdir(SAVED_IMAGES_DIR))[0]))
+    service = DetectionService(workers=1)
+    service.start()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        calls = [pool.submit(service.detect, frame) for _ in range(4)]
+        deadline = time.monotonic() + 5
+        while len(service._pending) < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        service.close()
+
+        cancelled = 0
+        for call in calls:
+            try:
+                call.result()
+            except CancelledError:
+                cancelled += 1
+    assert cancelled >= 1, "No waiting frame was cancelled"
+    assert not service._pending
+    print(f"{cancelled}/4 frames cancelled")
+
+
+if __name__ == "__main__":
+    test_service_returns_detection_dicts()
+    test_close_cancels_waiting_frames()
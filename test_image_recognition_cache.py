@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the template cache in ImageRecognition
+"""
+
+import os
+import shutil
+import tempfile
+import cv2
+import numpy as np
+import image_recognition
+from image_recognition import ImageRecognition, TEMPLATE_CACHE_DIRNAME, get_recognizer, clear_recognizer_cache
+
+TEMPLATE = os.path.join("characters", "KITA.png")
+SAVED_IMAGES_DIR = "saved_images"
+
+
+class CountingSift:
+    """Wraps a SIFT extractor and records the size of every image it processes"""
+
+    def __init__(self, sift):
+        self.sift = sift
+        self.calls = []
+
+    def detectAndCompute(self, image, mask):
+        self.calls.append(image.shape)
+        return self.sift.detectAndCompute(image, mask)
+
+
+def test_templates_are_processed_once():
+    """A second recognizer loads templates from disk and repeated matching only runs SIFT on the screenshot"""
+    screenshot = cv2.imread(os.path.join(SAVED_IMAGES_DIR, sorted(os.listdir(SAVED_IMAGES_DIR))[0]))
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, os.path.basename(TEMPLATE))
+        shutil.copy(TEMPLATE, path)
+
+        first = ImageRecognition()
+        templates = first.load_character_images([path])
+        assert len(os.listdir(os.path.join(folder, TEMPLATE_CACHE_DIRNAME))) == 1
+        expected = first._feature_matching(screenshot, templates)
+
+        second = ImageRecognition()
+        second.sift = CountingSift(second.sift)
+        cached = second.load_character_images([path])
+        name = os.path.basename(path)
+        assert np.array_equal(cached[name], templates[name])
+        assert second.load_character_images([path])[name] is cached[name]  # Unchanged file is not read again
+
+        indexes = []
+        for _ in range(2):
+            assert second._feature_matching(screenshot, cached) == expected
+            indexes.append(second._index_for(cached[name])[1])
+        assert second.sift.calls == [screenshot.shape] * 2
+        assert indexes[0] is indexes[1]  # Descriptor index built on the first match and reused
+
+        # Changed file is processed again
+        cv2.imwrite(path, cv2.flip(cv2.imread(TEMPLATE), 1))
+        second.load_character_images([path])
+        assert len(second.sift.calls) == 3
+        assert len(os.listdir(os.path.join(folder, TEMPLATE_CACHE_DIRNAME))) == 2
+
+
+
+def test_recognizers_are_shared_until_files_change():
+    """Same templates and threshold reuse one recognizer; edits, invalidation and the size limit replace it"""
+    clear_recognizer_cache()
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for i in range(image_recognition.RECOGNIZER_CACHE_SIZE + 1):
+            paths.append(os.path.join(folder, f"template{i}.png"))
+            shutil.copy(TEMPLATE, paths[-1])
+
+        recognizer, templates = get_recognizer(paths[:1], 0.7)
+        assert get_recognizer(paths[:1], 0.7)[0] is recognizer
+        assert get_recognizer(paths[:1], 0.8)[0] is not recognizer  # Other threshold
+
+        # Edited template gets a fresh recognizer, replacing the old one
+        cv2.imwrite(paths[0], cv2.flip(cv2.imread(TEMPLATE), 1))
+        edited = get_recognizer(paths[:1], 0.7)[0]
+        assert edited is not recognizer
+        assert len(image_recognition._recognizers) == 2
+
+        assert clear_recognizer_cache(paths[:1]) == 2
+        assert get_recognizer(paths[:1], 0.7)[0] is not edited
+
+        # Least recently used template sets are evicted
+        for path in paths[1:]:
+            get_recognizer([path], 0.7)
+        assert len(image_recognition._recognizers) == image_recognition.RECOGNIZER_CACHE_SIZE
+        assert all(key[0][0][0] != os.path.abspath(paths[0]) for key in image_recognition._recognizers)
+    clear_recognizer_cache()
+
+
+if __name__ == "__main__":
+    test_templates_are_processed_once()
+    test_recognizers_are_shared_until_files_change()
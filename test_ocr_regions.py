@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for region-restricted OCR in ImageRecognition, run only as a last resort
+"""
+
+import os
+import cv2
+import numpy as np
+from image_recognition import ImageRecognition, DEFAULT_OCR_REGIONS, OCR_UPSCALE
+
+SAVED_IMAGES_DIR = "saved_images"
+
+
+class RecordingRecognizer(ImageRecognition):
+    """Records OCR runs instead of starting tesseract; feature_results replaces feature matching if given"""
+
+    def __init__(self, *args, feature_results=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ocr_runs = 0
+        self.feature_results = feature_results
+
+    def _feature_matching(self, screenshot, templates):
+        if self.feature_results is not None:
+            return list(self.feature_results)
+        return super()._feature_matching(screenshot, templates)
+
+    def _ocr_detection(self, screenshot):
+        self.ocr_runs += 1
+        return [{'method': 'ocr', 'template': 'SR', 'confidence': 0.95, 'location': (0, 0), 'text_found': 'SR'}]
+
+
+def _frame():
+    return cv2.imread(os.path.join(SAVED_IMAGES_DIR, sorted(os.listdir(SAVED_IMAGES_DIR))[0]))
+
+
+def test_regions_are_stacked_into_one_image():
+    """Every region is cropped at the frame's scale and can be found again from a row of the stacked image"""
+    recognizer = ImageRecognition()
+    frame = _frame()
+    for screenshot in (frame, cv2.resize(frame, (360, 640))):
+        crops = recognizer._ocr_crops(screenshot)
+        assert len(crops) == sum(len(rects) for rects in DEFAULT_OCR_REGIONS.values())
+        assert [name for name, _, _ in crops].count('rarity_badge') == 10
+
+        column, tops = recognizer._stack_crops([crop for _, _, crop in crops])
+        assert column.ndim == 2
+        for (_, _, crop), top in zip(crops, tops):
+            enlarged = cv2.resize(crop, None, fx=OCR_UPSCALE, fy=OCR_UPSCALE, interpolation=cv2.INTER_CUBIC)
+            assert (column[top:top + enlarged.shape[0], :][:, 20:20 + enlarged.shape[1]] == enlarged).all()
+
+    scale = recognizer._ocr_crops(cv2.resize(frame, (360, 640)))[0][1]
+    full = recognizer._ocr_crops(frame)[0][1]
+    assert scale == tuple(v // 2 for v in full)
+
+
+def test_ocr_only_runs_when_inconclusive():
+    frame = _frame()
+    processed = ImageRecognition()._preprocess_image(frame)
+    noise = (np.random.default_rng(0).integers(0, 2, (150, 120)) * 255).astype(np.uint8)
+
+    # Exact crop of the frame: template matching decides, OCR is never started
+    recognizer = RecordingRecognizer(0.8)
+    results = recognizer.detect_characters(frame, {'crop': processed[300:500, 100:250].copy()})
+    assert results and results[0]['confidence'] >= 0.8
+    assert recognizer.ocr_runs == 0
+
+    # Template matching is inconclusive but feature matching decides: OCR is never started
+    found = {'method': 'feature_matching', 'template': 'noise', 'confidence': 0.9, 'location': (0, 0)}
+    recognizer = RecordingRecognizer(0.8, feature_results=[found])
+    results = recognizer.detect_characters(frame, {'noise': noise})
+    assert [r['method'] for r in results] == ['feature_matching']
+    assert recognizer.ocr_runs == 0
+
+    # Unrelated template: OCR runs after both methods and is included
+    recognizer = RecordingRecognizer(0.8)
+    results = recognizer.detect_characters(frame, {'noise': noise})
+    assert recognizer.ocr_runs == 1
+    assert any(r['method'] == 'ocr' for r in results)
+
+    # No regions configured: no OCR at all
+    recognizer = RecordingRecognizer(0.8, ocr_regions={})
+    recognizer.detect_characters(frame, {'noise': noise})
+    assert recognizer.ocr_runs == 0
+
+
+if __name__ == "__main__":
+    test_regions_are_stacked_into_one_image()
+    test_ocr_only_runs_when_inconclusive()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Test script for the detection prefilter cascade
+"""
+
+import cv2
+import numpy as np
+from prefilter import PrefilterCascade
+
+HIT_SCREENSHOT = "saved_images/screenshot_cycle2_instance_2_t201s_20250717_080752_ANNOTATED_TwinTurbo8.png"
+
+
+def test_prefilter_passes_hits_and_rejects_blank_frames():
+    """Result screens with the character pass, frames with nothing on them are rejected"""
+    cascade = PrefilterCascade()
+    assert cascade.learn()
+
+    frame = cv2.imread(HIT_SCREENSHOT)
+    assert cascade.check(frame) == (True, None)
+
+    # Raw RGBA captures score the same as BGR
+    rgba = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
+    assert np.allclose(list(cascade.score(rgba).values()), list(cascade.score(frame).values()))
+
+    blank = np.zeros_like(frame)
+    passed, rejected_by = cascade.check(blank)
+    assert not passed and rejected_by is not None
+
+    cascade.record_detection_time(0.5)
+    report = cascade.report()
+    print("\n".join(report))
+    assert "rejected 1/2 frames" in report[-1]
+
+
+def test_prefilter_rejects_unknown_stage():
+    try:
+        PrefilterCascade(stages=[('sift', 0.5)])
+    except ValueError as e:
+        print(f"Rejected as expected: {e}")
+    else:
+        raise AssertionError("Unknown prefilter stage was accepted")
+
+
+if __name__ == "__main__":
+    test_prefilter_passes_hits_and_rejects_blank_frames()
+    test_prefilter_rejects_unknown_stage()
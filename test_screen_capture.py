@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for in-memory screen capture decoding
+"""
+
+import struct
+import cv2
+import numpy as np
+from screen_capture import decode_png, parse_raw_screencap, parse_raw_rows, to_bgr, to_gray
+
+SCREENSHOT = "test2.png"
+
+
+def test_raw_screencap_matches_png():
+    """Raw framebuffer views decode to the same pixels as the PNG path"""
+    bgr = cv2.imread(SCREENSHOT)
+    rgba = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGBA)
+    height, width = bgr.shape[:2]
+
+    # Android < 9 sends a 12 byte header, Android 9+ adds a colour-space field
+    for header in (struct.pack('<3I', width, height, 1), struct.pack('<4I', width, height, 1, 1)):
+        frame = parse_raw_screencap(header + rgba.tobytes())
+
+        assert frame.shape == (height, width, 4)
+        assert not frame.flags.writeable  # zero-copy view over the adb output
+        assert np.array_equal(to_bgr(frame), bgr)
+        assert np.array_equal(to_gray(frame), to_gray(bgr))
+
+    with open(SCREENSHOT, 'rb') as f:
+        assert np.array_equal(decode_png(f.read()), bgr)
+
+    print("Raw and PNG capture paths agree")
+
+
+def test_raw_screencap_rejects_bad_data():
+    """Truncated output and unknown pixel formats are reported, not misread"""
+    for data in (b'', struct.pack('<3I', 2, 2, 1) + b'\x00' * 3, struct.pack('<3I', 1, 1, 4) + b'\x00' * 4):
+        try:
+            parse_raw_screencap(data)
+        except ValueError as e:
+            print(f"Rejected as expected: {e}")
+        else:
+            raise AssertionError("Bad raw screencap data was accepted")
+
+
+def test_raw_rows_match_the_bottom_of_the_frame():
+    """`screencap | tail -c` output is the frame's last rows, without the header"""
+    bgr = cv2.imread(SCREENSHOT)
+    rgba = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGBA)
+    height, width = bgr.shape[:2]
+    data = struct.pack('<4I', width, height, 1, 1) + rgba.tobytes()
+
+    rows = parse_raw_rows(data[-width * 100 * 4:], width, 100)
+    assert rows.shape == (100, width, 4)
+    assert np.array_equal(to_bgr(rows), bgr[-100:])
+
+    try:
+        parse_raw_rows(data[-width * 100 * 4 + 4:], width, 100)
+    except ValueError as e:
+        print(f"Rejected as expected: {e}")
+    else:
+        raise AssertionError("Short raw rows were accepted")
+
+
+if __name__ == "__main__":
+    test_raw_screencap_matches_png()
+    test_raw_screencap_rejects_bad_data()
+    test_raw_rows_match_the_bottom_of_the_frame()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the screen state classifier and results trigger
+"""
+
+import os
+import glob
+import cv2
+import hashlib
+import tempfile
+from screen_state import (ScreenStateClassifier, ScreenStateTracker, add_references, sample_timings, strip_rows,
+                          DEFAULT_STATES_DIR, UNKNOWN_STATE)
+from detection_roi import find_annotated_hits
+
+SAVED_IMAGES_DIR = "saved_images"
+DIALOG = 'screenshot_cycle29_instance_1_t128s_20250717_095121_ANNOTATED_TwinTurbo1.png'
+MENU = 'screenshot_cycle2_instance_4_t201s_20250717_080754_ANNOTATED_TwinTurbo7.png'
+LOADING = 'screenshot_cycle7_instance_1_t143s_20250717_082617.png'  # Not one of the references
+
+
+def _frames():
+    files = sorted(os.listdir(SAVED_IMAGES_DIR))
+    return {file: cv2.imread(os.path.join(SAVED_IMAGES_DIR, file)) for file in files}
+
+
+def _pixel_digest(image):
+    return hashlib.sha1(image.tobytes()).hexdigest()
+
+
+def test_references_are_clean_captures():
+    """No state reference carries detection overlays or is a copy of an annotated hit screenshot"""
+    references = sorted(glob.glob(os.path.join(DEFAULT_STATES_DIR, '*', '*.png')))
+    assert references
+
+    annotated = {_pixel_digest(cv2.imread(path))
+                 for path in glob.glob(os.path.join(SAVED_IMAGES_DIR, '*ANNOTATED*')) + glob.glob('*ANNOTATED*')}
+    for path in references:
+        image = cv2.imread(path)
+        assert find_annotated_hits(image) == [], f"{path} has hit markers drawn on it"
+        assert _pixel_digest(image) not in annotated, f"{path} is a copy of an annotated screenshot"
+
+
+def test_saved_images_are_classified():
+    """Result screens match the results references, other screens don't"""
+    classifier = ScreenStateClassifier()
+    assert classifier.learn()
+    assert classifier.has_state('results')
+
+    states = {file: classifier.classify(frame)[0] for file, frame in _frames().items()}
+    assert list(states.values()).count('results') == 71
+    assert states[MENU] == UNKNOWN_STATE
+    assert states[DIALOG] == UNKNOWN_STATE
+    assert classifier.classify(cv2.imread(LOADING))[0] == 'loading'
+
+    # Half-size frames fingerprint the same regions
+    frame = next(iter(_frames().values()))
+    assert classifier.classify(cv2.resize(frame, (360, 640)))[0] == 'results'
+
+
+def test_bottom_strip_classifies_like_the_full_frame():
+    classifier = ScreenStateClassifier()
+    assert classifier.learn()
+    for frame in list(_frames().values())[::8] + [cv2.imread(LOADING)]:
+        height = frame.shape[0]
+        strip = frame[height - strip_rows(height):]
+        assert strip.shape[0] < height / 5
+        full_state, full_distance = classifier.classify(frame)
+        strip_state, strip_distance = classifier.classify(strip, height)
+        assert strip_state == full_state
+        assert abs(strip_distance - full_distance) < 1e-6
+
+
+def test_scan_only_on_entering_results():
+    frames = _frames()
+    results = frames['cycle1_instance1_t143s_20250717_080301.png']
+    menu = frames[MENU]
+
+    with tempfile.TemporaryDirectory() as states_dir:
+        add_references('results', [os.path.join(SAVED_IMAGES_DIR, 'cycle1_instance1_t128s_20250717_080246.png')], states_dir)
+        classifier = ScreenStateClassifier()
+        assert classifier.learn(states_dir)
+        assert classifier.reference_counts() == {'results': 1}
+
+    tracker = ScreenStateTracker(classifier, confirm_samples=2)
+    sequence = [menu, results, results, results, menu, results, results]
+    entered = [tracker.sample(1, frame)[1] for frame in sequence]
+    assert entered == [False, False, True, False, False, False, True]
+    assert tracker.state(1) == 'results'
+
+    # Instances are tracked separately, and state is kept when the stats reset for a new cycle
+    assert [tracker.sample(2, results)[1] for _ in range(2)] == [False, True]
+    tracker.reset_stats()
+    height = results.shape[0]
+    assert tracker.sample(1, results[height - strip_rows(height):], height) == ('results', False)
+    tracker.record_full_capture()
+    assert tracker.stats['strips'] == 1 and tracker.stats['full_captures'] == 1
+    assert "1 samples" in tracker.report()[0]
+
+    assert sample_timings(5, 1) == [0, 1, 2, 3, 4]
+
+
+if __name__ == "__main__":
+    test_references_are_clean_captures()
+    test_saved_images_are_classified()
+    test_bottom_strip_classifies_like_the_full_frame()
+    test_scan_only_on_entering_results()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Test script for the smart character detector's match clustering
+"""
+
+import os
+import shutil
+import tempfile
+import cv2
+import numpy as np
+from smart_character_detection import (SmartCharacterDetector, group_points_by_location, two_nearest, ratio_test,
+                                       DescriptorIndex, _params_key, DEFAULT_CHARACTER)
+from screen_capture import to_gray
+
+SAVED_IMAGES_DIR = "saved_images"
+
+
+def reference_group_points(matched_points):
+    """The original pure-Python clustering loop, kept to check the NumPy version against"""
+    instances = []
+    used_points = set()
+
+    for i, point in enumerate(matched_points):
+        if i in used_points:
+            continue
+
+        cluster_points = [point]
+        used_points.add(i)
+
+        for j, other_point in enumerate(matched_points):
+            if j in used_points:
+                continue
+
+            distance = ((point[0] - other_point[0])**2 + (point[1] - other_point[1])**2)**0.5
+            if distance < 100:
+                cluster_points.append(other_point)
+                used_points.add(j)
+
+        if len(cluster_points) >= 5:
+            center_x = sum(p[0] for p in cluster_points) / len(cluster_points)
+            center_y = sum(p[1] for p in cluster_points) / len(cluster_points)
+            confidence = min(0.95, len(cluster_points) / 20.0 + 0.5)
+
+            instances.append({
+                'center': (center_x, center_y),
+                'confidence': confidence,
+                'match_count': len(cluster_points),
+                'points': cluster_points
+            })
+
+    return instances
+
+
+def assert_same_clusters(expected, actual):
+    assert len(actual) == len(expected), f"{len(actual)} clusters instead of {len(expected)}"
+    for want, got in zip(expected, actual):
+        assert got['match_count'] == want['match_count']
+        assert got['points'] == want['points']
+        assert got['confidence'] == want['confidence']
+        assert np.allclose(got['center'], want['center'])
+
+
+def test_clustering_matches_reference_on_saved_images():
+    """Vectorized clustering finds exactly the clusters the original loop found"""
+    detector = SmartCharacterDetector()
+    assert detector.learn_character()
+
+    images = sorted(f for f in os.listdir(SAVED_IMAGES_DIR) if f.lower().endswith('.png'))
+    assert images, f"No screenshots found in {SAVED_IMAGES_DIR}"
+
+    total_clusters = 0
+    for file in images:
+        gray = to_gray(cv2.imread(os.path.join(SAVED_IMAGES_DIR, file)))
+        keypoints, descriptors = detector.extractor.detectAndCompute(gray, None)
+        _, train_indices = detector._match_frame(descriptors)
+
+        matched_points = [keypoints[i].pt for i in train_indices]
+        expected = reference_group_points(matched_points)
+        actual = group_points_by_location(detector._keypoint_points(keypoints, (0, 0))[train_indices])
+
+        assert_same_clusters(expected, actual)
+        total_clusters += len(expected)
+
+    print(f"Identical clusters on {len(images)} screenshots ({total_clusters} clusters)")
+
+
+def test_clustering_matches_reference_on_busy_points():
+    """Dense random point sets (busier than any real result screen) also agree"""
+    rng = np.random.default_rng(0)
+    for count in (0, 1, 4, 5, 200, 1500):
+        points = [tuple(p) for p in (rng.random((count, 2)) * (720, 1280)).tolist()]
+        assert_same_clusters(reference_group_points(points), group_points_by_location(points))
+
+
+def test_ratio_test_matches_dmatch_loop():
+    """The array ratio test keeps the same matches as the original loop over DMatch pairs"""
+    detector = SmartCharacterDetector()
+    assert detector.learn_character()
+    screenshot = sorted(f for f in os.listdir(SAVED_IMAGES_DIR) if f.lower().endswith('.png'))[0]
+    _, descriptors = detector.extractor.detectAndCompute(to_gray(cv2.imread(os.path.join(SAVED_IMAGES_DIR, screenshot))), None)
+
+    # Exact search so both sides see the same neighbours
+    matches = cv2.BFMatcher(cv2.NORM_L2).knnMatch(detector.character_descriptors, descriptors, k=2)
+    kept = [m for m, n in matches if m.distance < 0.7 * n.distance]
+
+    squared, indices = cv2.batchDistance(detector.character_descriptors, descriptors, cv2.CV_32F,
+                                         normType=cv2.NORM_L2SQR, K=2)
+    good = ratio_test(squared[:, 0], squared[:, 1], 'sift')
+    assert np.flatnonzero(good).tolist() == [m.queryIdx for m in kept]
+    assert indices[good, 0].tolist() == [m.trainIdx for m in kept]
+
+    # Hamming distances are compared as they are
+    hamming = np.array([[10, 20], [15, 20], [0, 1]])
+    assert ratio_test(hamming[:, 0], hamming[:, 1], 'orb').tolist() == [True, False, True]
+
+
+def test_model_index_matches_brute_force():
+    """The model's index finds the same two nearest neighbours as an exhaustive matcher, and is rebuilt on relearning"""
+    detector = SmartCharacterDetector()
+    assert detector.learn_character()
+    assert len(detector.character_index) == len(detector.character_descriptors)
+    screenshot = sorted(f for f in os.listdir(SAVED_IMAGES_DIR) if f.lower().endswith('.png'))[0]
+    _, descriptors = detector.extractor.detectAndCompute(to_gray(cv2.imread(os.path.join(SAVED_IMAGES_DIR, screenshot))), None)
+
+    squared, indices = cv2.batchDistance(detector.character_descriptors, descriptors, cv2.CV_32F,
+                                         normType=cv2.NORM_L2SQR, K=2)
+    nearest, nearest_distances, second_distances = two_nearest(detector.character_index.distances(descriptors), axis=0)
+    assert np.mean(nearest == indices[:, 0]) > 0.999  # Only exact ties may pick a different neighbour
+    assert np.allclose(nearest_distances, squared[:, 0], rtol=1e-4, atol=1.0)
+    assert np.allclose(second_distances, squared[:, 1], rtol=1e-4, atol=1.0)
+
+    # Query-side nearest neighbours (used for template matching) and Hamming distances
+    distances = DescriptorIndex(np.array([[0, 0], [3, 0], [0, 5]], dtype=np.float32)).distances(
+        np.array([[1, 0], [0, 4]], dtype=np.float32))
+    assert [a.tolist() for a in two_nearest(distances)] == [[0, 2], [1.0, 1.0], [4.0, 16.0]]
+    binary = DescriptorIndex(np.array([[0b1111], [0b0001]], dtype=np.uint8), 'orb')
+    assert binary.distances(np.array([[0b0011]], dtype=np.uint8)).tolist() == [[2.0, 1.0]]
+
+    index = detector.character_index
+    assert detector.learn_character()
+    assert detector.character_index is not index
+
+
+def test_orb_backend_learns_binary_descriptors():
+    """ORB keeps packed uint8 descriptors, matched with Hamming distance, and caches apart from SIFT"""
+    assert _params_key('orb') != _params_key('sift')
+
+    detector = SmartCharacterDetector(backend='orb')
+    assert detector.learn_character()
+    assert detector.character_descriptors.dtype == np.uint8
+    assert detector.character_descriptors.shape[1] == detector.extractor.descriptorSize()
+    assert len(detector.character_points) == len(detector.character_descriptors)
+
+    screenshot = os.path.join(SAVED_IMAGES_DIR, sorted(os.listdir(SAVED_IMAGES_DIR))[0])
+    assert isinstance(detector.detect_character(screenshot), list)
+
+
+def test_detect_batch_agrees_with_single_frames():
+    """Batch detection finds the same detections as per-frame detection"""
+    detector = SmartCharacterDetector(0.85)
+    assert detector.learn_character()
+    assert detector.detect_batch([]) == []
+
+    files = sorted(f for f in os.listdir(SAVED_IMAGES_DIR) if f.lower().endswith('.png'))[:10]
+    frames = [cv2.imread(os.path.join(SAVED_IMAGES_DIR, f)) for f in files]
+
+    single = [detector.detect_character(f) for f in frames]
+    assert detector.detect_batch(frames) == single
+
+
+def test_subfolders_learn_labelled_characters():
+    """Top-level images are the default character, each subfolder is another labelled character"""
+    images = sorted(f for f in os.listdir("characters") if f.lower().endswith('.png'))
+    with tempfile.TemporaryDirectory() as characters_dir:
+        shutil.copy(os.path.join("characters", images[0]), characters_dir)
+        os.mkdir(os.path.join(characters_dir, "Second"))
+        for image in images[1:]:
+            shutil.copy(os.path.join("characters", image), os.path.join(characters_dir, "Second"))
+
+        detector = SmartCharacterDetector()
+        assert detector.learn_character(characters_dir)
+        assert not os.path.exists(os.path.join(characters_dir, "Second", ".model_cache"))
+
+    assert detector.character_names == [DEFAULT_CHARACTER, "Second"]
+    assert len(detector.character_labels) == len(detector.character_descriptors)
+    assert set(np.unique(detector.character_labels)) == {0, 1}
+
+    found = set()
+    for file in sorted(os.listdir(SAVED_IMAGES_DIR))[:10]:
+        found.update(d['template'] for d in detector.detect_character(os.path.join(SAVED_IMAGES_DIR, file)))
+    assert found <= set(detector.character_names)
+
+
+if __name__ == "__main__":
+    test_clustering_matches_reference_on_saved_images()
+    test_clustering_matches_reference_on_busy_points()
+    test_ratio_test_matches_dmatch_loop()
+    test_model_index_matches_brute_force()
+    test_orb_backend_learns_binary_descriptors()
+    test_detect_batch_agrees_with_single_frames()
+    test_subfolders_learn_labelled_characters()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for coarse-to-fine template matching in ImageRecognition
+"""
+
+import os
+import cv2
+import numpy as np
+from image_recognition import ImageRecognition
+
+SAVED_IMAGES_DIR = "saved_images"
+
+
+def _crops(recognizer, count=12):
+    """(processed screenshot, template cut from it, x, y) for a few saved_images frames"""
+    rng = np.random.default_rng(0)
+    frames = sorted(os.listdir(SAVED_IMAGES_DIR))[::10]
+    for i in range(count):
+        screenshot = recognizer._preprocess_image(cv2.imread(os.path.join(SAVED_IMAGES_DIR, frames[i % len(frames)])))
+        height, width = rng.integers(80, 200, 2)
+        y, x = rng.integers(0, screenshot.shape[0] - height), rng.integers(0, screenshot.shape[1] - width)
+        yield screenshot, screenshot[y:y + height, x:x + width].copy(), int(x), int(y)
+
+
+def test_coarse_to_fine_finds_exact_crops():
+    recognizer = ImageRecognition(0.5, template_mode='coarse_to_fine')
+    for screenshot, template, x, y in _crops(recognizer):
+        results = recognizer._template_matching(screenshot, {'crop': template})
+        assert len(results) == 1
+        assert results[0]['location'] == (x, y)
+        assert results[0]['confidence'] > 0.99
+
+
+def test_multi_scale_finds_zoomed_templates():
+    recognizer = ImageRecognition(0.5, template_mode='coarse_to_fine', template_scales=(0.8, 1.0, 1.25))
+    found = 0
+    for screenshot, template, x, y in _crops(recognizer):
+        small = cv2.resize(template, None, fx=0.8, fy=0.8, interpolation=cv2.INTER_AREA)
+        results = recognizer._template_matching(screenshot, {'crop': small})
+        if results and results[0]['scale'] == 1.25:
+            found += abs(results[0]['location'][0] - x) <= 3 and abs(results[0]['location'][1] - y) <= 3
+    assert found >= 11, f"Only {found} of 12 zoomed templates were found"
+
+
+def test_coarse_level_rejects_non_matches():
+    """Unrelated templates are rejected without refinement and no results are returned"""
+    recognizer = ImageRecognition(0.8, template_mode='coarse_to_fine')
+    rng = np.random.default_rng(1)
+    screenshot = next(_crops(recognizer))[0]
+    noise = (rng.integers(0, 2, (150, 120)) * 255).astype(np.uint8)
+    assert recognizer._template_matching(screenshot, {'noise': noise}) == []
+
+    pyramid = recognizer._template_pyramid(noise, 1.0)
+    screenshot_pyramid = [screenshot, cv2.pyrDown(screenshot)]
+    screenshot_pyramid.append(cv2.pyrDown(screenshot_pyramid[-1]))
+    assert recognizer._match_pyramid(screenshot_pyramid, pyramid)[1] is None
+
+
+def test_unknown_template_mode():
+    try:
+        ImageRecognition(template_mode='fastest')
+    except ValueError:
+        return
+    assert False, "Expected ValueError"
+
+
+if __name__ == "__main__":
+    test_coarse_to_fine_finds_exact_crops()
+    test_multi_scale_finds_zoomed_templates()
+    test_coarse_level_rejects_non_matches()
+    test_unknown_template_mode()
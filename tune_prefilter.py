@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tune Detection Prefilter
+Scores every screenshot in saved_images with each prefilter stage and shows,
+per threshold, how many frames would be rejected, how many of them smart
+detection would have counted as hits, and the time that would be saved
+"""
+
+import os
+import sys
+import io
+import time
+import contextlib
+import cv2
+import numpy as np
+from smart_character_detection import SmartCharacterDetector
+from prefilter import PrefilterCascade, PREFILTER_STAGES, DEFAULT_CASCADE
+
+THRESHOLDS = {
+    'histogram': [0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35],
+    'ncc': [0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5],
+}
+
+
+def collect_scores(saved_images_dir, confidence_threshold):
+    """Score each screenshot with every stage and record the full detection result and time"""
+    detector = SmartCharacterDetector(confidence_threshold)
+    cascade = PrefilterCascade()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not detector.learn_character() or not cascade.learn():
+            print("ERROR: Could not learn the character")
+            return []
+
+    rows = []
+    files = sorted(f for f in os.listdir(saved_images_dir) if f.lower().endswith('.png'))
+    print(f"Scoring {len(files)} screenshots from '{saved_images_dir}'...")
+    for file in files:
+        frame = cv2.imread(os.path.join(saved_images_dir, file))
+        if frame is None:
+            continue
+
+        start = time.perf_counter()
+        scores = cascade.score(frame)
+        score_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            detections = detector.detect_character(frame)
+        detection_time = time.perf_counter() - start
+
+        rows.append({
+            'file': file,
+            'scores': scores,
+            'score_time': score_time,
+            'hit': any(d['confidence'] >= confidence_threshold for d in detections),
+            'annotated': '_ANNOTATED_' in file,
+            'detection_time': detection_time,
+        })
+    return rows
+
+
+def show_stage_thresholds(rows):
+    """Rejections and lost hits for each stage on its own"""
+    hits = sum(r['hit'] for r in rows)
+    print(f"\n{len(rows)} frames, {hits} detected as hits, {sum(r['annotated'] for r in rows)} annotated")
+
+    for stage in PREFILTER_STAGES:
+        scores = np.array([r['scores'][stage] for r in rows])
+        hit_scores = np.array([r['scores'][stage] for r in rows if r['hit']])
+        print(f"\n--- {stage} ---")
+        if len(hit_scores):
+            print(f"Lowest score on a hit frame: {hit_scores.min():.3f}")
+        for threshold in THRESHOLDS[stage]:
+            rejected = scores < threshold
+            lost = sum(1 for r, rej in zip(rows, rejected) if rej and r['hit'])
+            print(f"  threshold {threshold:.2f}: rejects {rejected.sum():2d}/{len(rows)} ({rejected.mean():.0%}), "
+                  f"lost hits {lost}")
+
+
+def show_cascade(rows, cascade):
+    """Simulate the configured cascade and estimate the time it saves"""
+    print(f"\n--- Cascade {cascade} ---")
+    remaining = rows
+    total_rejected = 0
+    lost = 0
+    for stage, threshold in cascade:
+        rejected = [r for r in remaining if r['scores'][stage] < threshold]
+        remaining = [r for r in remaining if r['scores'][stage] >= threshold]
+        total_rejected += len(rejected)
+        lost += sum(r['hit'] for r in rejected)
+        checked = len(rejected) + len(remaining)
+        print(f"  {stage} >= {threshold:.2f}: rejected {len(rejected)}/{checked} "
+              f"({len(rejected) / checked if checked else 0:.0%})")
+
+    avg_detection = np.mean([r['detection_time'] for r in rows])
+    avg_score = np.mean([r['score_time'] for r in rows])
+    saved = sum(r['detection_time'] for r in rows if r not in remaining) - avg_score * len(rows)
+    print(f"  Total: rejected {total_rejected}/{len(rows)} frames, lost hits {lost}")
+    print(f"  Full detection {avg_detection * 1000:.0f}ms/frame, prefilter (all stages) {avg_score * 1000:.1f}ms/frame")
+    print(f"  Time saved on this set: {saved:.1f}s of {sum(r['detection_time'] for r in rows):.1f}s")
+
+
+def main():
+    saved_images_dir = sys.argv[1] if len(sys.argv) > 1 else "saved_images"
+    confidence_threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.85
+
+    print("=== TUNING DETECTION PREFILTER ===")
+    print(f"Hits are frames smart detection finds at confidence >= {confidence_threshold}")
+
+    rows = collect_scores(saved_images_dir, confidence_threshold)
+    if not rows:
+        return
+
+    show_stage_thresholds(rows)
+    show_cascade(rows, DEFAULT_CASCADE)
+
+
+if __name__ == "__main__":
+    main()